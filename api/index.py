@@ -1,162 +1,191 @@
 """
 Vercel Serverless Function - Waste Classification API
 Uses native Python HTTP handler for maximum compatibility
+
+A thin adapter over waste_core (repository root), the same engine as the
+FastAPI backend: identical prompt, answer parsing, category metadata and
+response payloads. Gemini is the only model here - when it cannot answer,
+the handler returns the backend's safe "treat as hazardous" response.
+
+Cold starts are kept short: only the standard library is imported up front,
+Gemini is called through waste_core's RestGeminiModel rather than the SDK,
+and JPEG/PNG/WEBP/HEIC uploads are forwarded as received. Pillow is imported
+only for the rare upload Gemini cannot read inline.
 """
 from http.server import BaseHTTPRequestHandler
-import json
+import hashlib
+import io
+import logging
 import os
+import sys
+
+# waste_core lives next to api/ (bundled via vercel.json includeFiles)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from waste_core.cache import TTLCache  # noqa: E402
+from waste_core.engine import RestGeminiModel, classify_image_part, image_part, sniff_image_type  # noqa: E402
+from waste_core.multipart import BodyTooLarge, MultipartError, find_file, get_boundary, read_body  # noqa: E402
+from waste_core.responses import (  # noqa: E402
+    UPLOAD_SETTINGS,
+    build_categories_payload,
+    build_gemini_response,
+    build_no_detection_response,
+    dumps,
+    etag_matches,
+    utc_timestamp,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")  # e.g. benchmarks/mock_gemini.py
+CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.65"))
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", str(10 * 1024 * 1024)))  # bytes
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))   # seconds an identical upload is answered from memory
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))  # results kept per warm instance
+
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+CATEGORIES_BODY, CATEGORIES_ETAG = build_categories_payload(CONFIDENCE_THRESHOLD, UPLOAD_SETTINGS)
+
+# Built on first use and reused by warm invocations of the same instance
+_model = None
+results = TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+
+def get_model():
+    """Gemini client of this instance (None without GEMINI_API_KEY)"""
+    global _model
+    if _model is None and GEMINI_API_KEY:
+        _model = RestGeminiModel(GEMINI_API_KEY, GEMINI_API_ENDPOINT)
+    return _model
+
+
+def to_gemini_image(image_bytes):
+    """
+    Image bytes and MIME type to send to Gemini
+
+    Formats Gemini reads inline are passed through untouched; others (GIF,
+    BMP, TIFF, ...) are converted to JPEG with Pillow.
+
+    Raises:
+        ValueError: The upload is not an image Pillow can read
+    """
+    mime_type = sniff_image_type(image_bytes)
+    if mime_type:
+        return image_bytes, mime_type
+
+    from PIL import Image
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+    except Exception as e:
+        raise ValueError(f"Unsupported image: {e}")
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=85)
+    return buffered.getvalue(), "image/jpeg"
+
+
+def classify(image_bytes):
+    """
+    Classify an uploaded image with Gemini Vision
+
+    Args:
+        image_bytes (bytes-like): Upload, typically a memoryview into the request body
+
+    Returns:
+        dict: Response payload (the safe no-detection payload when Gemini
+            is not configured or cannot answer)
+
+    Raises:
+        ValueError: The upload is not a readable image
+    """
+    cache_key = hashlib.sha256(image_bytes).hexdigest()
+    cached = results.get(cache_key)
+    if cached is not None:
+        return {**cached, "cached": True, "timestamp": utc_timestamp()}
+
+    category = None
+    model = get_model()
+    if model is not None:
+        data, mime_type = to_gemini_image(image_bytes)
+        try:
+            category, item, confidence = classify_image_part(model, image_part(data, mime_type))
+        except Exception as e:
+            logger.warning("Gemini Vision error: %s", e)
+
+    if not category:
+        response = build_no_detection_response()
+        response["error"] = "Classification unavailable" if model else "GEMINI_API_KEY not configured"
+        return response
+
+    response = build_gemini_response(category, item, confidence, CONFIDENCE_THRESHOLD)
+    results.set(cache_key, response)
+    return response
+
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        if self.path == '/health' or self.path == '/api/health':
-            response = {
+        path = self.path.split("?", 1)[0]
+        if path == '/health' or path == '/api/health':
+            self._send_json(200, {
                 "status": "healthy",
                 "platform": "Vercel",
-                "gemini_configured": bool(os.getenv("GEMINI_API_KEY"))
-            }
-        elif self.path == '/api/categories':
-            response = {
-                "categories": {
-                    "ORGANIC": {"color": "green", "icon": "leaf"},
-                    "RECYCLABLE": {"color": "blue", "icon": "recycle"},
-                    "HAZARDOUS": {"color": "red", "icon": "warning"},
-                    "GENERAL": {"color": "grey", "icon": "trash"}
-                }
-            }
+                "gemini_configured": bool(GEMINI_API_KEY),
+            })
+        elif path == '/api/categories':
+            headers = {"ETag": CATEGORIES_ETAG, "Cache-Control": "public, max-age=3600"}
+            if etag_matches(self.headers.get("If-None-Match"), CATEGORIES_ETAG):
+                self._send(304, b"", headers)
+            else:
+                self._send(200, CATEGORIES_BODY, headers)
         else:
-            response = {
+            self._send_json(200, {
                 "message": "Waste Classification API",
                 "version": "1.0.0",
                 "endpoints": ["/health", "/api/classify", "/api/categories"]
-            }
-        
-        self.wfile.write(json.dumps(response).encode())
-    
+            })
+
     def do_POST(self):
-        if '/classify' in self.path:
-            try:
-                content_length = int(self.headers.get('Content-Length', 0))
-                post_data = self.rfile.read(content_length)
-                
-                result = self._classify_image(post_data)
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps(result).encode())
-                
-            except Exception as e:
-                self.send_response(500)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": str(e), "success": False}).encode())
-        else:
-            self.send_response(404)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Not found"}).encode())
-    
+        if '/classify' not in self.path:
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            content_type = self.headers.get('Content-Type', '')
+            get_boundary(content_type)  # reject non-multipart requests before reading the body
+            if self.headers.get('Content-Length') is None:
+                self._send_json(411, {"success": False, "error": "Content-Length required"})
+                return
+            body = read_body(self.rfile, int(self.headers['Content-Length']), MAX_IMAGE_SIZE)
+            _, image = find_file(body, content_type)
+            if not image:
+                self._send_json(400, {"success": False, "error": "No image found in request"})
+                return
+            self._send_json(200, classify(image))
+        except BodyTooLarge:
+            self.close_connection = True  # the unread body must not be parsed as a request
+            self._send_json(413, {"success": False, "error": "Image too large"})
+        except (MultipartError, ValueError) as e:
+            self._send_json(400, {"success": False, "error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"success": False, "error": str(e)})
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
-    
-    def _classify_image(self, raw_data):
-        """Classify waste image using Gemini Vision AI"""
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            return {
-                "success": False,
-                "error": "GEMINI_API_KEY not configured",
-                "category": "GENERAL",
-                "dustbin_color": "grey",
-                "dustbin_icon": "trash"
-            }
-        
-        try:
-            import google.generativeai as genai
-            from PIL import Image
-            import io
-            
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Extract image from multipart form data
-            image_bytes = self._extract_image(raw_data)
-            if not image_bytes:
-                return {
-                    "success": False,
-                    "error": "No image found in request",
-                    "category": "GENERAL",
-                    "dustbin_color": "grey",
-                    "dustbin_icon": "trash"
-                }
-            
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            prompt = """Analyze this image and classify the waste into ONE category:
-            - ORGANIC (food, garden waste, biodegradable)
-            - RECYCLABLE (plastic bottles, glass, metal, cardboard, paper)
-            - HAZARDOUS (batteries, chemicals, electronics, bulbs)
-            - GENERAL (chip packets, tissues, styrofoam, mixed waste)
-            
-            Reply with ONLY the category name."""
-            
-            response = model.generate_content([prompt, image])
-            text = response.text.strip().upper()
-            
-            category = "GENERAL"
-            for cat in ["HAZARDOUS", "ORGANIC", "RECYCLABLE", "GENERAL"]:
-                if cat in text:
-                    category = cat
-                    break
-            
-            colors = {"ORGANIC": "green", "RECYCLABLE": "blue", "HAZARDOUS": "red", "GENERAL": "grey"}
-            icons = {"ORGANIC": "leaf", "RECYCLABLE": "recycle", "HAZARDOUS": "warning", "GENERAL": "trash"}
-            
-            return {
-                "success": True,
-                "category": category,
-                "confidence": 0.85,
-                "dustbin_color": colors[category],
-                "dustbin_icon": icons[category],
-                "model_used": "Gemini Vision AI"
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "category": "GENERAL",
-                "dustbin_color": "grey",
-                "dustbin_icon": "trash"
-            }
-    
-    def _extract_image(self, raw_data):
-        """Extract image bytes from multipart form data"""
-        content_type = self.headers.get('Content-Type', '')
-        
-        if 'boundary=' in content_type:
-            boundary = content_type.split('boundary=')[1].strip()
-            parts = raw_data.split(f'--{boundary}'.encode())
-            
-            for part in parts:
-                if b'filename=' in part or b'image' in part.lower():
-                    if b'\r\n\r\n' in part:
-                        image_bytes = part.split(b'\r\n\r\n', 1)[1]
-                        if image_bytes.endswith(b'\r\n'):
-                            image_bytes = image_bytes[:-2]
-                        if image_bytes.endswith(b'--'):
-                            image_bytes = image_bytes[:-2]
-                        return image_bytes
-        
-        return raw_data if raw_data else None
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in {**CORS_HEADERS, **(headers or {})}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, dumps(payload))
@@ -0,0 +1,267 @@
+"""
+Active-learning capture of hard samples
+Low-confidence predictions and Gemini/YOLO disagreements are handed to a
+background thread that downscales the image, drops near-duplicates by
+perceptual hash, enforces a disk quota and stores the sample in the YOLO
+dataset layout used by training/ (images/, labels/) together with both
+models' predictions (predictions/). training/export_samples.py merges the
+captured samples into a training split.
+
+With DISTILLATION=true a second writer keeps a sample of every Gemini
+answer (image + Gemini category) as teacher labels for training/distill.py.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from metrics import ACTIVE_LEARNING_SAMPLES
+from utils import CATEGORY_INDEX
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ACTIVE_LEARNING_ENABLED = os.getenv("ACTIVE_LEARNING", "false").lower() == "true"
+CAPTURE_DIR = Path(os.getenv("CAPTURE_DIR", os.path.join(os.path.dirname(__file__), "data", "active_learning")))
+CAPTURE_QUOTA_MB = float(os.getenv("CAPTURE_QUOTA_MB", "500"))
+CAPTURE_MAX_EDGE = int(os.getenv("CAPTURE_MAX_EDGE", "640"))        # stored image size (training imgsz)
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "32"))     # pending samples before dropping
+CAPTURE_HASH_DISTANCE = int(os.getenv("CAPTURE_HASH_DISTANCE", "6"))  # max differing bits for a duplicate
+CAPTURE_COMPARE_RATE = float(os.getenv("CAPTURE_COMPARE_RATE", "0.1"))  # confident Gemini results re-checked with YOLO
+
+DISTILLATION_ENABLED = os.getenv("DISTILLATION", "false").lower() == "true"
+DISTILL_DIR = Path(os.getenv("DISTILL_DIR", os.path.join(os.path.dirname(__file__), "data", "distillation")))
+DISTILL_SAMPLE_RATE = float(os.getenv("DISTILL_SAMPLE_RATE", "0.25"))  # share of Gemini answers kept
+DISTILL_QUOTA_MB = float(os.getenv("DISTILL_QUOTA_MB", "2000"))
+
+CAPTURE_ENABLED = ACTIVE_LEARNING_ENABLED or DISTILLATION_ENABLED
+
+CAPTURE_SUBDIRS = ("images", "labels", "predictions")
+
+
+def perceptual_hash(image, size=8):
+    """
+    64-bit difference hash (dHash): robust to rescaling and recompression
+
+    Returns:
+        int: Hash value
+    """
+    pixels = np.asarray(image.convert("L").resize((size + 1, size), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def capture_reason(gemini, yolo, threshold):
+    """
+    Why a sample is worth keeping
+
+    Args:
+        gemini (dict): Gemini prediction ({"category", "confidence"}) or None
+        yolo (dict): YOLO prediction ({"category", "confidence", "boxes"}) or None
+        threshold (float): Confidence threshold of the API
+
+    Returns:
+        str or None: "disagreement", "low_confidence" or None to skip
+    """
+    if gemini and yolo and gemini["category"] != yolo["category"]:
+        return "disagreement"
+    if any(prediction and prediction["confidence"] < threshold for prediction in (gemini, yolo)):
+        return "low_confidence"
+    return None
+
+
+def yolo_label_lines(gemini, yolo):
+    """
+    Label file lines in YOLO format (class xc yc w h, normalized)
+    Gemini's category, when known, is used as the label for every box;
+    without boxes the whole frame is labelled
+    """
+    boxes = (yolo or {}).get("boxes") or []
+    teacher = CATEGORY_INDEX[gemini["category"]] if gemini else None
+    if not boxes:
+        category = teacher if teacher is not None else CATEGORY_INDEX[yolo["category"]]
+        return [f"{category} 0.5 0.5 1 1"]
+    return [
+        f"{teacher if teacher is not None else int(box[0])} {box[1]:.6f} {box[2]:.6f} {box[3]:.6f} {box[4]:.6f}"
+        for box in boxes
+    ]
+
+
+class SampleCapture:
+    """Background writer for active-learning samples"""
+
+    def __init__(self, directory=CAPTURE_DIR, quota_mb=CAPTURE_QUOTA_MB, max_edge=CAPTURE_MAX_EDGE,
+                 queue_size=CAPTURE_QUEUE_SIZE, hash_distance=CAPTURE_HASH_DISTANCE,
+                 compare_rate=CAPTURE_COMPARE_RATE):
+        self.directory = Path(directory)
+        self.quota_bytes = int(quota_mb * 1024 * 1024)
+        self.max_edge = max_edge
+        self.hash_distance = hash_distance
+        self.compare_rate = compare_rate
+        self.threshold = 0.65
+        self.used_bytes = 0
+        self._hashes = []
+        self._predict = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self, threshold, predict=None):
+        """
+        Args:
+            threshold (float): Confidence below which a prediction is captured
+            predict (callable): image -> YOLO prediction dict, or None while
+                requests are being served; used to compare against Gemini in the
+                background and must not share the serving model's lock
+        """
+        self.threshold = threshold
+        self._predict = predict
+        for subdir in CAPTURE_SUBDIRS:
+            (self.directory / subdir).mkdir(parents=True, exist_ok=True)
+        self.used_bytes = sum(path.stat().st_size for path in self.directory.rglob("*") if path.is_file())
+        self._hashes = []
+        for path in (self.directory / "images").glob("*.jpg"):
+            try:
+                self._hashes.append(int(path.stem, 16))
+            except ValueError:
+                pass
+        self._thread = threading.Thread(target=self._run, name="sample-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Process everything queued and stop the worker"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def wants(self, gemini, yolo):
+        """Cheap request-side filter before a sample is queued"""
+        confident_gemini = yolo is None and gemini and gemini["confidence"] >= self.threshold
+        return not confident_gemini or (self._predict is not None and random.random() < self.compare_rate)
+
+    def reason(self, gemini, yolo):
+        """Why the processed sample is kept (None to skip it)"""
+        return capture_reason(gemini, yolo, self.threshold)
+
+    def submit(self, image, request_id, gemini=None, yolo=None):
+        """Queue a sample without blocking (dropped if the queue is full)"""
+        if self._thread is None or not self.wants(gemini, yolo):
+            return
+        try:
+            self._queue.put_nowait((image, request_id, gemini, yolo))
+        except queue.Full:
+            ACTIVE_LEARNING_SAMPLES.inc("queue_full")
+
+    def _is_duplicate(self, image_hash):
+        return any((image_hash ^ known).bit_count() <= self.hash_distance for known in self._hashes)
+
+    def _process(self, image, request_id, gemini, yolo):
+        if yolo is None and self._predict is not None:
+            yolo = self._predict(image)
+        reason = self.reason(gemini, yolo)
+        if reason is None:
+            ACTIVE_LEARNING_SAMPLES.inc("skipped")
+            return
+
+        image = image.copy()
+        image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+        image_hash = perceptual_hash(image)
+        if self._is_duplicate(image_hash):
+            ACTIVE_LEARNING_SAMPLES.inc("duplicate")
+            return
+
+        name = f"{image_hash:016x}"
+        label = "\n".join(yolo_label_lines(gemini, yolo)) + "\n"
+        prediction = json.dumps({
+            "request_id": request_id,
+            "timestamp": time.time(),
+            "reason": reason,
+            "gemini": gemini,
+            "yolo": yolo,
+        }, default=float)
+        image_path = self.directory / "images" / f"{name}.jpg"
+        image.save(image_path, format="JPEG", quality=90)
+        size = image_path.stat().st_size + len(label) + len(prediction)
+        if self.used_bytes + size > self.quota_bytes:
+            image_path.unlink()
+            ACTIVE_LEARNING_SAMPLES.inc("quota")
+            return
+
+        (self.directory / "labels" / f"{name}.txt").write_text(label)
+        (self.directory / "predictions" / f"{name}.json").write_text(prediction)
+        self.used_bytes += size
+        self._hashes.append(image_hash)
+        ACTIVE_LEARNING_SAMPLES.inc(reason)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._process(*item)
+            except Exception as e:
+                ACTIVE_LEARNING_SAMPLES.inc("error")
+                logger.exception("Sample capture failed: %s", e)
+
+
+class TeacherCapture(SampleCapture):
+    """
+    Keeps a sample of Gemini answers as (image, Gemini category) distillation pairs
+
+    Boxes come from the request's own YOLO result or from the capture check,
+    which only runs while no requests are being served; otherwise the teacher
+    label covers the whole frame and no YOLO pass is made.
+    """
+
+    def __init__(self, directory=DISTILL_DIR, quota_mb=DISTILL_QUOTA_MB, sample_rate=DISTILL_SAMPLE_RATE, **kwargs):
+        super().__init__(directory, quota_mb, **kwargs)
+        self.sample_rate = sample_rate
+
+    def wants(self, gemini, yolo):
+        return gemini is not None and random.random() < self.sample_rate
+
+    def reason(self, gemini, yolo):
+        return "teacher"
+
+
+_captures = []
+if ACTIVE_LEARNING_ENABLED:
+    _captures.append(SampleCapture())
+if DISTILLATION_ENABLED:
+    _captures.append(TeacherCapture())
+
+
+def start_capture(threshold, predict=None):
+    """Start the capture workers (no-op unless ACTIVE_LEARNING or DISTILLATION is true)"""
+    for capture in _captures:
+        capture.start(threshold, predict)
+        print(f"🧪 Sample capture: {capture.directory} (quota {capture.quota_bytes / 1024 / 1024:g} MB)")
+
+
+def stop_capture():
+    for capture in _captures:
+        capture.stop()
+
+
+def capture_sample(image, request_id, gemini=None, yolo=None):
+    """
+    Offer one classified image for capture (non-blocking)
+
+    Args:
+        image (PIL.Image): Decoded RGB image (must not be modified afterwards)
+        request_id (str): Request id from the trace
+        gemini (dict): Gemini prediction, if Gemini answered
+        yolo (dict): YOLO prediction, if YOLO ran
+    """
+    for capture in _captures:
+        capture.submit(image, request_id, gemini, yolo)
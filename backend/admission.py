@@ -0,0 +1,176 @@
+"""
+Admission control for the classify endpoint
+Caps concurrent inference per worker, holds a bounded FIFO of waiting
+requests with deadlines, and sheds load with a fast 503 + Retry-After when
+the queue is full or a request could not start before its deadline
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from metrics import ADMISSION_REJECTED, ADMISSION_WAIT
+from responses import FastJSONResponse
+
+# Configuration
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "4"))                 # concurrent classifications per worker
+MAX_QUEUE = int(os.getenv("ADMISSION_QUEUE", "16"))                  # waiting requests before shedding
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", "15"))          # seconds a request may wait
+DEGRADE_QUEUE_DEPTH = int(os.getenv("DEGRADE_QUEUE_DEPTH", str(max(1, MAX_QUEUE // 2))))  # static tips from here
+
+BUSY_MESSAGE = "Server is busy, please try again shortly"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; carries the suggested Retry-After"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded, deadline-aware wait queue
+    All methods must be called from the event loop thread
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT, degrade_depth=DEGRADE_QUEUE_DEPTH):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.degrade_depth = degrade_depth
+        self.in_flight = 0
+        self.service_time = None  # moving average of seconds per classification
+        self._waiters = deque()  # (future, deadline)
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def is_saturated(self):
+        """True when a new request would be rejected outright"""
+        return self.in_flight >= self.max_in_flight and len(self._waiters) >= self.max_queue
+
+    def should_degrade(self):
+        """True when the backlog is deep enough to skip optional Gemini calls"""
+        return len(self._waiters) >= self.degrade_depth
+
+    def expected_wait(self, position=None):
+        """Estimated seconds until a request at `position` in the queue starts"""
+        if position is None:
+            position = len(self._waiters)
+        if self.service_time is None:
+            return 0.0
+        return self.service_time * (position + 1) / self.max_in_flight
+
+    def retry_after(self):
+        """Whole seconds a shed client should wait before retrying"""
+        return min(60, max(1, math.ceil(self.expected_wait())))
+
+    def _reject(self, reason):
+        ADMISSION_REJECTED.inc(reason)
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self):
+        """
+        Wait for an inference slot
+
+        Raises:
+            Overloaded: Queue full, or the slot would not free up before the deadline
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            ADMISSION_WAIT.observe(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        # Drop early instead of letting the request time out in the queue
+        if self.expected_wait() > self.queue_timeout:
+            raise self._reject("deadline")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        future = loop.create_future()
+        waiter = (future, started + self.queue_timeout)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            raise self._reject("deadline")
+        except BaseException:
+            self._discard(waiter)
+            # The slot may have been handed over just before cancellation
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release()
+            raise
+        ADMISSION_WAIT.observe(loop.time() - started)
+
+    def _discard(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, service_time=None):
+        """Free a slot, handing it directly to the oldest waiter still within its deadline"""
+        if service_time is not None:
+            previous = self.service_time
+            self.service_time = service_time if previous is None else 0.8 * previous + 0.2 * service_time
+        now = asyncio.get_running_loop().time()
+        while self._waiters:
+            future, deadline = self._waiters.popleft()
+            if future.done():
+                continue
+            if deadline <= now:
+                ADMISSION_REJECTED.inc("deadline")
+                future.set_exception(Overloaded("deadline", self.retry_after()))
+                continue
+            future.set_result(None)
+            return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold an inference slot for the duration of the block"""
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+
+def overloaded_response(retry_after):
+    """Fast 503 telling the client when to retry"""
+    return FastJSONResponse(
+        {"detail": BUSY_MESSAGE},
+        status_code=503,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that rejects requests to guarded paths before their
+    upload is read when the controller is already saturated
+    """
+
+    def __init__(self, app, controller, paths=("/api/classify",)):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.paths and self.controller.is_saturated():
+            ADMISSION_REJECTED.inc("queue_full")
+            response = overloaded_response(self.controller.retry_after())
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
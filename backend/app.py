@@ -4,15 +4,18 @@ Classifies waste into: ORGANIC, RECYCLABLE, HAZARDOUS
 Uses Gemini Vision AI (primary) + YOLOv8 (fallback) for intelligent waste segregation
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-from ultralytics import YOLO
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, PlainTextResponse
+from starlette.background import BackgroundTasks
 from PIL import Image
 import io
 import os
-from datetime import datetime
+import hashlib
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import logging
 from pathlib import Path
@@ -25,24 +28,72 @@ print(f"📁 Loaded .env from: {env_path}")
 
 # Import custom modules
 from utils import (
-    get_dustbin_color, 
-    get_dustbin_icon, 
-    normalize_class_name,
+    classify_detections,
+    get_fallback_awareness_tip,
     validate_image_format
 )
 from gemini_service import generate_awareness_tip, generate_safety_warning, classify_with_gemini_vision
+from responses import (
+    UPLOAD_SETTINGS,
+    FastJSONResponse,
+    build_categories_payload,
+    build_classification_response,
+    build_gemini_response,
+    build_no_detection_response,
+    cached_bytes_response,
+    utc_timestamp
+)
+from static_assets import load_static_assets, serve_asset
+from metrics import (
+    CACHE_HITS,
+    CATEGORIES_RETURNED,
+    CORRECTIONS,
+    FALLBACKS,
+    REQUEST_LATENCY,
+    REQUESTS,
+    TTA_RUNS,
+    MetricsSync,
+    METRICS_SYNC_INTERVAL,
+    observe_stage,
+    render_metrics
+)
+from profiling import find_profile, is_authorized, slowest_requests, start_trace
+from admission import BUSY_MESSAGE, AdmissionController, AdmissionMiddleware, Overloaded
+from compression import COMPRESSION_ENABLED, CompressionMiddleware
+from logging_config import setup_logging
+from autotune import configure_torch_threads
+from history import hourly_distribution, record_result, start_history, stop_history, summary
+from active_learning import CAPTURE_ENABLED, capture_sample, start_capture, stop_capture
+from tta import TTA_ENABLED, TestTimeAugmentation
+from model_registry import ModelManager, is_admin, list_versions, load_model, previous_version, read_current
+from shadow import publish_candidate, shadow, start_shadow, stop_shadow
+from shadow import report as shadow_report
+from shared_state import MemoryState, cache_get_json, cache_set_json, get_state, is_shared, set_state
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (JSON lines written from a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Waste Classification API",
     description="Personal waste-segregation assistant powered by YOLOv8 and Gemini AI",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Admission control: bounded in-flight classifications plus a deadline-aware
+# wait queue; saturated workers answer 503 before reading the upload
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# Blocking Gemini/YOLO work runs here, off the event loop
+inference_executor = ThreadPoolExecutor(max_workers=admission.max_in_flight, thread_name_prefix="inference")
+# Pushes this worker's metrics into the shared store (started with a shared backend)
+metrics_sync = None
+# Optional test-time augmentation for predictions below CONFIDENCE_THRESHOLD
+tta = TestTimeAugmentation() if TTA_ENABLED else None
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -52,35 +103,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for JSON responses over COMPRESS_MIN_SIZE (the explanation and
+# tip make classification responses 1-2 KB)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Configuration
 MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(os.path.dirname(__file__), 'model', 'best.pt'))
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.65"))
+YOLO_IMGSZ = int(os.getenv("YOLO_IMGSZ", "0"))  # inference size (training/sweep.py); 0 = the model's training size
+YOLO_ARGS = {"imgsz": YOLO_IMGSZ} if YOLO_IMGSZ else {}
 MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", "10485760"))  # 10MB
 FRONTEND_PATH = Path(__file__).parent.parent / "frontend"
+# Outcomes persisted to the classification history
+HISTORY_PATHS = frozenset({"local", "gemini", "yolo", "no_detection", "cached"})
+# Shared across workers (shared_state.py); 0 disables
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))   # identical uploads answered from cache
+TIP_CACHE_TTL = int(os.getenv("TIP_CACHE_TTL", "86400"))        # Gemini tips per (category, item)
+# Paths whose responses are cached by upload hash
+CACHEABLE_PATHS = frozenset({"local", "gemini", "yolo", "no_detection"})
+STATS_MAX_HOURS = 24 * 90
+CATEGORIES_CACHE_CONTROL = "public, max-age=3600"
+
+# /api/categories never changes at runtime - serialize it once
+CATEGORIES_BODY, CATEGORIES_ETAG = build_categories_payload(CONFIDENCE_THRESHOLD, UPLOAD_SETTINGS)
 
-# Global model variable
-model: Optional[YOLO] = None
+# Fingerprinted, precompressed frontend assets (built once per worker)
+STATIC_ASSETS = load_static_assets(FRONTEND_PATH) if FRONTEND_PATH.exists() else {}
+
+# Serving model: registry version (or MODEL_PATH), hot-swappable. Each request
+# reads models.current once and keeps that LoadedModel (weights, class-id ->
+# category table, local-first decision and lock) until it finishes.
+models = ModelManager(MODEL_PATH, predict_args=YOLO_ARGS)
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load YOLOv8 model on application startup"""
-    global model
     try:
-        logger.info(f"Loading model from: {MODEL_PATH}")
-        model = YOLO(MODEL_PATH)
-        logger.info("✅ Model loaded successfully")
+        logger.info(f"Torch intra-op threads: {configure_torch_threads()}")
+        current = models.load_initial()
+        logger.info(f"✅ Model {current.version} loaded from {current.path}")
+        logger.info(f"Local model {'preferred' if current.prefer_local else 'used as fallback'}: "
+                    f"{current.local_reason}")
+        if tta is not None:
+            logger.info(f"TTA for uncertain predictions: up to {tta.max_views} views within {tta.budget_ms:g} ms")
     except Exception as e:
         logger.error(f"❌ Failed to load model: {str(e)}")
         raise RuntimeError(f"Model loading failed: {str(e)}")
+    start_history()
+    start_capture(CONFIDENCE_THRESHOLD, predict_for_capture)
+    start_shared_state()
+    models.start_watching()
+    start_shadow(busy=foreground_busy, predict_args=YOLO_ARGS)
+
+
+def start_shared_state():
+    """Connect the cross-worker store; a failing store degrades to process-local state"""
+    global metrics_sync
+    try:
+        state = get_state()
+        state.ping()
+    except Exception as e:
+        logger.warning(f"⚠️ Shared state unavailable, using process-local state: {e}")
+        state = MemoryState()
+        set_state(state)
+    logger.info(f"Shared state: {type(state).__name__}")
+    if is_shared(state) and METRICS_SYNC_INTERVAL > 0:
+        metrics_sync = MetricsSync(state)
+        metrics_sync.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued history rows, captured samples and metric increments"""
+    models.stop_watching()
+    stop_shadow()
+    stop_history()
+    stop_capture()
+    if metrics_sync is not None:
+        metrics_sync.stop()
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve frontend HTML"""
-    index_path = FRONTEND_PATH / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+    index_asset = STATIC_ASSETS.get("index.html")
+    if index_asset:
+        return serve_asset(request, index_asset)
     else:
         return {
             "message": "Waste Classification API",
@@ -93,24 +203,122 @@ async def root():
         }
 
 
-# Mount static files for frontend
-if FRONTEND_PATH.exists():
-    app.mount("/static", StaticFiles(directory=str(FRONTEND_PATH)), name="static")
+@app.get("/static/{asset_path:path}")
+async def static_asset(asset_path: str, request: Request):
+    """Serve frontend assets (hashed names are cached forever, others revalidated)"""
+    asset = STATIC_ASSETS.get(asset_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    response = serve_asset(request, asset)
+    if response.status_code == 304:
+        CACHE_HITS.inc("static_304")
+    return response
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint for deployment monitoring"""
+    current = models.current
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "model_path": MODEL_PATH,
-        "timestamp": datetime.utcnow().isoformat()
+        "model_loaded": current is not None,
+        "model_path": current.path if current else MODEL_PATH,
+        "model_version": current.version if current else None,
+        "prefer_local_model": current.prefer_local if current else False,
+        "in_flight": admission.in_flight,
+        "queue_depth": admission.queue_depth,
+        "timestamp": utc_timestamp()
     }
 
 
+def generate_tip(item_name, category, confidence, trace, degraded=False, local_only=False):
+    """
+    Generate the awareness tip as its own timed stage
+
+    Returns the static tip when degraded. With local_only (answers of the
+    distilled model) Gemini is never called: a cached tip or the static one.
+    """
+    if degraded:
+        FALLBACKS.inc("degraded_tip")
+        return get_fallback_awareness_tip(category)
+    cache_key = f"tip:{category}:{str(item_name).strip().lower()}" if TIP_CACHE_TTL else None
+    with observe_stage("tip_generation", trace.timings):
+        tip = cache_get_json(cache_key) if cache_key else None
+        if tip is not None:
+            CACHE_HITS.inc("tip")
+            return tip
+        if local_only:
+            FALLBACKS.inc("local_tip")
+            return get_fallback_awareness_tip(category)
+        tip = generate_awareness_tip(item_name, category, confidence)
+    if tip == get_fallback_awareness_tip(category):
+        FALLBACKS.inc("static_tip")
+    elif cache_key:
+        cache_set_json(cache_key, tip, TIP_CACHE_TTL)
+    return tip
+
+
+def capture_boxes(boxes, class_table):
+    """YOLO boxes as [category index, xc, yc, w, h, confidence] rows (normalized)"""
+    categories = class_table[boxes.cls.cpu().numpy().astype(int)]
+    return [
+        [int(category), *(float(value) for value in xywhn), float(confidence)]
+        for category, xywhn, confidence in zip(categories, boxes.xywhn.cpu().numpy(), boxes.conf.cpu().numpy())
+    ]
+
+
+def foreground_busy():
+    """True while classify requests are running or waiting in this worker"""
+    return admission.in_flight > 0 or admission.queue_depth > 0
+
+
+# The capture thread's own copy of the serving version: background checks
+# never take the serving model's lock, so they cannot hold up a request
+_capture_model = None
+
+
+def predict_for_capture(image):
+    """
+    Background YOLO check of a Gemini result (capture thread only)
+
+    Returns:
+        dict or None: YOLO prediction; None when nothing was detected or
+            while foreground requests are running (the sample is then kept
+            with Gemini's label alone)
+    """
+    global _capture_model
+    current = models.current
+    if current is None or foreground_busy():
+        return None
+    if _capture_model is None or _capture_model.version != current.version:
+        _capture_model = load_model(current.path, current.version, YOLO_ARGS, warmup_runs=0)
+    results = _capture_model.model(image, verbose=False, **YOLO_ARGS)
+    if not results or len(results[0].boxes) == 0:
+        return None
+    boxes = results[0].boxes
+    detection = classify_detections(
+        [(boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy())], _capture_model.class_table, results[0].names
+    )[0]
+    return yolo_prediction(detection, boxes, _capture_model.class_table)
+
+
+def record_classification(path, trace, category=None, confidence=None, detected_item=None):
+    """Record the outcome of one classify_waste call in the metrics, trace and history"""
+    duration = time.perf_counter() - trace.started
+    REQUEST_LATENCY.observe(duration, path)
+    REQUESTS.inc(path)
+    if category:
+        CATEGORIES_RETURNED.inc(category)
+    trace.path = path
+    trace.category = category
+    if path in HISTORY_PATHS:
+        low_confidence = confidence is not None and confidence < CONFIDENCE_THRESHOLD
+        record_result(trace.request_id, category, path, confidence, detected_item,
+                      round(duration * 1000, 3), low_confidence)
+
+
 @app.post("/api/classify")
-async def classify_waste(file: UploadFile = File(...)):
+async def classify_waste(request: Request, file: UploadFile = File(...)):
     """
     Main classification endpoint
     
@@ -119,14 +327,33 @@ async def classify_waste(file: UploadFile = File(...)):
     - Dustbin color and icon
     - AI-generated awareness tip
     - Confidence score
+    
+    Send the PROFILING_SECRET as X-Profile header (or ?profile=) to capture
+    a flame graph of this request.
     """
-    # Validate model is loaded
-    if model is None:
+    trace = start_trace(request)
+    try:
+        response = await run_classification(file, trace)
+    finally:
+        entry = trace.finish()
+        logger.info("classify", extra=entry)
+    response.headers.update(trace.response_headers())
+    return response
+
+
+async def run_classification(file: UploadFile, trace):
+    """Classify one uploaded image (see classify_waste)"""
+    # Validate model is loaded - this request keeps using this version even if it is swapped
+    current = models.current
+    if current is None:
+        record_classification("error", trace)
         raise HTTPException(status_code=500, detail="Model not loaded")
     
     # Validate file size
-    contents = await file.read()
+    with observe_stage("body_read", trace.timings):
+        contents = await file.read()
     if len(contents) > MAX_IMAGE_SIZE:
+        record_classification("rejected", trace)
         raise HTTPException(
             status_code=413, 
             detail=f"File too large. Maximum size: {MAX_IMAGE_SIZE/1024/1024}MB"
@@ -141,161 +368,235 @@ async def classify_waste(file: UploadFile = File(...)):
     is_valid_by_type = file.content_type and file.content_type.lower() in valid_content_types
     
     if not is_valid_by_name and not is_valid_by_type:
-        logger.warning(f"Invalid file: name={file.filename}, type={file.content_type}")
+        logger.warning("Invalid file: name=%s, type=%s", file.filename, file.content_type,
+                       extra={"request_id": trace.request_id})
+        record_classification("rejected", trace)
         raise HTTPException(
             status_code=400,
             detail="Invalid file format. Supported: JPG, PNG, JPEG, BMP, WEBP, GIF, TIFF"
         )
     
+    loop = asyncio.get_running_loop()
+    cache_key = f"result:{current.version}:{hashlib.sha256(contents).hexdigest()}" if RESULT_CACHE_TTL else None
+    if cache_key:
+        cached = await loop.run_in_executor(None, cache_get_json, cache_key)
+        if cached is not None:
+            CACHE_HITS.inc("result")
+            cached["timestamp"] = utc_timestamp()
+            record_classification("cached", trace, cached.get("category"), cached.get("confidence"),
+                                  cached.get("detected_item"))
+            return FastJSONResponse(cached)
+
+    try:
+        async with admission.slot():
+            degraded = admission.should_degrade()
+            response = await loop.run_in_executor(inference_executor, classify_image, contents, trace, degraded,
+                                                  current)
+    except Overloaded as e:
+        record_classification("shed", trace)
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE, headers={"Retry-After": str(e.retry_after)})
+
+    # Starlette runs background tasks once the response has been sent
+    tasks = BackgroundTasks()
+    # Degraded answers carry the static tip - let a later upload get the full one
+    if cache_key and not degraded and trace.path in CACHEABLE_PATHS and response.status_code == 200:
+        tasks.add_task(cache_set_json, cache_key, json.loads(response.body), RESULT_CACHE_TTL)
+    if trace.path in CACHEABLE_PATHS and response.status_code == 200 and shadow.wants():
+        tasks.add_task(submit_shadow, contents, trace, response.body, current.version)
+    if tasks.tasks:
+        response.background = tasks
+    return response
+
+
+def submit_shadow(contents, trace, body, version):
+    """Hand an answered request to the candidate model (see shadow.py)"""
+    answer = json.loads(body)
+    detected = trace.path != "no_detection"  # its category is the safe default, not a prediction
+    production = {"path": trace.path, "version": version,
+                  "category": answer.get("category") if detected else None,
+                  "confidence": answer.get("confidence") if detected else None}
+    shadow.submit(contents, trace.request_id, production, trace.timings)
+
+
+def classify_image(contents, trace, degraded, current):
+    """Blocking part of classify_waste, run on the inference executor"""
+    with trace.profiled():
+        return _classify_image(contents, trace, degraded, current)
+
+
+def run_yolo(image, trace, current):
+    """
+    Run YOLO and resolve its detections through the category rules
+
+    Args:
+        current (LoadedModel): Model version serving this request
+
+    Returns:
+        tuple: (detection dict, boxes) or None if nothing was detected
+    """
+    with current.lock, observe_stage("yolo_inference", trace.timings):
+        results = current.model(image, verbose=False, **YOLO_ARGS)
+    if len(results) == 0 or len(results[0].boxes) == 0:
+        return None
+
+    with observe_stage("postprocess", trace.timings):
+        boxes = results[0].boxes
+        detection = classify_detections(
+            [(boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy())],
+            current.class_table,
+            results[0].names,
+        )[0]
+        if trace.verbose:
+            logger.info("YOLO detections", extra={
+                "request_id": trace.request_id,
+                "scores": detection["scores"],
+                "correction": detection["correction"],
+            })
+        if detection["correction"]:
+            CORRECTIONS.inc(detection["correction"])
+
+    if tta is not None and detection["confidence"] < CONFIDENCE_THRESHOLD:
+        with current.lock, observe_stage("tta", trace.timings):
+            refined = tta.refine(current.model, image, detection, current.class_table,
+                                 trace.timings.get("yolo_inference", 0.0) * 1000, YOLO_ARGS)
+        if refined is None:
+            TTA_RUNS.inc("skipped")
+        else:
+            TTA_RUNS.inc("recovered" if refined["confidence"] >= CONFIDENCE_THRESHOLD else "uncertain")
+            if trace.verbose:
+                logger.info("TTA", extra={
+                    "request_id": trace.request_id,
+                    "views": refined["tta_views"],
+                    "before": detection["scores"],
+                    "after": refined["scores"],
+                })
+            if refined["correction"]:
+                CORRECTIONS.inc(refined["correction"])
+            detection = refined
+    return detection, boxes
+
+
+def yolo_prediction(detection, boxes, class_table):
+    """YOLO prediction in the form stored by sample capture"""
+    return {
+        "category": detection["category"],
+        "confidence": float(detection["confidence"]),
+        "item": detection["detected_item"],
+        "boxes": capture_boxes(boxes, class_table),
+    }
+
+
+def yolo_response(image, detection, boxes, trace, degraded, path, current):
+    """Build (and record) the response for a YOLO answer"""
+    category = detection["category"]
+    confidence = detection["confidence"]
+    yolo_class_name = detection["detected_item"]
+    if CAPTURE_ENABLED:
+        capture_sample(image, trace.request_id, yolo=yolo_prediction(detection, boxes, current.class_table))
+
+    # Apply safety threshold - but be smart about it
+    # ORGANIC is safe even if wrong (compost), so don't override it
+    # HAZARDOUS should stay HAZARDOUS 
+    # Only apply strict threshold to RECYCLABLE (wrong recycling is bad)
+    is_safe_classification = confidence >= CONFIDENCE_THRESHOLD
+    if not is_safe_classification and category == "RECYCLABLE":
+        # Low confidence recyclable -> default to GENERAL (safer)
+        category = "GENERAL"
+        CORRECTIONS.inc("low_confidence->GENERAL")
+    elif not is_safe_classification and category not in ["ORGANIC", "HAZARDOUS"]:
+        # Unknown low confidence -> GENERAL (not HAZARDOUS, to avoid confusion)
+        category = "GENERAL"
+        CORRECTIONS.inc("low_confidence->GENERAL")
+    
+    # Generate awareness tip using Gemini (the local path never waits on Gemini)
+    awareness_tip = generate_tip(yolo_class_name, category, confidence, trace, degraded,
+                                 local_only=path == "local")
+    
+    # Generate safety warning if needed
+    safety_warning = generate_safety_warning(confidence)
+    
+    # Build response from the category template
+    fields = {"model_used": "YOLOv8 (local)"} if path == "local" else {}
+    response = build_classification_response(
+        category,
+        confidence=round(confidence, 4),
+        explanation=awareness_tip,
+        safety_warning=safety_warning,
+        is_safe_classification=is_safe_classification,
+        detected_item=yolo_class_name,
+        model_version=current.version,
+        **fields
+    )
+    
+    record_classification(path, trace, category, confidence, yolo_class_name)
+    return FastJSONResponse(response)
+
+
+def _classify_image(contents, trace, degraded, current):
     try:
         # Process image
-        image = Image.open(io.BytesIO(contents))
+        with observe_stage("decode", trace.timings):
+            image = Image.open(io.BytesIO(contents))
+            
+            # Convert to RGB if needed (handle RGBA, grayscale, etc.)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
         
-        # Convert to RGB if needed (handle RGBA, grayscale, etc.)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        # ===== LOCAL FIRST: distilled model answers confident cases =====
+        local = None
+        if current.prefer_local:
+            local = run_yolo(image, trace, current)
+            if local and local[0]["confidence"] >= CONFIDENCE_THRESHOLD:
+                return yolo_response(image, *local, trace, degraded, "local", current)
         
         # ===== PRIMARY: Try Gemini Vision for accurate classification =====
-        logger.info("🔍 Attempting Gemini Vision classification...")
-        gemini_category, gemini_item, gemini_confidence = classify_with_gemini_vision(image)
+        with observe_stage("gemini_vision", trace.timings):
+            gemini_category, gemini_item, gemini_confidence = classify_with_gemini_vision(image)
         
         if gemini_category and gemini_confidence > 0:
             # Gemini Vision succeeded - use its result
-            logger.info(f"✅ Gemini Vision: {gemini_category} ({gemini_item}) - {gemini_confidence:.2%}")
+            if trace.verbose:
+                logger.info("Gemini Vision: %s (%s) - %.2f%%", gemini_category, gemini_item,
+                            gemini_confidence * 100, extra={"request_id": trace.request_id})
             
             category = gemini_category
             detected_item = gemini_item
             confidence = gemini_confidence
-            is_safe_classification = True
-            
-            # Get dustbin info
-            dustbin_color = get_dustbin_color(category)
-            dustbin_icon = get_dustbin_icon(category)
             
             # Generate awareness tip
-            awareness_tip = generate_awareness_tip(detected_item, category, confidence)
-            safety_warning = ""
+            awareness_tip = generate_tip(detected_item, category, confidence, trace, degraded)
             
-            return {
-                "success": True,
-                "category": category,
-                "confidence": round(confidence, 4),
-                "dustbin_color": dustbin_color,
-                "dustbin_icon": dustbin_icon,
-                "explanation": awareness_tip,
-                "safety_warning": safety_warning,
-                "is_safe_classification": is_safe_classification,
-                "detected_item": detected_item,
-                "timestamp": datetime.utcnow().isoformat(),
-                "model_used": "Gemini Vision AI"
-            }
+            record_classification("gemini", trace, category, confidence, detected_item)
+            if CAPTURE_ENABLED:
+                capture_sample(
+                    image, trace.request_id,
+                    gemini={"category": category, "confidence": confidence, "item": detected_item},
+                    yolo=yolo_prediction(*local, current.class_table) if local else None,
+                )
+            return FastJSONResponse(build_gemini_response(
+                category, detected_item, confidence, CONFIDENCE_THRESHOLD,
+                explanation=awareness_tip,
+                model_version=current.version
+            ))
         
         # ===== FALLBACK: Use YOLO model if Gemini fails =====
-        logger.info("⚠️ Gemini unavailable, falling back to YOLO model...")
-        results = model(image, verbose=False)
+        FALLBACKS.inc("yolo")
+        if not current.prefer_local:
+            local = run_yolo(image, trace, current)
         
-        # Process results
-        if len(results) > 0 and len(results[0].boxes) > 0:
-            # Extract predictions
-            boxes = results[0].boxes
-            confidences = boxes.conf.cpu().numpy()
-            classes = boxes.cls.cpu().numpy()
-            
-            # Get highest confidence prediction
-            max_conf_idx = confidences.argmax()
-            predicted_class_id = int(classes[max_conf_idx])
-            confidence = float(confidences[max_conf_idx])
-            
-            # Get class name from model
-            class_names = results[0].names
-            yolo_class_name = class_names[predicted_class_id]
-            
-            # Normalize to standard categories
-            category = normalize_class_name(yolo_class_name)
-            
-            # SMART CORRECTION: Fix model bias towards RECYCLABLE
-            # Check if other classes have decent scores
-            all_detections = {}
-            for i, (cls_id, conf) in enumerate(zip(classes, confidences)):
-                cls_name = class_names[int(cls_id)]
-                if cls_name not in all_detections or conf > all_detections[cls_name]:
-                    all_detections[cls_name] = float(conf)
-            
-            logger.info(f"All detections: {all_detections}")
-            
-            # If predicted RECYCLABLE but HAZARDOUS or GENERAL has >20% confidence, reconsider
-            if category == "RECYCLABLE" and confidence < 0.80:
-                if all_detections.get("HAZARDOUS", 0) > 0.20:
-                    category = "HAZARDOUS"
-                    confidence = all_detections["HAZARDOUS"]
-                    yolo_class_name = "HAZARDOUS"
-                    logger.info("⚠️ Corrected: RECYCLABLE -> HAZARDOUS (safety)")
-                elif all_detections.get("GENERAL", 0) > 0.25:
-                    category = "GENERAL"
-                    confidence = all_detections["GENERAL"]
-                    yolo_class_name = "GENERAL"
-                    logger.info("⚠️ Corrected: RECYCLABLE -> GENERAL")
-            
-            # Apply safety threshold - but be smart about it
-            # ORGANIC is safe even if wrong (compost), so don't override it
-            # HAZARDOUS should stay HAZARDOUS 
-            # Only apply strict threshold to RECYCLABLE (wrong recycling is bad)
-            is_safe_classification = confidence >= CONFIDENCE_THRESHOLD
-            if not is_safe_classification and category == "RECYCLABLE":
-                # Low confidence recyclable -> default to GENERAL (safer)
-                category = "GENERAL"
-                logger.warning(f"Low confidence ({confidence:.2f}) recyclable -> GENERAL")
-            elif not is_safe_classification and category not in ["ORGANIC", "HAZARDOUS"]:
-                # Unknown low confidence -> GENERAL (not HAZARDOUS, to avoid confusion)
-                category = "GENERAL"
-                logger.warning(f"Low confidence ({confidence:.2f}), classifying as GENERAL")
-            
-            # Get dustbin info
-            dustbin_color = get_dustbin_color(category)
-            dustbin_icon = get_dustbin_icon(category)
-            
-            # Generate awareness tip using Gemini
-            logger.info("Generating awareness tip...")
-            awareness_tip = generate_awareness_tip(yolo_class_name, category, confidence)
-            
-            # Generate safety warning if needed
-            safety_warning = generate_safety_warning(confidence)
-            
-            # Build response
-            response = {
-                "success": True,
-                "category": category,
-                "confidence": round(confidence, 4),
-                "dustbin_color": dustbin_color,
-                "dustbin_icon": dustbin_icon,
-                "explanation": awareness_tip,
-                "safety_warning": safety_warning,
-                "is_safe_classification": is_safe_classification,
-                "detected_item": yolo_class_name,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            logger.info(f"✅ Classification successful: {category} (confidence: {confidence:.2f})")
-            return response
+        if local:
+            return yolo_response(image, *local, trace, degraded, "yolo", current)
         
         else:
             # No waste detected
-            logger.warning("No waste detected in image")
-            return {
-                "success": False,
-                "category": "HAZARDOUS",  # Safety default
-                "confidence": 0.0,
-                "dustbin_color": "red",
-                "dustbin_icon": "warning",
-                "explanation": "No recognizable waste item detected. For safety, treat unknown items as hazardous waste.",
-                "safety_warning": "⚠️ Unable to identify item - dispose as HAZARDOUS for safety",
-                "is_safe_classification": False,
-                "detected_item": None,
-                "timestamp": datetime.utcnow().isoformat()
-            }
+            response = build_no_detection_response()
+            response["model_version"] = current.version
+            record_classification("no_detection", trace, response["category"])
+            return FastJSONResponse(response)
     
     except Exception as e:
-        logger.error(f"❌ Classification error: {str(e)}")
+        logger.error("Classification error: %s", e, exc_info=True, extra={"request_id": trace.request_id})
+        record_classification("error", trace)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing image: {str(e)}"
@@ -303,33 +604,146 @@ async def classify_waste(file: UploadFile = File(...)):
 
 
 @app.get("/api/categories")
-async def get_categories():
+async def get_categories(request: Request):
     """Get available waste categories and their properties"""
+    response = cached_bytes_response(request, CATEGORIES_BODY, CATEGORIES_ETAG, CATEGORIES_CACHE_CONTROL)
+    if response.status_code == 304:
+        CACHE_HITS.inc("categories_304")
+    return response
+
+
+@app.get("/api/stats/summary")
+def stats_summary(hours: int = 24):
+    """Category distribution, Gemini vs YOLO share and low-confidence rate over the last hours"""
+    return summary(min(max(hours, 1), STATS_MAX_HOURS))
+
+
+@app.get("/api/stats/hourly")
+def stats_hourly(hours: int = 24):
+    """Category counts per hour over the last hours"""
+    return {"hours": hourly_distribution(min(max(hours, 1), STATS_MAX_HOURS))}
+
+
+@app.get("/debug/slow-requests")
+async def debug_slow_requests(request: Request):
+    """Slowest recent classify requests with stage breakdown (requires PROFILING_SECRET)"""
+    if not is_authorized(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"requests": slowest_requests()}
+
+
+@app.get("/debug/profiles/{profile_id}")
+async def debug_profile(profile_id: str, request: Request):
+    """Download a stored flame graph (speedscope JSON or folded stacks)"""
+    if not is_authorized(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    path, media_type = find_profile(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type=media_type)
+
+
+@app.get("/api/admin/models")
+def admin_models(request: Request):
+    """Registered model versions and the state of this worker's model (requires ADMIN_SECRET)"""
+    if not is_admin(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    current = models.current
     return {
-        "categories": [
-            {
-                "name": "ORGANIC",
-                "dustbin_color": "green",
-                "icon": "leaf",
-                "description": "Organic waste that decomposes naturally. Examples: food scraps, garden waste."
-            },
-            {
-                "name": "RECYCLABLE",
-                "dustbin_color": "blue",
-                "icon": "recycle",
-                "description": "Materials that can be reprocessed. Examples: plastic, paper, glass, metal."
-            },
-            {
-                "name": "HAZARDOUS",
-                "dustbin_color": "red",
-                "icon": "warning",
-                "description": "Waste that poses risks to health or environment. Examples: batteries, chemicals, e-waste."
-            }
-        ],
-        "confidence_threshold": CONFIDENCE_THRESHOLD
+        "serving": current.version if current else None,
+        "activated": read_current(models.registry),
+        "status": models.status,
+        "versions": list_versions(models.registry),
     }
 
 
+@app.post("/api/admin/models/{version}/activate", status_code=202)
+def admin_activate_model(version: str, request: Request):
+    """
+    Load, warm and switch to a registered version without a restart
+    This worker swaps in the background; the others follow current.json
+    within MODEL_WATCH_INTERVAL
+    """
+    if not is_admin(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        models.activate_in_background(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    logger.info(f"Model activation requested: {version}")
+    return {"version": version, "state": "loading"}
+
+
+@app.post("/api/admin/models/rollback", status_code=202)
+def admin_rollback_model(request: Request):
+    """Switch back to the previously activated version"""
+    if not is_admin(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    version = previous_version(models.registry)
+    if not version:
+        raise HTTPException(status_code=409, detail="No previous model version")
+    models.activate_in_background(version)
+    logger.info(f"Model rollback requested: {version}")
+    return {"version": version, "state": "loading"}
+
+
+@app.post("/api/admin/models/{version}/shadow")
+def admin_shadow_model(version: str, request: Request):
+    """
+    Run a registered version in shadow mode on a sample of live traffic
+    (all workers follow within a few seconds)
+    """
+    if not is_admin(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    if version not in {info["version"] for info in list_versions(models.registry)}:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    try:
+        publish_candidate(version)
+    except Exception as e:
+        logger.warning(f"⚠️ Shadow candidate not shared with other workers: {e}")
+    shadow.set_candidate(version)
+    logger.info(f"Shadow evaluation started: {version}")
+    return {"candidate": version, "sample_rate": shadow.sample_rate}
+
+
+@app.delete("/api/admin/shadow")
+def admin_stop_shadow(request: Request):
+    """Clear the runtime candidate on all workers (back to SHADOW_MODEL, if set)"""
+    if not is_admin(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        publish_candidate(None)
+    except Exception as e:
+        logger.warning(f"⚠️ Shadow stop not shared with other workers: {e}")
+    shadow.set_candidate(shadow.default)
+    return {"candidate": shadow.default}
+
+
+@app.get("/api/admin/shadow/report")
+def admin_shadow_report(request: Request, candidate: Optional[str] = None, hours: int = 24):
+    """Agreement with production and latency deltas of a shadowed candidate"""
+    if not is_admin(request):
+        raise HTTPException(status_code=404, detail="Not found")
+    return {**shadow_report(candidate, min(max(hours, 1), STATS_MAX_HOURS)), "status": shadow.status}
+
+
+@app.get("/metrics")
+def metrics(scope: str = "cluster"):
+    """
+    Prometheus metrics: per-stage latency histograms and outcome counters
+    Totals of all workers when a shared store is configured; ?scope=worker
+    shows only the worker answering the scrape (also the fallback when the
+    shared store cannot be reached)
+    """
+    if scope == "cluster" and metrics_sync is not None:
+        try:
+            metrics_sync.push()
+            return PlainTextResponse(render_metrics(state=metrics_sync.state), media_type="text/plain; version=0.0.4")
+        except Exception as e:
+            logger.warning("Shared metrics unavailable, serving this worker's: %s", e)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # For local development
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,254 @@
+"""
+Startup autotuning of gunicorn workers and torch threads
+Detects the CPU quota and memory limit of the container (cgroup v2/v1,
+falling back to the host) and splits the cores into workers x torch
+intra-op threads, optionally choosing the split with a short YOLO
+calibration benchmark
+"""
+
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+# Configuration
+WORKER_MEMORY_MB = int(os.getenv("WORKER_MEMORY_MB", "600"))   # resident size of one worker with the model loaded
+MEMORY_HEADROOM = float(os.getenv("MEMORY_HEADROOM", "0.85"))   # share of the memory limit workers may use
+MAX_TORCH_THREADS = int(os.getenv("MAX_TORCH_THREADS", "4"))   # intra-op threads beyond this rarely help YOLOv8n
+CALIBRATION_ROUNDS = int(os.getenv("AUTOTUNE_ROUNDS", "5"))
+CALIBRATION_TIMEOUT = int(os.getenv("AUTOTUNE_TIMEOUT", "120"))  # seconds
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+UNLIMITED_MEMORY = 1 << 60  # cgroup v1 reports "no limit" as a huge number
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def detect_cpu_limit(cgroup_root=CGROUP_ROOT):
+    """
+    Usable CPUs for this process: the scheduler affinity mask capped by the
+    cgroup CPU quota (rounded up)
+
+    Returns:
+        int: Number of CPUs (at least 1)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = period = None
+    cpu_max = _read(os.path.join(cgroup_root, "cpu.max"))  # v2: "<quota|max> <period>"
+    if cpu_max:
+        fields = cpu_max.split()
+        if fields[0] != "max":
+            quota, period = int(fields[0]), int(fields[1])
+    else:
+        v1_quota = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        v1_period = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if v1_quota and v1_period and int(v1_quota) > 0:
+            quota, period = int(v1_quota), int(v1_period)
+
+    if quota and period:
+        cpus = min(cpus, math.ceil(quota / period))
+    return max(1, cpus)
+
+
+def detect_memory_limit(cgroup_root=CGROUP_ROOT):
+    """
+    Memory available to the container in bytes (cgroup limit or physical RAM)
+
+    Returns:
+        int or None: Bytes, None if it cannot be determined
+    """
+    for path in (os.path.join(cgroup_root, "memory.max"),
+                 os.path.join(cgroup_root, "memory", "memory.limit_in_bytes")):
+        value = _read(path)
+        if value and value != "max" and int(value) < UNLIMITED_MEMORY:
+            return int(value)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def max_workers_for_memory(memory_bytes, worker_memory_mb=WORKER_MEMORY_MB):
+    """Workers that fit in the memory limit (unbounded if unknown)"""
+    if not memory_bytes:
+        return None
+    return max(1, int(memory_bytes * MEMORY_HEADROOM // (worker_memory_mb * 1024 * 1024)))
+
+
+def candidate_splits(cpus, memory_workers=None):
+    """
+    All workers x threads splits that fill (but do not oversubscribe) the CPUs
+
+    Returns:
+        list: (workers, threads) tuples, fewest threads first
+    """
+    splits = []
+    for threads in range(1, min(cpus, MAX_TORCH_THREADS) + 1):
+        workers = cpus // threads
+        if memory_workers is not None:
+            workers = min(workers, memory_workers)
+        if (max(1, workers), threads) not in splits:
+            splits.append((max(1, workers), threads))
+    return splits
+
+
+def heuristic_split(cpus, memory_workers=None):
+    """
+    Default split without measurements: a handful of threads per worker on
+    large machines (inference latency), one thread per worker on small ones
+    (throughput), with the worker count capped by memory
+
+    Returns:
+        tuple: (workers, threads)
+    """
+    threads = min(MAX_TORCH_THREADS, max(1, cpus // 4))
+    workers = max(1, cpus // threads)
+    if memory_workers is not None and workers > memory_workers:
+        workers = memory_workers
+        # Give the cores of the workers that did not fit to the ones that did
+        threads = min(MAX_TORCH_THREADS, max(1, cpus // workers))
+    return workers, threads
+
+
+def calibrate(splits, model_path, rounds=CALIBRATION_ROUNDS, imgsz=640):
+    """
+    Time YOLO inference at each thread count and pick the split with the
+    highest estimated throughput (workers / latency)
+
+    Returns:
+        tuple: ((workers, threads), {threads: latency_ms}) or (None, {}) if unavailable
+    """
+    try:
+        import numpy as np
+        import torch
+        from ultralytics import YOLO
+    except ImportError:
+        return None, {}
+    if not os.path.exists(model_path):
+        return None, {}
+
+    model = YOLO(model_path)
+    image = np.random.default_rng(0).integers(0, 255, (imgsz, imgsz, 3), dtype=np.uint8)
+    previous_threads = torch.get_num_threads()
+    latencies = {}
+    try:
+        for _, threads in splits:
+            torch.set_num_threads(threads)
+            model(image, verbose=False)  # warm-up
+            started = time.perf_counter()
+            for _ in range(rounds):
+                model(image, verbose=False)
+            latencies[threads] = (time.perf_counter() - started) / rounds * 1000
+    finally:
+        torch.set_num_threads(previous_threads)
+
+    best = max(splits, key=lambda split: split[0] / latencies[split[1]])
+    return best, {threads: round(ms, 1) for threads, ms in latencies.items()}
+
+
+def calibrate_in_subprocess(splits, model_path, timeout=CALIBRATION_TIMEOUT):
+    """
+    Run calibrate() in a fresh interpreter so the gunicorn master never
+    initializes torch thread pools before forking workers
+
+    Returns:
+        tuple: Same as calibrate(); (None, {}) on failure or timeout
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--calibrate", model_path, json.dumps(splits)]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout, check=True)
+        best, latencies = json.loads(result.stdout.strip().splitlines()[-1])
+    except (subprocess.SubprocessError, OSError, ValueError, IndexError) as e:
+        print(f"⚠️ Autotune calibration failed: {e}")
+        return None, {}
+    return (tuple(best) if best else None), {int(threads): ms for threads, ms in latencies.items()}
+
+
+def plan(model_path=None, calibrate_split=None):
+    """
+    Choose workers and torch threads for this machine
+    WEB_CONCURRENCY and TORCH_THREADS, when set, always win
+
+    Args:
+        model_path (str): Model used for calibration
+        calibrate_split (bool): Run the calibration benchmark (default: AUTOTUNE_CALIBRATE)
+
+    Returns:
+        dict: Chosen configuration and the facts it was derived from
+    """
+    if calibrate_split is None:
+        calibrate_split = os.getenv("AUTOTUNE_CALIBRATE", "false").lower() == "true"
+
+    cpus = detect_cpu_limit()
+    memory = detect_memory_limit()
+    memory_workers = max_workers_for_memory(memory)
+
+    workers, threads = heuristic_split(cpus, memory_workers)
+    source = "heuristic"
+    latencies = {}
+    if calibrate_split and model_path:
+        best, latencies = calibrate_in_subprocess(candidate_splits(cpus, memory_workers), model_path)
+        if best:
+            (workers, threads), source = best, "calibration"
+
+    if os.getenv("WEB_CONCURRENCY"):
+        workers, source = max(1, int(os.environ["WEB_CONCURRENCY"])), "override"
+        threads = min(MAX_TORCH_THREADS, max(1, cpus // workers))
+    if os.getenv("TORCH_THREADS"):
+        threads, source = max(1, int(os.environ["TORCH_THREADS"])), "override"
+
+    return {
+        "workers": workers,
+        "torch_threads": threads,
+        "source": source,
+        "cpus": cpus,
+        "memory_mb": round(memory / 1024 / 1024) if memory else None,
+        "memory_workers": memory_workers,
+        "calibration_ms": latencies,
+    }
+
+
+def export_thread_settings(threads):
+    """
+    Pin math-library thread pools for processes started after this call
+    (must run before torch/numpy are imported in the worker)
+    """
+    os.environ["TORCH_THREADS"] = str(threads)
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(variable, str(threads))
+
+
+def configure_torch_threads():
+    """
+    Apply TORCH_THREADS in this process, defaulting to the cgroup CPU limit
+    (torch itself would size its pool from the host's cores)
+
+    Returns:
+        int: Intra-op thread count in use
+    """
+    import torch
+
+    threads = int(os.getenv("TORCH_THREADS", "0")) or detect_cpu_limit()
+    torch.set_num_threads(threads)
+    return threads
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--calibrate":
+        best, latencies = calibrate([tuple(split) for split in json.loads(sys.argv[3])], sys.argv[2])
+        print(json.dumps([best, latencies]))
+    else:
+        default_model = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "best.pt")
+        print(json.dumps(plan(model_path=os.getenv("MODEL_PATH", default_model)), indent=2))
@@ -0,0 +1,74 @@
+"""
+Local-model preference based on measured Gemini agreement
+training/distill.py evaluates the YOLO model against Gemini-labelled
+samples and writes an agreement report next to the model. Once the report
+for the deployed model clears LOCAL_AGREEMENT_THRESHOLD, classify_waste
+answers confident cases with the local model and only asks Gemini when
+YOLO is unsure.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Configuration
+PREFER_LOCAL_MODEL = os.getenv("PREFER_LOCAL_MODEL", "auto").lower()          # auto | true | false
+LOCAL_AGREEMENT_THRESHOLD = float(os.getenv("LOCAL_AGREEMENT_THRESHOLD", "0.9"))
+LOCAL_MIN_SAMPLES = int(os.getenv("LOCAL_MIN_SAMPLES", "200"))                 # evaluated pairs required
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hex SHA-256 of a file (identifies the model an agreement report belongs to)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def agreement_report_path(model_path):
+    """Report written by training/distill.py evaluate: <model>.agreement.json"""
+    return Path(model_path).with_suffix(".agreement.json")
+
+
+def load_agreement(model_path, report_path=None):
+    """
+    Agreement report for exactly this model file
+
+    Returns:
+        dict or None: Report, None if missing, unreadable or for another model
+    """
+    report_path = Path(report_path) if report_path else agreement_report_path(model_path)
+    try:
+        report = json.loads(report_path.read_text())
+        if report.get("model_sha256") != file_sha256(model_path):
+            return None
+        return report
+    except (OSError, ValueError):
+        return None
+
+
+def decide_local_preference(model_path, mode=PREFER_LOCAL_MODEL, threshold=LOCAL_AGREEMENT_THRESHOLD,
+                            min_samples=LOCAL_MIN_SAMPLES):
+    """
+    Decide whether YOLO should answer before Gemini
+
+    Args:
+        model_path (str): Deployed model
+        mode (str): "true"/"false" force the choice; "auto" uses the agreement report
+
+    Returns:
+        tuple: (prefer_local, human-readable reason)
+    """
+    if mode in ("true", "false"):
+        return mode == "true", f"PREFER_LOCAL_MODEL={mode}"
+    report = load_agreement(model_path)
+    if report is None:
+        return False, "no agreement report for this model"
+    agreement, samples = report.get("agreement", 0.0), report.get("samples", 0)
+    if samples < min_samples:
+        return False, f"only {samples} evaluated samples (need {min_samples})"
+    if agreement < threshold:
+        return False, f"agreement {agreement:.1%} below {threshold:.0%}"
+    return True, f"agreement {agreement:.1%} on {samples} samples"
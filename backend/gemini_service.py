@@ -1,35 +1,48 @@
 """
 Gemini API Integration for Waste Classification
 Uses Gemini Vision for accurate waste classification + awareness tips
+Prompts and answer parsing come from waste_core.engine (shared with the
+Vercel handler); this module adds the quota, logging and static fallbacks
 """
 
 import os
-import base64
+import logging
 from io import BytesIO
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
-    genai = None
 
 from typing import Optional, Tuple
 from PIL import Image
 from utils import get_fallback_awareness_tip
+from waste_core.engine import (
+    GENAI_AVAILABLE,
+    classify_image_part,
+    create_gemini_model,
+    generate_safety_warning,
+    generate_tip,
+    image_part,
+)
+from metrics import FALLBACKS
+from shared_state import RateLimiter
+
+logger = logging.getLogger(__name__)
 
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 ENABLE_GEMINI = os.getenv("ENABLE_GEMINI", "true").lower() == "true"
+# Optional endpoint override (e.g. http://127.0.0.1:8765 for benchmarks/mock_gemini.py)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+# Requests per minute across all workers (shared_state.py); 0 = unlimited
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "0"))
+
+# Vision and tip calls draw from the same quota bucket
+gemini_quota = RateLimiter("gemini", GEMINI_RPM)
 
 # Initialize Gemini
 model = None
 vision_model = None
 if GEMINI_API_KEY and ENABLE_GEMINI and GENAI_AVAILABLE:
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        # Use gemini-1.5-flash - higher free tier quota
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        vision_model = genai.GenerativeModel('gemini-1.5-flash')
+        model = create_gemini_model(GEMINI_API_KEY, GEMINI_API_ENDPOINT)
+        vision_model = model
         print("✅ Gemini API configured successfully (gemini-1.5-flash with Vision)")
     except Exception as e:
         print(f"⚠️ Gemini API configuration failed: {e}")
@@ -54,67 +67,18 @@ def classify_with_gemini_vision(image: Image.Image) -> Tuple[str, str, float]:
     """
     if not vision_model:
         return None, None, 0.0
+    if not gemini_quota.allow():
+        FALLBACKS.inc("gemini_quota")
+        return None, None, 0.0
     
     try:
         # Convert PIL image to bytes
         buffered = BytesIO()
         image.save(buffered, format="JPEG", quality=85)
-        image_bytes = buffered.getvalue()
-        
-        # Create image part for Gemini
-        image_part = {
-            "mime_type": "image/jpeg",
-            "data": base64.b64encode(image_bytes).decode()
-        }
-        
-        # Classification prompt
-        prompt = """You are a waste classification expert. Analyze this image and classify the waste item.
-
-RESPOND IN THIS EXACT FORMAT (one line only):
-CATEGORY|ITEM_NAME|CONFIDENCE
-
-Where:
-- CATEGORY must be exactly one of: ORGANIC, RECYCLABLE, HAZARDOUS
-- ITEM_NAME is what you see (e.g., "plastic bottle", "banana peel", "battery")
-- CONFIDENCE is a number between 0.70 and 0.99
-
-CLASSIFICATION RULES:
-- ORGANIC: Food waste, fruit/vegetable peels, garden waste, paper tissues, biodegradable items
-- RECYCLABLE: Plastic bottles, glass, metal cans, cardboard, paper, aluminum, PET bottles
-- HAZARDOUS: Batteries, electronics, chemicals, medicines, paint, light bulbs, e-waste
-
-Examples:
-- Plastic water bottle → RECYCLABLE|plastic bottle|0.95
-- Banana peel → ORGANIC|banana peel|0.92
-- AA battery → HAZARDOUS|battery|0.94
-
-Analyze the image and respond with ONLY the classification line, nothing else."""
-
-        # Call Gemini Vision
-        response = vision_model.generate_content([prompt, image_part])
-        
-        if response and response.text:
-            result = response.text.strip()
-            parts = result.split("|")
-            
-            if len(parts) >= 3:
-                category = parts[0].strip().upper()
-                item_name = parts[1].strip()
-                try:
-                    confidence = float(parts[2].strip())
-                except:
-                    confidence = 0.85
-                
-                # Validate category
-                if category not in ["ORGANIC", "RECYCLABLE", "HAZARDOUS"]:
-                    category = "HAZARDOUS"  # Safety default
-                
-                return category, item_name, min(confidence, 0.99)
-        
-        return None, None, 0.0
+        return classify_image_part(vision_model, image_part(buffered.getvalue()))
         
     except Exception as e:
-        print(f"⚠️ Gemini Vision error: {e}")
+        logger.warning("Gemini Vision error: %s", e)
         return None, None, 0.0
 
 
@@ -133,64 +97,14 @@ def generate_awareness_tip(item_name: str, category: str, confidence: float) ->
     # Use fallback if Gemini is disabled or not configured
     if not model or not ENABLE_GEMINI:
         return get_fallback_awareness_tip(category)
+    if not gemini_quota.allow():
+        FALLBACKS.inc("gemini_quota")
+        return get_fallback_awareness_tip(category)
     
     try:
-        # Generate contextual prompt for Gemini
-        prompt = f"""You are a friendly waste management expert helping people sort their garbage correctly.
-
-ITEM DETECTED: {item_name}
-CATEGORY: {category} waste
-
-Write a SHORT, CLEAR awareness tip (2-3 sentences) that includes:
-1. Why this belongs in {category} category
-2. The correct disposal method
-3. ONE environmental impact fact
-
-Rules:
-- Be direct and helpful
-- Use simple language anyone can understand
-- Include a practical disposal tip
-- DO NOT use emojis
-- Keep under 200 characters"""
-
-        # Call Gemini API
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                'temperature': 0.6,
-                'max_output_tokens': 150,
-            }
-        )
-        
-        # Extract and clean response
-        if response and response.text:
-            tip = response.text.strip()
-            # Ensure it's not too long
-            if len(tip) > 250:
-                tip = tip[:247] + "..."
-            return tip
-        else:
-            return get_fallback_awareness_tip(category)
+        return generate_tip(model, item_name, category)
     
     except Exception as e:
-        print(f"⚠️ Gemini API error: {e}")
+        logger.warning("Gemini API error: %s", e)
         # Always return fallback on error
         return get_fallback_awareness_tip(category)
-
-
-def generate_safety_warning(confidence: float) -> str:
-    """
-    Generate safety warning for low-confidence predictions
-    
-    Args:
-        confidence: Model confidence score
-    
-    Returns:
-        str: Safety warning message
-    """
-    if confidence < 0.5:
-        return "⚠️ Low confidence detection. When unsure, treat as HAZARDOUS waste for safety."
-    elif confidence < 0.7:
-        return "⚠️ Uncertain classification. Please verify or consult local waste guidelines."
-    else:
-        return ""
@@ -1,12 +1,31 @@
-import multiprocessing
+import os
+import sys
 
-# Gunicorn configuration for Azure App Service
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from autotune import export_thread_settings, plan
+
+# Gunicorn configuration for Azure App Service (and the Docker image)
 max_requests = 1000
 max_requests_jitter = 50
 log_file = "-"
-bind = "0.0.0.0:8000"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 timeout = 600
-workers = 2
 worker_class = "uvicorn.workers.UvicornWorker"
 accesslog = "-"
 errorlog = "-"
+# Seconds an idle client connection stays open. Mobile clients pay a full
+# TCP+TLS handshake (several RTTs) on every reconnect, so keep this above the
+# front proxy's idle timeout and let the proxy close first.
+keepalive = int(os.getenv("KEEPALIVE_TIMEOUT", "75"))
+
+# Size workers x torch threads to the container's CPU quota and memory limit
+# (WEB_CONCURRENCY / TORCH_THREADS override; AUTOTUNE_CALIBRATE=true measures)
+_model_path = os.getenv("MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "best.pt"))
+_plan = plan(model_path=_model_path)
+workers = _plan["workers"]
+export_thread_settings(_plan["torch_threads"])
+print(
+    f"⚙️  Autotune ({_plan['source']}): {workers} worker(s) x {_plan['torch_threads']} torch thread(s) "
+    f"| {_plan['cpus']} CPU(s), {_plan['memory_mb']} MB memory (fits {_plan['memory_workers']} workers)"
+    + (f" | calibration ms/image by threads: {_plan['calibration_ms']}" if _plan["calibration_ms"] else "")
+)
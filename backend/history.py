@@ -0,0 +1,288 @@
+"""
+Persistent classification history
+Results are appended to SQLite (WAL mode) by a background writer thread
+that commits in batches, so requests only enqueue a row. Hourly rollups
+are upserted in the same transaction, which keeps the stats endpoints
+independent of the table size.
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from metrics import HISTORY_DROPPED
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+HISTORY_DB = Path(os.getenv("HISTORY_DB", os.path.join(os.path.dirname(__file__), "data", "history.db")))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))  # seconds
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))          # rows buffered before dropping
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    request_id TEXT,
+    category TEXT NOT NULL,
+    model_used TEXT NOT NULL,
+    confidence REAL,
+    low_confidence INTEGER NOT NULL DEFAULT 0,
+    detected_item TEXT,
+    duration_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_classifications_ts ON classifications (ts);
+CREATE INDEX IF NOT EXISTS idx_classifications_category ON classifications (category, ts);
+CREATE INDEX IF NOT EXISTS idx_classifications_model ON classifications (model_used, ts);
+
+CREATE TABLE IF NOT EXISTS hourly_stats (
+    hour INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    model_used TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    low_confidence INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (hour, category, model_used)
+) WITHOUT ROWID;
+"""
+
+INSERT_ROW = """
+INSERT INTO classifications
+    (ts, request_id, category, model_used, confidence, low_confidence, detected_item, duration_ms)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO hourly_stats (hour, category, model_used, count, low_confidence, confidence_sum)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (hour, category, model_used) DO UPDATE SET
+    count = count + excluded.count,
+    low_confidence = low_confidence + excluded.low_confidence,
+    confidence_sum = confidence_sum + excluded.confidence_sum
+"""
+
+
+def connect(path=HISTORY_DB):
+    """Open the history database for writing in WAL mode, creating the file if needed"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _query(sql, params, path):
+    """
+    Run a stats query on a read-only connection
+
+    Returns:
+        list: Result rows; empty when history is disabled or nothing was
+            written yet (the database is never created by a read)
+    """
+    path = Path(path)
+    if not HISTORY_ENABLED or not path.exists():
+        return []
+    connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+    try:
+        return connection.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return []
+        raise
+    finally:
+        connection.close()
+
+
+def _rollup(rows):
+    """Aggregate a batch of rows into hourly_stats increments"""
+    totals = {}
+    for ts, _, category, model_used, confidence, low_confidence, _, _ in rows:
+        key = (int(ts // 3600) * 3600, category, model_used)
+        count, low, confidence_sum = totals.get(key, (0, 0, 0.0))
+        totals[key] = (count + 1, low + low_confidence, confidence_sum + (confidence or 0.0))
+    return [key + value for key, value in totals.items()]
+
+
+class HistoryWriter:
+    """Background thread that batches history rows into SQLite transactions"""
+
+    def __init__(self, path=HISTORY_DB, batch_size=HISTORY_BATCH_SIZE,
+                 flush_interval=HISTORY_FLUSH_INTERVAL, queue_size=HISTORY_QUEUE_SIZE):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        connection = connect(self.path)  # fail fast on an unusable path
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Flush everything queued and stop the writer"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def record(self, row):
+        """Queue one row without blocking (dropped if the buffer is full)"""
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            HISTORY_DROPPED.inc()
+
+    def _drain(self):
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                rows.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return rows
+
+    def _write(self, connection, rows):
+        try:
+            with connection:
+                connection.executemany(INSERT_ROW, rows)
+                connection.executemany(UPSERT_ROLLUP, _rollup(rows))
+        except sqlite3.Error as e:
+            HISTORY_DROPPED.inc(amount=len(rows))
+            logger.warning("History write failed (%d rows): %s", len(rows), e)
+
+    def _run(self):
+        connection = connect(self.path)
+        try:
+            while not self._stop.is_set():
+                rows = self._drain()
+                if rows:
+                    self._write(connection, rows)
+            # Final flush on shutdown
+            rows = []
+            while True:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if rows:
+                self._write(connection, rows)
+        finally:
+            connection.close()
+
+
+_writer = HistoryWriter() if HISTORY_ENABLED else None
+
+
+def start_history():
+    """Start the background writer (no-op when HISTORY_ENABLED is false)"""
+    if _writer is not None:
+        _writer.start()
+        print(f"🗄️  Classification history: {_writer.path}")
+
+
+def stop_history():
+    if _writer is not None:
+        _writer.stop()
+
+
+def record_result(request_id, category, model_used, confidence, detected_item, duration_ms, low_confidence):
+    """
+    Append one classification result to the history (non-blocking)
+
+    Args:
+        request_id (str): Request id from the trace
+        category (str): Category returned to the client
+        model_used (str): Path taken (gemini, yolo, no_detection)
+        confidence (float): Confidence returned, None if nothing was detected
+        detected_item (str): Detected item name
+        duration_ms (float): Request latency
+        low_confidence (bool): Confidence below the safety threshold
+    """
+    if _writer is None:
+        return
+    _writer.record((time.time(), request_id, category, model_used, confidence,
+                    int(low_confidence), detected_item, duration_ms))
+
+
+def _since(hours):
+    return (int(time.time() // 3600) - max(1, hours) + 1) * 3600
+
+
+def hourly_distribution(hours=24, path=HISTORY_DB):
+    """
+    Category counts per hour from the rollup table
+
+    Returns:
+        list: {"hour": ISO timestamp, "categories": {category: count}} oldest first
+    """
+    rows = _query(
+        "SELECT hour, category, SUM(count) FROM hourly_stats WHERE hour >= ? "
+        "GROUP BY hour, category ORDER BY hour",
+        (_since(hours),),
+        path,
+    )
+    buckets = {}
+    for hour, category, count in rows:
+        buckets.setdefault(hour, {})[category] = count
+    return [
+        {"hour": time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime(hour)), "categories": categories}
+        for hour, categories in buckets.items()
+    ]
+
+
+def summary(hours=24, path=HISTORY_DB):
+    """
+    Totals over the window: category distribution, model share and
+    low-confidence rate, all read from the rollup table
+
+    Returns:
+        dict: Aggregated statistics
+    """
+    rows = _query(
+        "SELECT category, model_used, SUM(count), SUM(low_confidence), SUM(confidence_sum) "
+        "FROM hourly_stats WHERE hour >= ? GROUP BY category, model_used",
+        (_since(hours),),
+        path,
+    )
+
+    total = sum(row[2] for row in rows)
+    categories, models = {}, {}
+    low_confidence = detected = 0
+    confidence_sum = 0.0
+    for category, model_used, count, low, conf_sum in rows:
+        categories[category] = categories.get(category, 0) + count
+        models[model_used] = models.get(model_used, 0) + count
+        low_confidence += low
+        if model_used != "no_detection":
+            detected += count
+            confidence_sum += conf_sum
+
+    def share(count):
+        return round(count / total, 4) if total else 0.0
+
+    return {
+        "hours": hours,
+        "total": total,
+        "categories": categories,
+        "model_share": {model_used: share(count) for model_used, count in models.items()},
+        "low_confidence_rate": share(low_confidence),
+        "mean_confidence": round(confidence_sum / detected, 4) if detected else 0.0,
+    }
@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from autotune import export_thread_settings, plan
+
+# Hypercorn configuration - optional HTTP/2 serving profile
+#   hypercorn --config file:hypercorn.conf.py app:app
+# With TLS_CERTFILE/TLS_KEYFILE, HTTP/2 is negotiated over TLS (ALPN);
+# without them clients may still use h2c (prior knowledge or Upgrade), which
+# is what a TLS-terminating proxy speaks to the app. HTTP/2 multiplexes the
+# page, its assets and API calls over one connection - one handshake per
+# mobile session instead of one per parallel request.
+bind = [f"0.0.0.0:{os.getenv('PORT', '8000')}"]
+accesslog = "-"
+errorlog = "-"
+keep_alive_timeout = int(os.getenv("KEEPALIVE_TIMEOUT", "75"))  # seconds, see gunicorn.conf.py
+graceful_timeout = 30
+h2_max_concurrent_streams = int(os.getenv("H2_MAX_STREAMS", "100"))
+certfile = os.getenv("TLS_CERTFILE") or None
+keyfile = os.getenv("TLS_KEYFILE") or None
+alpn_protocols = ["h2", "http/1.1"]
+
+# Same worker x torch thread sizing as gunicorn.conf.py
+_model_path = os.getenv("MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model", "best.pt"))
+_plan = plan(model_path=_model_path)
+workers = _plan["workers"]
+export_thread_settings(_plan["torch_threads"])
+print(
+    f"⚙️  Autotune ({_plan['source']}): {workers} worker(s) x {_plan['torch_threads']} torch thread(s), "
+    f"HTTP/2 {'over TLS' if certfile else 'cleartext (h2c)'}"
+)
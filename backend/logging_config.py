@@ -0,0 +1,101 @@
+"""
+Structured, non-blocking logging for the waste classification backend
+Request handlers only enqueue records (QueueHandler); a background
+QueueListener thread formats them as one JSON object per line and writes
+them out. Verbose per-request detail is sampled at LOG_SAMPLE_RATE.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()            # json | text
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))   # share of requests with verbose detail
+
+# Standard LogRecord attributes - everything else passed via `extra` is a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as a single-line JSON object"""
+
+    def format(self, record):
+        document = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                document[key] = value
+        if record.exc_text:
+            document["exc"] = record.exc_text
+        elif record.exc_info:
+            document["exc"] = self.formatException(record.exc_info)
+        return json.dumps(document, ensure_ascii=False, default=str)
+
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback in exc_text
+
+    The stdlib prepare() folds the traceback into the message and clears
+    exc_info, so the formatter on the listener side never sees it.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None  # tracebacks are not safe to hand to another thread or process
+        return record
+
+
+def setup_logging():
+    """
+    Route all logging through a queue to a background writer thread
+    Safe to call more than once (later calls are no-ops)
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(TracebackQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def sample_detail():
+    """
+    Decide whether one request logs verbose detail
+
+    Returns:
+        bool: True for roughly LOG_SAMPLE_RATE of calls
+    """
+    return LOG_SAMPLE_RATE > 0 and random.random() < LOG_SAMPLE_RATE
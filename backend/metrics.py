@@ -0,0 +1,294 @@
+"""
+Lightweight Prometheus-style metrics for the waste classification API
+Counters and latency histograms kept in process memory and rendered in the
+Prometheus text exposition format by the /metrics endpoint
+
+With a shared state store (see shared_state.py) every worker pushes its
+increments into one hash per metric, so /metrics shows the totals of all
+gunicorn workers and survives worker recycling.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from shared_state import key as shared_key
+
+logger = logging.getLogger(__name__)
+
+METRICS_SYNC_INTERVAL = float(os.getenv("METRICS_SYNC_INTERVAL", "5"))  # seconds between pushes, 0 disables
+
+# Latency buckets in seconds - spans fast local stages and slow Gemini calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stages of classify_waste, in request order
+CLASSIFY_STAGES = ("body_read", "decode", "gemini_vision", "yolo_inference", "postprocess", "tta", "tip_generation")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        key = tuple(str(value) for value in label_values)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """Yield (suffix, label_values, extra_label, value) tuples"""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield "", key, None, value
+
+    def render(self, samples=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for suffix, key, extra, value in self.samples() if samples is None else samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(self.label_names, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        key = tuple(str(label) for label in label_values)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def samples(self):
+        """Yield (suffix, label_values, extra_label, value) tuples"""
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                yield "_bucket", key, ("le", _format_value(bound)), count
+            yield "_bucket", key, ("le", "+Inf"), state[len(self.buckets)]
+            yield "_sum", key, None, state[-1]
+            yield "_count", key, None, state[len(self.buckets)]
+
+    def render(self, samples=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for suffix, key, extra, value in self.samples() if samples is None else samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(self.label_names, key, extra)} {_format_value(value)}")
+        return lines
+
+
+# ===== Metric registry =====
+
+STAGE_LATENCY = Histogram(
+    "waste_classify_stage_seconds",
+    "Latency of each classify_waste stage in seconds",
+    ("stage",),
+)
+REQUEST_LATENCY = Histogram(
+    "waste_classify_request_seconds",
+    "End-to-end classify_waste latency in seconds",
+    ("path",),
+)
+REQUESTS = Counter(
+    "waste_classify_requests_total",
+    "Classification requests by path taken (local/gemini/yolo/no_detection/cached/rejected/shed/error)",
+    ("path",),
+)
+FALLBACKS = Counter(
+    "waste_fallback_total",
+    "Times a fallback was used instead of Gemini (yolo classification, static tip, local tip, gemini_quota)",
+    ("kind",),
+)
+CACHE_HITS = Counter(
+    "waste_cache_hits_total",
+    "Cache hits by cache name",
+    ("cache",),
+)
+CORRECTIONS = Counter(
+    "waste_corrections_total",
+    "Category correction rules fired",
+    ("rule",),
+)
+CATEGORIES_RETURNED = Counter(
+    "waste_categories_total",
+    "Categories returned to clients",
+    ("category",),
+)
+
+ADMISSION_REJECTED = Counter(
+    "waste_admission_rejected_total",
+    "Classify requests shed by admission control",
+    ("reason",),
+)
+ADMISSION_WAIT = Histogram(
+    "waste_admission_wait_seconds",
+    "Time classify requests waited for an inference slot in seconds",
+)
+HISTORY_DROPPED = Counter(
+    "waste_history_dropped_total",
+    "History rows dropped because the write buffer was full or SQLite failed",
+)
+ACTIVE_LEARNING_SAMPLES = Counter(
+    "waste_active_learning_samples_total",
+    "Active-learning capture outcomes (low_confidence/disagreement captured, or why not)",
+    ("outcome",),
+)
+TTA_RUNS = Counter(
+    "waste_tta_total",
+    "Test-time augmentation of uncertain YOLO predictions (recovered/uncertain/skipped)",
+    ("outcome",),
+)
+SHADOW_RUNS = Counter(
+    "waste_shadow_total",
+    "Candidate model shadow runs (agree/disagree, or why not: rate_limited/queue_full/busy/error)",
+    ("outcome",),
+)
+
+REGISTRY = [
+    STAGE_LATENCY, REQUEST_LATENCY, REQUESTS, FALLBACKS, CACHE_HITS, CORRECTIONS, CATEGORIES_RETURNED,
+    ADMISSION_REJECTED, ADMISSION_WAIT, HISTORY_DROPPED, ACTIVE_LEARNING_SAMPLES, TTA_RUNS,
+    SHADOW_RUNS,
+]
+
+
+@contextmanager
+def observe_stage(stage, timings=None):
+    """
+    Time a block of code as one classify_waste stage
+
+    Args:
+        stage (str): Stage name (see CLASSIFY_STAGES)
+        timings (dict): Optional per-request dict that receives the duration
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def _sample_field(suffix, key, extra):
+    return json.dumps([suffix, list(key), list(extra) if extra else None])
+
+
+_SUFFIX_ORDER = {"": 0, "_bucket": 0, "_sum": 1, "_count": 2}
+
+
+def shared_samples(metric, state):
+    """Samples of a metric summed over all workers, in exposition order"""
+    samples = []
+    for field, value in state.hgetall(shared_key("metrics", metric.name)).items():
+        suffix, key, extra = json.loads(field)
+        samples.append((suffix, tuple(key), tuple(extra) if extra else None, float(value)))
+    samples.sort(key=lambda s: (s[1], _SUFFIX_ORDER[s[0]], float(s[2][1]) if s[2] else 0.0))
+    return samples
+
+
+class MetricsSync:
+    """Pushes this worker's metric increments (deltas) into the shared store"""
+
+    def __init__(self, state, registry=None, interval=METRICS_SYNC_INTERVAL):
+        self.state = state
+        self.registry = registry or REGISTRY
+        self.interval = interval
+        self._pushed = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def push(self):
+        """Send everything counted since the previous push"""
+        with self._lock:
+            pipeline = self.state.pipeline()
+            changed = {}
+            for metric in self.registry:
+                name = shared_key("metrics", metric.name)
+                for suffix, key, extra, value in metric.samples():
+                    field = _sample_field(suffix, key, extra)
+                    delta = value - self._pushed.get((metric.name, field), 0)
+                    if delta:
+                        pipeline.hincrbyfloat(name, field, delta)
+                        changed[(metric.name, field)] = value
+            if changed:
+                pipeline.execute()
+                self._pushed.update(changed)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and push the final increments"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.push()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.push()
+            except Exception as e:
+                logger.warning("Metrics sync failed: %s", e)
+
+
+def render_metrics(registry=None, state=None):
+    """
+    Render all metrics in the Prometheus text exposition format
+
+    Args:
+        state: Shared store to read cluster-wide totals from (None: this process)
+
+    Returns:
+        str: Exposition text (version 0.0.4)
+    """
+    lines = []
+    for metric in registry or REGISTRY:
+        lines.extend(metric.render(shared_samples(metric, state) if state is not None else None))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,367 @@
+"""
+Local model registry and hot swapping
+Trained weights are registered as immutable versions:
+
+    model/registry/<version>/model.pt
+    model/registry/<version>/model.agreement.json   (optional, distillation)
+    model/registry/<version>/metadata.json
+    model/registry/current.json                     {"version", "previous", "activated_at"}
+
+Every worker serves the version named in current.json (MODEL_PATH when the
+registry is empty) and polls the file, so activating a version - through
+the admin endpoint or this module's CLI - reaches all gunicorn workers.
+A new version is loaded and warmed next to the old one and swapped in as
+a single reference; in-flight requests finish on the model they started
+with.
+
+Usage:
+    python backend/model_registry.py list
+    python backend/model_registry.py register training/runs/waste_classifier/weights/best.pt
+    python backend/model_registry.py activate 20260101-120000-1a2b3c4d
+    python backend/model_registry.py rollback
+    python backend/model_registry.py prune      # keep only the active version (container builds)
+"""
+
+import hmac
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from distillation import decide_local_preference, file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(__file__), "model", "registry")))
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "10"))  # seconds between current.json checks, 0 disables
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", "2"))
+ADMIN_SECRET = os.getenv("ADMIN_SECRET", "")  # bearer token for /api/admin/models, empty disables
+
+CURRENT_FILE = "current.json"
+WEIGHTS_FILE = "model.pt"
+METADATA_FILE = "metadata.json"
+
+
+def _atomic_write_json(path, data):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
+
+
+def is_admin(request):
+    """True only when ADMIN_SECRET is set and sent as an "Authorization: Bearer" token"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return bool(ADMIN_SECRET) and scheme.lower() == "bearer" and hmac.compare_digest(
+        token.encode(), ADMIN_SECRET.encode()
+    )
+
+
+def version_dir(version, registry=MODEL_REGISTRY_DIR):
+    return Path(registry) / version
+
+
+def list_versions(registry=MODEL_REGISTRY_DIR):
+    """
+    Registered versions, newest first
+
+    Returns:
+        list: Metadata dicts
+    """
+    versions = []
+    for metadata_path in Path(registry).glob(f"*/{METADATA_FILE}"):
+        try:
+            versions.append(json.loads(metadata_path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(versions, key=lambda metadata: metadata.get("created_at", ""), reverse=True)
+
+
+def register(weights, version=None, metadata=None, registry=MODEL_REGISTRY_DIR):
+    """
+    Copy weights into the registry as a new immutable version
+
+    Args:
+        weights (str): Trained .pt file (its <name>.agreement.json is copied too)
+        version (str): Version name (default: UTC timestamp + hash prefix)
+        metadata (dict): Extra metadata (training run, metrics, ...)
+
+    Returns:
+        dict: Metadata of the new version
+    """
+    weights = Path(weights)
+    digest = file_sha256(weights)
+    version = version or f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{digest[:8]}"
+    target = version_dir(version, registry)
+    if target.exists():
+        raise ValueError(f"Version {version} already exists")
+
+    staging = Path(registry) / f".{version}.tmp"
+    staging.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(weights, staging / WEIGHTS_FILE)
+    agreement = weights.with_suffix(".agreement.json")
+    if agreement.exists():
+        shutil.copy2(agreement, staging / "model.agreement.json")
+    info = {
+        "version": version,
+        "sha256": digest,
+        "source": str(weights),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **(metadata or {}),
+    }
+    _atomic_write_json(staging / METADATA_FILE, info)
+    os.replace(staging, target)
+    return info
+
+
+def read_current(registry=MODEL_REGISTRY_DIR):
+    """Contents of current.json, or None when nothing is activated"""
+    try:
+        return json.loads((Path(registry) / CURRENT_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def activate(version, registry=MODEL_REGISTRY_DIR):
+    """
+    Point current.json at a registered version (remembering the previous one)
+
+    Returns:
+        dict: New current.json contents
+    """
+    if not (version_dir(version, registry) / WEIGHTS_FILE).exists():
+        raise ValueError(f"Unknown model version: {version}")
+    current = read_current(registry) or {}
+    state = {
+        "version": version,
+        "previous": current.get("version") if current.get("version") != version else current.get("previous"),
+        "activated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _atomic_write_json(Path(registry) / CURRENT_FILE, state)
+    return state
+
+
+def previous_version(registry=MODEL_REGISTRY_DIR):
+    return (read_current(registry) or {}).get("previous")
+
+
+def prune(keep_previous=False, registry=MODEL_REGISTRY_DIR):
+    """
+    Delete every version except the active one (and optionally the previous)
+
+    Used when baking the registry into a container image. current.json
+    forgets a previous version that was deleted, so rollback reports that
+    there is nothing to roll back to instead of failing to load.
+
+    Returns:
+        list: Deleted version names
+    """
+    current = read_current(registry) or {}
+    keep = {current.get("version")}
+    if keep_previous:
+        keep.add(current.get("previous"))
+    removed = []
+    for metadata in list_versions(registry):
+        if metadata["version"] not in keep:
+            shutil.rmtree(version_dir(metadata["version"], registry))
+            removed.append(metadata["version"])
+    if current.get("previous") and current["previous"] not in keep:
+        _atomic_write_json(Path(registry) / CURRENT_FILE, {**current, "previous": None})
+    return removed
+
+
+def resolve_current(default_path, registry=MODEL_REGISTRY_DIR):
+    """
+    Weights to serve: the activated registry version, else default_path
+
+    Returns:
+        tuple: (weights path, version)
+    """
+    current = read_current(registry)
+    if current:
+        weights = version_dir(current["version"], registry) / WEIGHTS_FILE
+        if weights.exists():
+            return str(weights), current["version"]
+    return str(default_path), f"unregistered-{file_sha256(default_path)[:8]}"
+
+
+class LoadedModel:
+    """A loaded YOLO model and everything derived from it, swapped as one object"""
+
+    def __init__(self, model, path, version, class_table, prefer_local=False, local_reason=""):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.class_table = class_table
+        self.prefer_local = prefer_local
+        self.local_reason = local_reason
+        # Ultralytics predictors are not safe to call from several threads at once
+        self.lock = threading.Lock()
+        self.loaded_at = time.time()
+
+
+def load_model(path, version, predict_args=None, warmup_runs=MODEL_WARMUP_RUNS):
+    """
+    Load and warm a model version
+
+    Args:
+        path (str): Weights file
+        version (str): Version name reported in responses
+        predict_args (dict): Inference arguments used for the warm-up (e.g. imgsz)
+
+    Returns:
+        LoadedModel
+    """
+    from PIL import Image
+    from ultralytics import YOLO
+
+    from utils import build_class_category_table
+
+    model = YOLO(path)
+    blank = Image.new("RGB", (640, 480), (127, 127, 127))
+    for _ in range(warmup_runs):
+        model(blank, verbose=False, **(predict_args or {}))
+    prefer_local, reason = decide_local_preference(path)
+    return LoadedModel(model, path, version, build_class_category_table(model.names), prefer_local, reason)
+
+
+class ModelManager:
+    """
+    Holds the serving model and swaps it without dropping requests
+
+    Readers take `manager.current` once per request; a swap replaces that
+    single reference after the new model is loaded and warmed.
+    """
+
+    def __init__(self, default_path, registry=MODEL_REGISTRY_DIR, predict_args=None,
+                 watch_interval=MODEL_WATCH_INTERVAL, loader=load_model):
+        self.default_path = default_path
+        self.registry = Path(registry)
+        self.predict_args = predict_args or {}
+        self.watch_interval = watch_interval
+        self.current = None
+        self.status = {"state": "idle"}
+        self._loader = loader
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def load_initial(self):
+        path, version = resolve_current(self.default_path, self.registry)
+        self.current = self._loader(path, version, self.predict_args)
+        return self.current
+
+    def swap_to(self, version):
+        """
+        Load, warm and swap to a registered version (blocking)
+
+        Returns:
+            LoadedModel: The model now serving
+        """
+        with self._swap_lock:
+            if self.current is not None and self.current.version == version:
+                return self.current
+            self.status = {"state": "loading", "version": version, "started_at": time.time()}
+            try:
+                loaded = self._loader(str(version_dir(version, self.registry) / WEIGHTS_FILE), version,
+                                      self.predict_args)
+            except Exception as e:
+                self.status = {"state": "failed", "version": version, "error": str(e)}
+                raise
+            previous, self.current = self.current, loaded
+            self.status = {"state": "active", "version": version,
+                           "previous": previous.version if previous else None,
+                           "load_seconds": round(time.time() - self.status["started_at"], 2)}
+            return loaded
+
+    def activate_in_background(self, version):
+        """
+        Swap this worker in the background, then publish the version in
+        current.json for the other workers
+
+        Raises:
+            ValueError: Unknown version
+        """
+        if not (version_dir(version, self.registry) / WEIGHTS_FILE).exists():
+            raise ValueError(f"Unknown model version: {version}")
+
+        def run():
+            try:
+                self.swap_to(version)
+                activate(version, self.registry)
+            except Exception as e:
+                logger.exception("Model activation failed for %s: %s", version, e)
+
+        threading.Thread(target=run, name="model-swap", daemon=True).start()
+
+    def start_watching(self):
+        """Follow current.json changes made by other workers or the CLI"""
+        if self.watch_interval <= 0:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="model-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            current = read_current(self.registry)
+            if not current or self.current is None or current["version"] == self.current.version:
+                continue
+            if self.status.get("state") == "failed" and self.status.get("version") == current["version"]:
+                continue  # don't retry a broken version every interval
+            try:
+                self.swap_to(current["version"])
+                logger.info("Model swapped to %s", current["version"])
+            except Exception as e:
+                logger.exception("Model swap to %s failed: %s", current["version"], e)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the local model registry")
+    parser.add_argument("--registry", type=Path, default=MODEL_REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show registered versions")
+    register_parser = commands.add_parser("register", help="Add weights as a new version")
+    register_parser.add_argument("weights", type=Path)
+    register_parser.add_argument("--version", default=None)
+    register_parser.add_argument("--activate", action="store_true", help="Serve it right away")
+    activate_parser = commands.add_parser("activate", help="Serve a registered version")
+    activate_parser.add_argument("version")
+    commands.add_parser("rollback", help="Serve the previously active version")
+    prune_parser = commands.add_parser("prune", help="Delete all versions except the active one")
+    prune_parser.add_argument("--keep-previous", action="store_true", help="Also keep the rollback target")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = (read_current(args.registry) or {}).get("version")
+        for metadata in list_versions(args.registry):
+            marker = "▶" if metadata["version"] == current else " "
+            print(f"{marker} {metadata['version']}  {metadata.get('source', '')}")
+    elif args.command == "register":
+        info = register(args.weights, args.version, registry=args.registry)
+        print(f"✅ Registered {info['version']}")
+        if args.activate:
+            activate(info["version"], args.registry)
+            print(f"🔄 Activated {info['version']} (workers swap within {MODEL_WATCH_INTERVAL:g}s)")
+    elif args.command == "prune":
+        removed = prune(args.keep_previous, args.registry)
+        print(f"🧹 Removed {len(removed)} version(s): {', '.join(removed) or '-'}")
+    else:
+        version = args.version if args.command == "activate" else previous_version(args.registry)
+        if not version:
+            print("❌ No previous version to roll back to")
+            raise SystemExit(1)
+        activate(version, args.registry)
+        print(f"🔄 Activated {version} (workers swap within {MODEL_WATCH_INTERVAL:g}s)")
+
+
+if __name__ == "__main__":
+    main()
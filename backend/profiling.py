@@ -0,0 +1,227 @@
+"""
+Opt-in request profiling for the waste classification API
+Profiles a single classify_waste call when the caller presents the shared
+PROFILING_SECRET (X-Profile header or ?profile= query parameter), stores a
+flame graph, and keeps a ring buffer of recent requests so the slowest ones
+can be inspected with their stage breakdown
+"""
+
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from logging_config import sample_detail
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PROFILING_SECRET = os.getenv("PROFILING_SECRET", "")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles")))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))              # stored flame graphs
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))  # seconds between samples
+SLOW_REQUEST_WINDOW = int(os.getenv("SLOW_REQUEST_WINDOW", "500"))  # recent requests kept
+SLOW_REQUEST_LIMIT = int(os.getenv("SLOW_REQUEST_LIMIT", "20"))     # slowest returned
+
+# File suffix and media type per profile format
+PROFILE_FORMATS = {
+    "speedscope": (".speedscope.json", "application/json"),
+    "folded": (".folded.txt", "text/plain"),
+}
+
+_recent_requests = deque(maxlen=SLOW_REQUEST_WINDOW)
+_recent_lock = threading.Lock()
+
+
+def _secret_matches(candidate):
+    return bool(PROFILING_SECRET) and bool(candidate) and hmac.compare_digest(
+        candidate.encode(), PROFILING_SECRET.encode()
+    )
+
+
+def is_authorized(request):
+    """
+    Check the shared profiling secret on a request
+
+    Args:
+        request: Incoming request (X-Profile header or ?profile= parameter)
+
+    Returns:
+        bool: True only when PROFILING_SECRET is set and matches
+    """
+    candidate = request.headers.get("x-profile") or request.query_params.get("profile")
+    return _secret_matches(candidate)
+
+
+class StackSampler:
+    """
+    Dependency-free sampling profiler for one thread
+    Periodically captures the thread's Python stack and counts identical
+    stacks in the folded format read by flamegraph.pl and speedscope
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestTrace:
+    """Per-request timing context, optionally with an active profiler"""
+
+    def __init__(self, profile=False):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.verbose = profile or sample_detail()  # log per-stage detail for this request
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.path = None
+        self.category = None
+        self.profile_id: Optional[str] = None
+        self._profile_requested = profile
+        self._profiler = None
+
+    @contextmanager
+    def profiled(self):
+        """Profile the enclosed block on the current (inference) thread if requested"""
+        if not self._profile_requested or self._profiler is not None:
+            yield
+            return
+        if PYINSTRUMENT_AVAILABLE:
+            self._profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="disabled")
+        else:
+            self._profiler = StackSampler(threading.get_ident())
+        self._profiler.start()
+        try:
+            yield
+        finally:
+            self._profiler.stop()
+
+    def _store_profile(self):
+        profiler, self._profiler = self._profiler, None
+        if PYINSTRUMENT_AVAILABLE:
+            fmt, content = "speedscope", profiler.output(renderer=SpeedscopeRenderer())
+        else:
+            fmt, content = "folded", profiler.folded()
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        suffix, _ = PROFILE_FORMATS[fmt]
+        (PROFILE_DIR / f"{self.request_id}{suffix}").write_text(content)
+        _prune_profiles()
+        self.profile_id = self.request_id
+
+    def finish(self):
+        """Stop profiling (if active) and record the request in the ring buffer"""
+        duration = time.perf_counter() - self.started
+        if self._profiler is not None:
+            try:
+                self._store_profile()
+            except Exception as e:
+                logger.warning("Failed to store profile: %s", e)
+        entry = {
+            "request_id": self.request_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "path": self.path,
+            "category": self.category,
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.timings.items()},
+            "profile_id": self.profile_id,
+        }
+        with _recent_lock:
+            _recent_requests.append(entry)
+        return entry
+
+    def response_headers(self):
+        headers = {"X-Request-Id": self.request_id}
+        if self.profile_id:
+            headers["X-Profile-Id"] = self.profile_id
+            headers["X-Profile-Url"] = f"/debug/profiles/{self.profile_id}"
+        return headers
+
+
+def start_trace(request):
+    """
+    Create the trace for one classify_waste call
+
+    Args:
+        request: Incoming request (profiled only if authorized)
+
+    Returns:
+        RequestTrace: Trace to pass through the request
+    """
+    return RequestTrace(profile=is_authorized(request))
+
+
+def _prune_profiles():
+    files = sorted(PROFILE_DIR.glob("*.*"), key=lambda p: p.stat().st_mtime)
+    for old in files[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else files:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def slowest_requests(limit=SLOW_REQUEST_LIMIT):
+    """
+    Slowest requests among the recent window, slowest first
+
+    Returns:
+        list: Ring buffer entries with stage breakdown
+    """
+    with _recent_lock:
+        entries = list(_recent_requests)
+    return sorted(entries, key=lambda entry: entry["duration_ms"], reverse=True)[:limit]
+
+
+def find_profile(profile_id):
+    """
+    Locate a stored profile by id
+
+    Returns:
+        tuple: (Path, media type) or (None, None) if unknown
+    """
+    if not profile_id.isalnum():
+        return None, None
+    for suffix, media_type in PROFILE_FORMATS.values():
+        path = PROFILE_DIR / f"{profile_id}{suffix}"
+        if path.exists():
+            return path, media_type
+    return None, None
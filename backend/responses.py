@@ -0,0 +1,54 @@
+"""
+FastAPI response helpers for the waste classification API
+The payload templates and builders live in waste_core.responses (shared
+with the Vercel handler) and are re-exported here
+"""
+
+from fastapi.responses import JSONResponse, Response
+try:
+    from fastapi.responses import ORJSONResponse
+except ImportError:
+    ORJSONResponse = None
+
+import utils  # noqa: F401 - adds the repository root (waste_core) to sys.path
+from waste_core.responses import (
+    CATEGORY_SUMMARIES,
+    NO_DETECTION_TEMPLATE,
+    ORJSON_AVAILABLE,
+    RESPONSE_TEMPLATES,
+    UPLOAD_SETTINGS,
+    build_categories_payload,
+    build_classification_response,
+    build_gemini_response,
+    build_no_detection_response,
+    dumps,
+    etag_matches,
+    make_etag,
+    utc_timestamp,
+)
+
+# Fastest JSON response class available
+FastJSONResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+
+def cached_bytes_response(request, body, etag, cache_control, media_type="application/json", headers=None):
+    """
+    Serve pre-serialized bytes with ETag / Cache-Control, or a 304 when fresh
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        body (bytes): Pre-serialized response body
+        etag (str): ETag of body (see make_etag)
+        cache_control (str): Cache-Control header value
+        media_type (str): Content type of body
+        headers (dict): Extra response headers
+
+    Returns:
+        Response: 200 with body, or 304 Not Modified
+    """
+    response_headers = {"ETag": etag, "Cache-Control": cache_control}
+    if headers:
+        response_headers.update(headers)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type=media_type, headers=response_headers)
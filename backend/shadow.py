@@ -0,0 +1,359 @@
+"""
+Shadow evaluation of a candidate model on live traffic
+A sampled share of classify requests is handed, after the response has
+been sent, to a background thread that runs the candidate model (a
+registry version, see model_registry.py) on the same upload. The
+candidate's answer never reaches the client; its agreement with the
+production answer and the latency difference are stored in SQLite and
+summarized by /api/admin/shadow/report. The candidate starts as
+SHADOW_MODEL and can be changed at runtime through the shared store
+(shared_state.py), which every worker's shadow thread re-reads every few
+seconds; clearing the override returns every worker to SHADOW_MODEL.
+
+Shadow work must not slow down real requests:
+- a per-worker rate limit (SHADOW_MAX_PER_MINUTE) and a small queue that
+  drops instead of blocking
+- the candidate only runs while the worker has no classification in
+  flight or queued (waiting up to SHADOW_IDLE_WAIT seconds)
+- the shadow thread runs at a lower CPU priority where the OS allows it
+"""
+
+import io
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from metrics import SHADOW_RUNS
+from model_registry import WEIGHTS_FILE, load_model, version_dir
+from shared_state import MemoryState, RateLimiter, get_state, key
+from utils import classify_detections
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SHADOW_MODEL = os.getenv("SHADOW_MODEL", "")                       # registry version (or .pt path), empty disables
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))  # share of requests re-run on the candidate
+SHADOW_MAX_PER_MINUTE = int(os.getenv("SHADOW_MAX_PER_MINUTE", "30"))  # per worker
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "8"))
+SHADOW_IDLE_WAIT = float(os.getenv("SHADOW_IDLE_WAIT", "2"))       # seconds to wait for an idle worker before dropping
+SHADOW_NICE = int(os.getenv("SHADOW_NICE", "10"))                  # CPU priority decrease of the shadow thread
+SHADOW_DB = Path(os.getenv("SHADOW_DB", os.path.join(os.path.dirname(__file__), "data", "shadow.db")))
+
+CANDIDATE_KEY = "shadow:candidate"  # shared store key set by the admin API (missing = SHADOW_MODEL)
+CANDIDATE_REFRESH = 5.0             # seconds between reads of the shared candidate
+
+# Stages that make up the production model time of a request
+MODEL_STAGES = ("gemini_vision", "yolo_inference", "tta")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    request_id TEXT,
+    candidate TEXT NOT NULL,
+    production_version TEXT,
+    production_path TEXT NOT NULL,
+    production_category TEXT,
+    production_confidence REAL,
+    candidate_category TEXT,
+    candidate_confidence REAL,
+    agree INTEGER NOT NULL,
+    production_ms REAL,
+    production_yolo_ms REAL,
+    candidate_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shadow_candidate ON shadow_results (candidate, ts);
+"""
+
+INSERT_ROW = """
+INSERT INTO shadow_results
+    (ts, request_id, candidate, production_version, production_path, production_category,
+     production_confidence, candidate_category, candidate_confidence, agree, production_ms,
+     production_yolo_ms, candidate_ms)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def connect(path=SHADOW_DB):
+    """Open the shadow database in WAL mode, creating it if needed"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def candidate_weights(candidate):
+    """Weights file of a registry version, or the candidate itself when it is a path"""
+    weights = version_dir(candidate) / WEIGHTS_FILE
+    return str(weights) if weights.exists() else candidate
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list (None when empty)"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def publish_candidate(candidate, state=None):
+    """Make every worker shadow this candidate (None or "" clears the override: back to SHADOW_MODEL)"""
+    state = state or get_state()
+    if candidate:
+        state.set(key(CANDIDATE_KEY), candidate)
+    else:
+        state.delete(key(CANDIDATE_KEY))
+
+
+def _lower_thread_priority(nice):
+    """Linux schedules threads individually, so this only affects the calling thread"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError):
+        pass
+
+
+class ShadowEvaluator:
+    """Runs a candidate model behind production and records how it compares"""
+
+    def __init__(self, path=SHADOW_DB, sample_rate=SHADOW_SAMPLE_RATE, max_per_minute=SHADOW_MAX_PER_MINUTE,
+                 queue_size=SHADOW_QUEUE_SIZE, idle_wait=SHADOW_IDLE_WAIT, loader=load_model, state=None):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.idle_wait = idle_wait
+        self.candidate = None
+        self.default = None
+        self.status = {"state": "disabled"}
+        # Limits this worker's CPU use, so the store is process-local on purpose
+        self._limiter = RateLimiter("shadow", max_per_minute, window=60, state=MemoryState())
+        self._loader = loader
+        self._state = state
+        self._loaded = None
+        self._busy = lambda: False
+        self._predict_args = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self, candidate=SHADOW_MODEL, busy=None, predict_args=None):
+        """
+        Args:
+            candidate (str): Registry version or weights path, shadowed whenever
+                no override is published; empty keeps shadowing off
+            busy (callable): Returns True while foreground requests are running
+            predict_args (dict): Inference arguments shared with production (e.g. imgsz)
+        """
+        self._busy = busy or self._busy
+        self._predict_args = predict_args or {}
+        self.default = candidate or None
+        self.connection = connect(self.path)
+        self._thread = threading.Thread(target=self._run, name="shadow-eval", daemon=True)
+        self._thread.start()
+        self.set_candidate(candidate)
+
+    def stop(self):
+        """Finish the queued requests and stop the worker"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self.connection.close()
+
+    def set_candidate(self, candidate):
+        """Shadow another candidate (None or "" stops shadowing); it is loaded by the shadow thread"""
+        self.candidate = candidate or None
+        self.status = {"state": "loading", "candidate": candidate} if candidate else {"state": "disabled"}
+
+    def refresh_candidate(self):
+        """Follow the candidate published in the shared store (called by the shadow thread)"""
+        try:
+            value = (self._state or get_state()).get(key(CANDIDATE_KEY))
+        except Exception:
+            return  # keep the current candidate while the store is unavailable
+        # No override (or "" left by an older version): the configured default
+        value = value.decode() if value else (self.default or "")
+        failed = self.status.get("state") == "failed" and self.status.get("candidate") == value
+        if value != (self.candidate or "") and not failed:
+            self.set_candidate(value)
+
+    def wants(self):
+        """Cheap request-side check: is this request sampled for shadowing?"""
+        return self._thread is not None and self.candidate is not None and random.random() < self.sample_rate
+
+    def submit(self, contents, request_id, production, timings):
+        """
+        Queue a sampled request for shadowing (non-blocking; run as a
+        response background task after wants())
+
+        Args:
+            contents (bytes): Uploaded image
+            request_id (str): Request id from the trace
+            production (dict): {"path", "version", "category", "confidence"}
+            timings (dict): Stage durations of the production request in seconds
+        """
+        if self._thread is None or self.candidate is None:
+            return
+        if not self._limiter.allow():
+            SHADOW_RUNS.inc("rate_limited")
+            return
+        try:
+            self._queue.put_nowait((contents, request_id, production, dict(timings), self.candidate))
+        except queue.Full:
+            SHADOW_RUNS.inc("queue_full")
+
+    def _model_for(self, candidate):
+        if self._loaded is None or self._loaded.version != candidate:
+            self._loaded = None
+            try:
+                self._loaded = self._loader(candidate_weights(candidate), candidate, self._predict_args)
+            except Exception as e:
+                self.status = {"state": "failed", "candidate": candidate, "error": str(e)}
+                self.candidate = None
+                raise
+            self.status = {"state": "active", "candidate": candidate}
+        return self._loaded
+
+    def _wait_for_idle(self):
+        deadline = time.monotonic() + self.idle_wait
+        while self._busy():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+        return True
+
+    def _process(self, contents, request_id, production, timings, candidate):
+        if candidate != self.candidate:
+            return  # candidate changed while this request was queued
+        loaded = self._model_for(candidate)
+        if not self._wait_for_idle():
+            SHADOW_RUNS.inc("busy")
+            return
+
+        image = Image.open(io.BytesIO(contents))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        start = time.perf_counter()
+        results = loaded.model(image, verbose=False, **self._predict_args)
+        candidate_ms = (time.perf_counter() - start) * 1000
+        detection = None
+        if results and len(results[0].boxes):
+            boxes = results[0].boxes
+            detection = classify_detections(
+                [(boxes.cls.cpu().numpy(), boxes.conf.cpu().numpy())], loaded.class_table, results[0].names
+            )[0]
+        category = detection["category"] if detection else None
+        agree = category == production.get("category")
+
+        yolo_seconds = timings.get("yolo_inference")
+        self.connection.execute(INSERT_ROW, (
+            time.time(), request_id, candidate, production.get("version"), production["path"],
+            production.get("category"), production.get("confidence"), category,
+            float(detection["confidence"]) if detection else None, int(agree),
+            sum(timings.get(stage, 0.0) for stage in MODEL_STAGES) * 1000,
+            yolo_seconds * 1000 if yolo_seconds is not None else None, candidate_ms,
+        ))
+        self.connection.commit()
+        SHADOW_RUNS.inc("agree" if agree else "disagree")
+
+    def _run(self):
+        _lower_thread_priority(SHADOW_NICE)
+        while True:
+            self.refresh_candidate()
+            if self.candidate is None:
+                self._loaded = None  # release the memory of a candidate no longer shadowed
+            try:
+                item = self._queue.get(timeout=CANDIDATE_REFRESH)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            try:
+                self._process(*item)
+            except Exception as e:
+                SHADOW_RUNS.inc("error")
+                logger.exception("Shadow evaluation failed: %s", e)
+
+
+def report(candidate=None, hours=24, path=SHADOW_DB):
+    """
+    Agreement and latency of a candidate against production
+
+    Args:
+        candidate (str): Candidate to report on (default: the most recently shadowed)
+        hours (int): Window size
+
+    Returns:
+        dict: Agreement overall, per production path and per production
+            category, a confusion table and latency percentiles in ms
+    """
+    connection = connect(path)
+    try:
+        since = time.time() - hours * 3600
+        if candidate is None:
+            row = connection.execute(
+                "SELECT candidate FROM shadow_results WHERE ts >= ? ORDER BY ts DESC LIMIT 1", (since,)
+            ).fetchone()
+            candidate = row[0] if row else None
+        rows = connection.execute(
+            "SELECT production_path, production_category, candidate_category, agree, production_ms, "
+            "production_yolo_ms, candidate_ms FROM shadow_results WHERE candidate = ? AND ts >= ?",
+            (candidate, since),
+        ).fetchall()
+    finally:
+        connection.close()
+
+    def agreement(selected):
+        return {"samples": len(selected),
+                "agreement": round(sum(r[3] for r in selected) / len(selected), 4) if selected else None}
+
+    by_path, by_category, confusion = {}, {}, {}
+    for row in rows:
+        by_path.setdefault(row[0], []).append(row)
+        by_category.setdefault(row[1] or "none", []).append(row)
+        cell = confusion.setdefault(row[1] or "none", {})
+        cell[row[2] or "none"] = cell.get(row[2] or "none", 0) + 1
+
+    def latency(values):
+        return {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+
+    candidate_ms = [r[6] for r in rows]
+    yolo_pairs = [(r[5], r[6]) for r in rows if r[5] is not None]
+    return {
+        "candidate": candidate,
+        "hours": hours,
+        **agreement(rows),
+        "by_path": {name: agreement(selected) for name, selected in by_path.items()},
+        "by_category": {name: agreement(selected) for name, selected in by_category.items()},
+        "confusion": confusion,
+        "latency_ms": {
+            "candidate": latency(candidate_ms),
+            "production_model": latency([r[4] for r in rows]),
+            # Same request, production YOLO vs candidate YOLO (only where production ran YOLO)
+            "delta_vs_production_yolo": latency([c - p for p, c in yolo_pairs]),
+        },
+    }
+
+
+shadow = ShadowEvaluator()
+
+
+def start_shadow(busy=None, predict_args=None):
+    """Start the shadow worker (candidates can be set later through the admin API)"""
+    shadow.start(SHADOW_MODEL, busy, predict_args)
+    if SHADOW_MODEL:
+        print(f"👥 Shadowing {SHADOW_MODEL} on {SHADOW_SAMPLE_RATE:.0%} of requests "
+              f"(max {SHADOW_MAX_PER_MINUTE}/min per worker)")
+
+
+def stop_shadow():
+    shadow.stop()
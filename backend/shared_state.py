@@ -0,0 +1,371 @@
+"""
+Shared state across gunicorn workers
+Every worker is a separate process, so in-process caches, rate limits and
+counters are split N ways and lost when a worker is recycled. This module
+provides one store for all workers behind a subset of the redis-py client
+API (get/set/incr/expire/hincrbyfloat/hgetall/pipeline ...):
+
+- redis:  a real Redis server (SHARED_STATE_URL, needs the redis package)
+- sqlite: a WAL-mode SQLite file on local disk, shared by the workers of
+          one host (default)
+- memory: a process-local dict, used in tests and single-process runs
+
+Values come back as bytes, like redis-py without decode_responses. Callers
+treat the store as best effort: helpers here never raise into a request.
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SHARED_STATE = os.getenv("SHARED_STATE", "auto").lower()      # auto | redis | sqlite | memory
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")          # redis://host:6379/0
+SHARED_STATE_DB = Path(os.getenv("SHARED_STATE_DB", os.path.join(os.path.dirname(__file__), "data", "shared_state.db")))
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "waste:")  # namespaces keys in a shared Redis
+
+PURGE_PROBABILITY = 0.01  # share of writes that also delete expired keys
+
+
+def _to_text(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _to_bytes(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).encode()
+
+
+class MemoryState:
+    """Process-local stand-in with the same interface (tests, single worker)"""
+
+    def __init__(self):
+        self._values = {}   # key -> (bytes, expires or None)
+        self._hashes = {}   # key -> {field: bytes}
+        self._lock = threading.RLock()
+
+    def _live(self, name):
+        entry = self._values.get(name)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self._values[name]
+            return None
+        return entry
+
+    def ping(self):
+        return True
+
+    def get(self, name):
+        with self._lock:
+            entry = self._live(name)
+            return entry[0] if entry else None
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name):
+                return None
+            self._values[name] = (_to_bytes(value), time.time() + ex if ex else None)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            removed = 0
+            for name in names:
+                removed += self._values.pop(name, None) is not None
+                removed += self._hashes.pop(name, None) is not None
+            return removed
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            entry = self._live(name)
+            value = int(entry[0]) + amount if entry else amount
+            self._values[name] = (_to_bytes(value), entry[1] if entry else None)
+            return value
+
+    incrby = incr
+
+    def expire(self, name, time_seconds):
+        with self._lock:
+            entry = self._live(name)
+            if not entry:
+                return False
+            self._values[name] = (entry[0], time.time() + time_seconds)
+            return True
+
+    def ttl(self, name):
+        with self._lock:
+            entry = self._live(name)
+            if not entry:
+                return -2
+            return -1 if entry[1] is None else max(0, int(entry[1] - time.time()))
+
+    def hincrbyfloat(self, name, key, amount=1.0):
+        with self._lock:
+            fields = self._hashes.setdefault(name, {})
+            value = float(fields.get(_to_bytes(key), b"0")) + amount
+            fields[_to_bytes(key)] = _to_bytes(value)
+            return value
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._hashes.get(name, {}))
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+
+class SQLiteState:
+    """Shared state in a local SQLite file (all workers on one host)"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS hashes (
+        key TEXT NOT NULL, field TEXT NOT NULL, value BLOB, PRIMARY KEY (key, field)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path=SHARED_STATE_DB):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def ping(self):
+        return True
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+    def _connection(self):
+        """One connection per thread and process (reopened after fork)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _maybe_purge(self, connection, now):
+        if random.random() < PURGE_PROBABILITY:
+            connection.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (now,))
+
+    def get(self, name):
+        row = self._connection().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)", (name, time.time())
+        ).fetchone()
+        return _to_bytes(row[0]) if row else None
+
+    def set(self, name, value, ex=None, nx=False):
+        now = time.time()
+        connection = self._connection()
+        expires = now + ex if ex else None
+        if nx:
+            cursor = connection.execute(
+                "INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE "
+                "SET value = excluded.value, expires = excluded.expires "
+                "WHERE kv.expires IS NOT NULL AND kv.expires <= ?",
+                (name, _to_bytes(value), expires, now),
+            )
+            if cursor.rowcount == 0:
+                return None
+        else:
+            connection.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                               (name, _to_bytes(value), expires))
+        self._maybe_purge(connection, now)
+        return True
+
+    def delete(self, *names):
+        connection = self._connection()
+        removed = 0
+        for name in names:
+            removed += connection.execute("DELETE FROM kv WHERE key = ?", (name,)).rowcount
+            removed += connection.execute("DELETE FROM hashes WHERE key = ?", (name,)).rowcount > 0
+        return removed
+
+    def incr(self, name, amount=1):
+        now = time.time()
+        row = self._connection().execute(
+            "INSERT INTO kv (key, value, expires) VALUES (?, ?, NULL) ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN kv.expires <= ? THEN excluded.value ELSE CAST(kv.value AS INTEGER) + excluded.value END, "
+            "expires = CASE WHEN kv.expires <= ? THEN NULL ELSE kv.expires END "
+            "RETURNING value",
+            (name, amount, now, now),
+        ).fetchone()
+        return int(row[0])
+
+    incrby = incr
+
+    def expire(self, name, time_seconds):
+        now = time.time()
+        return self._connection().execute(
+            "UPDATE kv SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (now + time_seconds, name, now),
+        ).rowcount > 0
+
+    def ttl(self, name):
+        row = self._connection().execute(
+            "SELECT expires FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)", (name, time.time())
+        ).fetchone()
+        if not row:
+            return -2
+        return -1 if row[0] is None else max(0, int(row[0] - time.time()))
+
+    def hincrbyfloat(self, name, key, amount=1.0):
+        row = self._connection().execute(
+            "INSERT INTO hashes (key, field, value) VALUES (?, ?, ?) ON CONFLICT(key, field) DO UPDATE "
+            "SET value = CAST(hashes.value AS REAL) + excluded.value RETURNING value",
+            (name, _to_text(key), float(amount)),
+        ).fetchone()
+        return float(row[0])
+
+    def hgetall(self, name):
+        rows = self._connection().execute("SELECT field, value FROM hashes WHERE key = ?", (name,)).fetchall()
+        return {field.encode(): _to_bytes(value) for field, value in rows}
+
+    def transaction(self):
+        """Context manager running several calls in one SQLite transaction"""
+        return _SQLiteTransaction(self._connection())
+
+
+class _SQLiteTransaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class Pipeline:
+    """Buffered calls executed together (one transaction on SQLite), like redis-py pipelines"""
+
+    def __init__(self, state):
+        self._state = state
+        self._calls = []
+
+    def __getattr__(self, method):
+        def queue_call(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue_call
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        if isinstance(self._state, SQLiteState):
+            with self._state.transaction():
+                return [getattr(self._state, method)(*args, **kwargs) for method, args, kwargs in calls]
+        with self._state._lock:
+            return [getattr(self._state, method)(*args, **kwargs) for method, args, kwargs in calls]
+
+
+def create_state(kind=SHARED_STATE, url=SHARED_STATE_URL, path=SHARED_STATE_DB):
+    """
+    Build a shared-state client
+
+    Args:
+        kind (str): auto (Redis when SHARED_STATE_URL is set and redis is installed,
+            SQLite otherwise), redis, sqlite or memory
+    """
+    if kind == "auto":
+        kind = "redis" if url and REDIS_AVAILABLE else "sqlite"
+    if kind == "redis":
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("SHARED_STATE=redis requires the redis package")
+        return redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+    if kind == "sqlite":
+        return SQLiteState(path)
+    return MemoryState()
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """The process-wide shared-state client (created on first use)"""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = create_state()
+    return _state
+
+
+def set_state(state):
+    """Replace the shared-state client (tests use MemoryState)"""
+    global _state
+    _state = state
+
+
+def is_shared(state):
+    """True when other processes see the same data"""
+    return type(state) is not MemoryState
+
+
+def key(*parts):
+    return SHARED_STATE_PREFIX + ":".join(str(part) for part in parts)
+
+
+def cache_get_json(name, state=None):
+    """Cached JSON value, or None on a miss or store failure"""
+    try:
+        value = (state or get_state()).get(key(name))
+        return json.loads(value) if value is not None else None
+    except Exception as e:
+        logger.warning("Shared cache read failed: %s", e)
+        return None
+
+
+def cache_set_json(name, value, ttl, state=None):
+    """Store a JSON value for ttl seconds (failures are logged and ignored)"""
+    try:
+        (state or get_state()).set(key(name), json.dumps(value, separators=(",", ":")), ex=ttl)
+    except Exception as e:
+        logger.warning("Shared cache write failed: %s", e)
+
+
+class RateLimiter:
+    """
+    Fixed-window limit shared by all workers (INCR + EXPIRE per window)
+    Fails open: when the store is unavailable calls are allowed.
+    """
+
+    def __init__(self, name, limit, window=60, state=None):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self._state = state
+
+    def allow(self):
+        if self.limit <= 0:
+            return True
+        window_id = int(time.time() // self.window)
+        name = key("rate", self.name, window_id)
+        try:
+            state = self._state or get_state()
+            count = state.incr(name)
+            if count == 1:
+                state.expire(name, self.window * 2)
+            return count <= self.limit
+        except Exception as e:
+            logger.warning("Rate limiter unavailable, allowing call: %s", e)
+            return True
@@ -0,0 +1,300 @@
+"""
+Static asset pipeline for the frontend
+Fingerprints every frontend file with a content hash, precompresses text
+assets (gzip/brotli) and builds WebP/AVIF image variants once at startup.
+Hashed URLs are cached forever by browsers; HTML is revalidated via ETag.
+"""
+
+import gzip
+import hashlib
+import io
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi.responses import Response
+from PIL import Image
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+try:
+    import pillow_avif  # noqa: F401 - registers AVIF support on older Pillow
+except ImportError:
+    pass
+
+from responses import etag_matches
+
+Image.init()
+AVIF_AVAILABLE = "AVIF" in Image.SAVE
+WEBP_AVAILABLE = "WEBP" in Image.SAVE
+
+# Cache policy
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Precompression settings
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/css", "text/javascript", "application/javascript",
+    "application/json", "image/svg+xml",
+}
+MIN_COMPRESS_SIZE = 512  # bytes - smaller bodies are not worth the header overhead
+
+# Responsive image variants
+RASTER_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+IMAGE_WIDTHS = (128, 384)
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+
+HTML_SUFFIXES = {".html", ".htm"}
+_IMG_TAG = re.compile(r'<img\b([^>]*?)\bsrc="(/static/[^"]+)"([^>]*)>')
+
+
+def _fingerprint(body):
+    """Short content hash used in asset filenames"""
+    return hashlib.sha256(body).hexdigest()[:10]
+
+
+def _media_type(path):
+    media_type, _ = mimetypes.guess_type(str(path))
+    return media_type or "application/octet-stream"
+
+
+def _make_entry(body, media_type):
+    """
+    Build one servable representation with its precompressed encodings
+
+    Args:
+        body (bytes): Uncompressed body
+        media_type (str): Content type
+
+    Returns:
+        dict: body, media_type, etag and encodings (name -> bytes)
+    """
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    encodings = {}
+    if media_type.split(";")[0] in COMPRESSIBLE_TYPES and len(body) >= MIN_COMPRESS_SIZE:
+        gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gzipped) < len(body):
+            encodings["gzip"] = gzipped
+        if BROTLI_AVAILABLE:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                encodings["br"] = compressed
+    return {
+        "body": body,
+        "media_type": media_type,
+        "etag": f'"{digest}"',
+        "encodings": encodings,
+    }
+
+
+def _encode_image(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
+    elif fmt == "AVIF":
+        image.save(buffer, format="AVIF", quality=AVIF_QUALITY)
+    else:
+        image.save(buffer, format=fmt, optimize=True)
+    return buffer.getvalue()
+
+
+def _image_variants(image, original_body, media_type):
+    """
+    Encode an image as WebP/AVIF; keep only variants smaller than the original
+
+    Returns:
+        dict: media type -> entry (always includes the original format)
+    """
+    variants = {media_type: _make_entry(original_body, media_type)}
+    candidates = []
+    if WEBP_AVAILABLE:
+        candidates.append(("WEBP", "image/webp"))
+    if AVIF_AVAILABLE:
+        candidates.append(("AVIF", "image/avif"))
+    for fmt, candidate_type in candidates:
+        if candidate_type == media_type:
+            continue
+        try:
+            body = _encode_image(image, fmt)
+        except Exception:
+            continue
+        if len(body) < len(original_body):
+            variants[candidate_type] = _make_entry(body, candidate_type)
+    return variants
+
+
+def _resized(image, width, fmt):
+    """Downscale an image to `width` pixels wide, re-encoded in its own format"""
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    if fmt == "JPEG" and resized.mode not in ("RGB", "L"):
+        resized = resized.convert("RGB")
+    return resized, _encode_image(resized, fmt)
+
+
+def _hashed_name(rel_path, digest, tag=""):
+    path = Path(rel_path)
+    return str(path.with_name(f"{path.stem}.{digest}{tag}{path.suffix}")).replace("\\", "/")
+
+
+def _static_url(rel_path):
+    return "/static/" + quote(rel_path)
+
+
+def _add_srcset(html, srcsets):
+    """Add srcset to <img> tags that declare `sizes` and point at a variant-backed image"""
+    def replace(match):
+        before, url, after = match.groups()
+        srcset = srcsets.get(url)
+        if not srcset or "srcset=" in before + after or "sizes=" not in before + after:
+            return match.group(0)
+        return f'<img{before}src="{url}" srcset="{srcset}"{after}>'
+    return _IMG_TAG.sub(replace, html)
+
+
+def load_static_assets(frontend_path):
+    """
+    Build the in-memory asset manifest for the frontend directory
+
+    Every file is reachable under its original path (revalidated with ETag)
+    and under a content-hashed path (cached forever). Raster images also get
+    width variants and WebP/AVIF encodings; HTML is rewritten to reference
+    the hashed URLs.
+
+    Args:
+        frontend_path (Path): Directory with index.html and images/
+
+    Returns:
+        dict: relative path -> asset ({"variants", "cache_control"})
+    """
+    frontend_path = Path(frontend_path)
+    assets = {}
+    url_rewrites = {}
+    srcsets = {}
+    html_files = []
+
+    for file_path in sorted(p for p in frontend_path.rglob("*") if p.is_file()):
+        rel_path = file_path.relative_to(frontend_path).as_posix()
+        if file_path.suffix.lower() in HTML_SUFFIXES:
+            html_files.append((rel_path, file_path))
+            continue
+
+        body = file_path.read_bytes()
+        media_type = _media_type(file_path)
+        digest = _fingerprint(body)
+        hashed_path = _hashed_name(rel_path, digest)
+
+        variants = None
+        if file_path.suffix.lower() in RASTER_SUFFIXES:
+            try:
+                with Image.open(io.BytesIO(body)) as image:
+                    image.load()
+                    fmt = image.format
+                    variants = _image_variants(image, body, media_type)
+                    srcset = []
+                    for width in IMAGE_WIDTHS:
+                        if width >= image.width:
+                            continue
+                        resized, resized_body = _resized(image, width, fmt)
+                        width_path = _hashed_name(rel_path, digest, f".w{width}")
+                        assets[width_path] = {
+                            "variants": _image_variants(resized, resized_body, media_type),
+                            "cache_control": IMMUTABLE_CACHE_CONTROL,
+                        }
+                        srcset.append(f"{_static_url(width_path)} {width}w")
+                    if srcset:
+                        srcset.append(f"{_static_url(hashed_path)} {image.width}w")
+                        srcsets[_static_url(hashed_path)] = ", ".join(srcset)
+            except Exception:
+                variants = None
+        if variants is None:
+            variants = {media_type: _make_entry(body, media_type)}
+
+        assets[hashed_path] = {"variants": variants, "cache_control": IMMUTABLE_CACHE_CONTROL}
+        assets[rel_path] = {"variants": variants, "cache_control": REVALIDATE_CACHE_CONTROL}
+        url_rewrites[_static_url(rel_path)] = _static_url(hashed_path)
+
+    # Longest URLs first so no URL is rewritten inside a longer one
+    rewrite_pattern = None
+    if url_rewrites:
+        rewrite_pattern = re.compile("|".join(
+            re.escape(url) for url in sorted(url_rewrites, key=len, reverse=True)
+        ))
+
+    for rel_path, file_path in html_files:
+        html = file_path.read_text(encoding="utf-8")
+        if rewrite_pattern:
+            html = rewrite_pattern.sub(lambda m: url_rewrites[m.group(0)], html)
+            html = _add_srcset(html, srcsets)
+        media_type = "text/html; charset=utf-8"
+        assets[rel_path] = {
+            "variants": {media_type: _make_entry(html.encode("utf-8"), media_type)},
+            "cache_control": REVALIDATE_CACHE_CONTROL,
+        }
+
+    return assets
+
+
+def _accepted(header):
+    """Parse an Accept / Accept-Encoding header into the set of accepted tokens"""
+    accepted = set()
+    for item in (header or "").split(","):
+        token, _, params = item.strip().partition(";")
+        if not token:
+            continue
+        q = params.replace(" ", "")
+        if q.startswith("q=") and q[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+def serve_asset(request, asset):
+    """
+    Serve an asset, negotiating image format and content encoding
+
+    Args:
+        request: Incoming request
+        asset (dict): Manifest entry from load_static_assets
+
+    Returns:
+        Response: 200 with the best representation, or 304 Not Modified
+    """
+    variants = asset["variants"]
+    vary = []
+
+    entry = next(iter(variants.values()))
+    if len(variants) > 1:
+        vary.append("Accept")
+        accept = _accepted(request.headers.get("accept"))
+        acceptable = [
+            candidate for media_type, candidate in variants.items()
+            if media_type in accept or candidate is entry
+        ]
+        entry = min(acceptable, key=lambda candidate: len(candidate["body"]))
+
+    body = entry["body"]
+    etag = entry["etag"]
+    headers = {"Cache-Control": asset["cache_control"]}
+    if entry["encodings"]:
+        vary.append("Accept-Encoding")
+        accept_encoding = _accepted(request.headers.get("accept-encoding"))
+        for encoding in ("br", "gzip"):
+            if encoding in entry["encodings"] and encoding in accept_encoding:
+                body = entry["encodings"][encoding]
+                etag = f'{etag[:-1]}-{encoding}"'
+                headers["Content-Encoding"] = encoding
+                break
+
+    headers["ETag"] = etag
+    if vary:
+        headers["Vary"] = ", ".join(vary)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=entry["media_type"], headers=headers)
@@ -13,7 +13,9 @@ try:
         get_dustbin_icon,
         normalize_class_name,
         get_fallback_awareness_tip,
-        validate_image_format
+        validate_image_format,
+        build_class_category_table,
+        classify_detections
     )
     print("✅ utils.py imported successfully")
 except Exception as e:
@@ -76,6 +78,409 @@ print("-" * 50)
 tip = generate_awareness_tip("plastic_bottle", "RECYCLABLE", 0.85)
 print(f"  Tip: {tip}")
 
+# Test 7: Vectorized category rules
+print("\n📋 Testing Category Rules (batch):")
+print("-" * 50)
+model_names = {0: "general waste", 1: "hazardous waste", 2: "organic", 3: "recyclable"}
+class_table = build_class_category_table(model_names)
+batch = [
+    ([3, 1], [0.70, 0.30]),   # RECYCLABLE with a HAZARDOUS runner-up
+    ([3, 0], [0.60, 0.30]),   # RECYCLABLE with a GENERAL runner-up
+    ([2], [0.90]),            # confident ORGANIC
+    ([], []),                 # nothing detected
+]
+expected = ["HAZARDOUS", "GENERAL", "ORGANIC", None]
+for result, want in zip(classify_detections(batch, class_table, model_names), expected):
+    got = result["category"] if result else None
+    status = "✅" if got == want else "❌"
+    correction = result["correction"] if result else None
+    print(f"  {status} {got} (correction: {correction})")
+    assert got == want
+
+# Test 8: Admission control
+print("\n📋 Testing Admission Control:")
+print("-" * 50)
+import asyncio
+from admission import AdmissionController, Overloaded
+
+
+async def check_admission():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.2, degrade_depth=1)
+    await controller.acquire()                        # takes the only slot
+    waiter = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1 and controller.should_degrade()
+    try:
+        await controller.acquire()                    # queue full -> shed
+        raise AssertionError("expected Overloaded")
+    except Overloaded as e:
+        print(f"  ✅ Shed when saturated (reason: {e.reason}, Retry-After: {e.retry_after}s)")
+    controller.release(0.05)                          # slot handed to the waiter
+    await waiter
+    assert controller.in_flight == 1 and controller.queue_depth == 0
+    print("  ✅ Released slot handed to queued request")
+    late = asyncio.ensure_future(controller.acquire())
+    try:
+        await late                                    # nobody releases -> deadline
+        raise AssertionError("expected Overloaded")
+    except Overloaded as e:
+        assert e.reason == "deadline"
+        print("  ✅ Queued request dropped at its deadline")
+    controller.release()
+    assert controller.in_flight == 0
+
+
+asyncio.run(check_admission())
+
+# Test 9: Classification history
+print("\n📋 Testing Classification History:")
+print("-" * 50)
+import tempfile
+import time
+from pathlib import Path
+from history import HistoryWriter, hourly_distribution, summary
+
+with tempfile.TemporaryDirectory() as tmp:
+    db_path = os.path.join(tmp, "history.db")
+    writer = HistoryWriter(db_path, batch_size=2, flush_interval=0.05)
+    writer.start()
+    now = time.time()
+    for category, model_used, confidence in [
+        ("RECYCLABLE", "gemini", 0.9), ("ORGANIC", "yolo", 0.5), ("ORGANIC", "yolo", 0.8),
+    ]:
+        writer.record((now, "req", category, model_used, confidence, int(confidence < 0.65), "item", 12.0))
+    writer.stop()
+    stats = summary(24, path=db_path)
+    assert stats["total"] == 3 and stats["categories"]["ORGANIC"] == 2
+    assert stats["model_share"]["yolo"] == round(2 / 3, 4)
+    assert stats["low_confidence_rate"] == round(1 / 3, 4)
+    print(f"  ✅ Summary: {stats['categories']} | share {stats['model_share']}")
+    hourly = hourly_distribution(24, path=db_path)
+    assert len(hourly) == 1 and hourly[0]["categories"]["RECYCLABLE"] == 1
+    print(f"  ✅ Hourly rollup: {hourly}")
+    missing = os.path.join(tmp, "missing.db")
+    assert summary(24, path=missing)["total"] == 0 and hourly_distribution(24, path=missing) == []
+    assert not os.path.exists(missing)
+    print("  ✅ Stats read-only: empty without a database, none created")
+
+# Test 10: Active-learning capture
+print("\n📋 Testing Active-Learning Capture:")
+print("-" * 50)
+import numpy as np
+from PIL import Image
+from active_learning import SampleCapture, TeacherCapture
+
+with tempfile.TemporaryDirectory() as tmp:
+    capture = SampleCapture(tmp, quota_mb=5, compare_rate=1.0)
+    yolo_guess = {"category": "GENERAL", "confidence": 0.9, "boxes": [[3, 0.5, 0.5, 0.4, 0.4, 0.9]]}
+    capture.start(0.65, predict=lambda image: yolo_guess)
+    pixels = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    photo = Image.fromarray(pixels)
+    gemini_guess = {"category": "RECYCLABLE", "confidence": 0.9}
+    capture.submit(photo, "req-1", gemini=gemini_guess)                       # disagreement
+    capture.submit(photo.resize((320, 240)), "req-2", gemini=gemini_guess)   # same photo, smaller
+    capture.stop()
+    labels = list((Path(tmp) / "labels").glob("*.txt"))
+    assert len(labels) == 1 and labels[0].read_text().startswith("0 0.5")
+    print(f"  ✅ Disagreement captured once, labelled with Gemini's class: {labels[0].read_text().strip()}")
+
+with tempfile.TemporaryDirectory() as tmp:
+    teacher = TeacherCapture(tmp, quota_mb=5, sample_rate=1.0)
+    teacher.start(0.65, predict=lambda image: None)  # capture check skipped: requests in flight
+    teacher.submit(photo, "req-3", gemini=gemini_guess)
+    teacher.stop()
+    labels = list((Path(tmp) / "labels").glob("*.txt"))
+    assert len(labels) == 1 and labels[0].read_text() == "0 0.5 0.5 1 1\n"
+    print("  ✅ Teacher label kept for the whole frame while YOLO is busy")
+
+# Test 11: Test-time augmentation
+print("\n📋 Testing Test-Time Augmentation:")
+print("-" * 50)
+from tta import TestTimeAugmentation, augmented_views, average_scores, apply_correction_rules
+
+views = augmented_views(photo, scales=(0.8, 0.6))
+assert [view.size for view in views] == [(640, 480), (512, 384), (512, 384), (384, 288), (384, 288)]
+print(f"  ✅ {len(views)} views: flip + centre crops with flips")
+averaged = average_scores([{"scores": {"RECYCLABLE": 0.5}}, None, {"scores": {"RECYCLABLE": 0.7, "HAZARDOUS": 0.9}}])
+assert round(averaged["RECYCLABLE"], 4) == 0.4 and round(averaged["HAZARDOUS"], 4) == 0.3
+print(f"  ✅ Views without detections count as 0: RECYCLABLE {averaged['RECYCLABLE']:.2f}")
+assert apply_correction_rules("RECYCLABLE", 0.4, averaged)[0] == "HAZARDOUS"
+budgeted = TestTimeAugmentation(budget_ms=100, scales=(0.8, 0.6), max_views=5)
+assert budgeted.view_count(30) == 3 and budgeted.view_count(150) == 0 and budgeted.view_count(5) == 5
+print("  ✅ View count fits the latency budget (30 ms/view, 100 ms budget -> 3 views)")
+
+# Test 12: Shared state across workers
+print("\n📋 Testing Shared State:")
+print("-" * 50)
+from concurrent.futures import ProcessPoolExecutor
+from shared_state import MemoryState, RateLimiter, SQLiteState
+from metrics import Counter, MetricsSync, render_metrics
+
+
+def increment_shared(path):
+    state = SQLiteState(path)
+    for _ in range(50):
+        state.incr("hits")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "state.db")
+        for state in (MemoryState(), SQLiteState(db_path)):
+            assert state.set("k", "v", ex=60) and state.get("k") == b"v"
+            assert state.set("k", "other", nx=True) is None and 0 < state.ttl("k") <= 60
+            assert state.incr("n") == 1 and state.incr("n", 4) == 5 and state.get("n") == b"5"
+            state.pipeline().hincrbyfloat("h", "a", 1.5).hincrbyfloat("h", "a", 1).execute()
+            assert state.hgetall("h") == {b"a": b"2.5"}
+            limiter = RateLimiter("test", limit=2, state=state)
+            assert [limiter.allow() for _ in range(3)] == [True, True, False]
+            print(f"  ✅ {type(state).__name__}: get/set/incr/expire/hash/pipeline/rate limit")
+
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            list(pool.map(increment_shared, [db_path, db_path]))
+        assert SQLiteState(db_path).get("hits") == b"100"
+        print("  ✅ Two processes incremented one SQLite counter to 100")
+
+        # Two "workers" with their own counters push into one store
+        shared = SQLiteState(db_path)
+        workers = [Counter("test_requests_total", "Requests", ("path",)) for _ in range(2)]
+        workers[0].inc("gemini", amount=3)
+        workers[1].inc("gemini")
+        workers[1].inc("yolo")
+        for counter in workers:
+            sync = MetricsSync(shared, registry=[counter])
+            sync.push()
+            sync.push()  # nothing new - no double counting
+        text = render_metrics([workers[0]], state=shared)
+        assert 'test_requests_total{path="gemini"} 4' in text and 'test_requests_total{path="yolo"} 1' in text
+        print("  ✅ Metrics from two workers aggregated")
+
+# Test 13: Model registry and hot swap
+print("\n📋 Testing Model Registry:")
+print("-" * 50)
+import model_registry
+from model_registry import LoadedModel, ModelManager
+
+with tempfile.TemporaryDirectory() as tmp:
+    registry = Path(tmp) / "registry"
+    default_weights = Path(tmp) / "best.pt"
+    default_weights.write_bytes(b"weights-v0")
+    for version in ("v1", "v2"):
+        weights = Path(tmp) / f"{version}.pt"
+        weights.write_bytes(f"weights-{version}".encode())
+        model_registry.register(weights, version, registry=registry)
+    assert [info["version"] for info in model_registry.list_versions(registry)] == ["v2", "v1"]
+
+    def stub_loader(path, version, predict_args):
+        return LoadedModel(Path(path).read_bytes(), path, version, class_table=None)
+
+    manager = ModelManager(default_weights, registry=registry, watch_interval=0, loader=stub_loader)
+    assert manager.load_initial().version.startswith("unregistered-")
+    print(f"  ✅ Empty registry serves MODEL_PATH as {manager.current.version}")
+    in_flight = manager.current
+    manager.swap_to("v1")
+    model_registry.activate("v1", registry)
+    manager.swap_to("v2")
+    model_registry.activate("v2", registry)
+    assert manager.current.version == "v2" and in_flight.version.startswith("unregistered-")
+    assert model_registry.previous_version(registry) == "v1"
+    assert model_registry.resolve_current(default_weights, registry)[1] == "v2"
+    print("  ✅ Swapped v1 -> v2; a request holding the old model keeps it")
+    try:
+        manager.swap_to("v3")
+        raise AssertionError("expected failure")
+    except FileNotFoundError:
+        pass
+    assert manager.current.model == b"weights-v2" and manager.status["state"] == "failed"
+    print("  ✅ Failed load leaves the serving model untouched")
+    assert model_registry.prune(registry=registry) == ["v1"]
+    assert model_registry.previous_version(registry) is None
+    assert model_registry.resolve_current(default_weights, registry)[1] == "v2"
+    print("  ✅ Prune keeps only the active version and clears the rollback target")
+
+# Test 14: Shadow evaluation of a candidate model
+print("\n📋 Testing Shadow Evaluation:")
+print("-" * 50)
+import io
+from shadow import ShadowEvaluator, report
+
+with tempfile.TemporaryDirectory() as tmp:
+    db_path = os.path.join(tmp, "shadow.db")
+    empty_model = lambda image, **kw: []  # candidate that never detects anything
+    evaluator = ShadowEvaluator(db_path, sample_rate=1.0, max_per_minute=2, state=MemoryState(),
+                                loader=lambda path, version, args: LoadedModel(empty_model, path, version, None))
+    evaluator.start("candidate-1")
+    upload = io.BytesIO()
+    photo.save(upload, format="JPEG")
+    timings = {"yolo_inference": 0.040}
+    assert evaluator.wants()
+    evaluator.submit(upload.getvalue(), "req-1", {"path": "yolo", "category": "ORGANIC"}, timings)
+    evaluator.submit(upload.getvalue(), "req-2", {"path": "no_detection", "category": None}, timings)
+    evaluator.submit(upload.getvalue(), "req-3", {"path": "yolo", "category": "ORGANIC"}, timings)  # over the limit
+    evaluator.stop()
+    shadow_stats = report("candidate-1", path=db_path)
+    assert shadow_stats["samples"] == 2 and shadow_stats["agreement"] == 0.5
+    assert shadow_stats["by_path"]["no_detection"]["agreement"] == 1.0
+    assert shadow_stats["confusion"] == {"ORGANIC": {"none": 1}, "none": {"none": 1}}
+    print(f"  ✅ Rate limited to 2 runs, agreement {shadow_stats['agreement']}, "
+          f"latency delta p50 {shadow_stats['latency_ms']['delta_vs_production_yolo']['p50']:.1f} ms")
+
+    busy = ShadowEvaluator(db_path, sample_rate=1.0, idle_wait=0.05, state=MemoryState(),
+                           loader=lambda path, version, args: LoadedModel(empty_model, path, version, None))
+    busy.start("candidate-2", busy=lambda: True)
+    busy.submit(upload.getvalue(), "req-4", {"path": "yolo", "category": "ORGANIC"}, timings)
+    busy.stop()
+    assert report("candidate-2", path=db_path)["samples"] == 0
+    print("  ✅ Candidate skipped while foreground requests are running")
+
+    from shadow import CANDIDATE_KEY, publish_candidate
+    from shared_state import key
+    store = MemoryState()
+    store.set(key(CANDIDATE_KEY), "")  # left by an earlier stop
+    configured = ShadowEvaluator(db_path, state=store)
+    configured.default = "candidate-env"
+    configured.set_candidate("candidate-env")
+    configured.refresh_candidate()
+    assert configured.candidate == "candidate-env"
+    publish_candidate("candidate-3", state=store)
+    configured.refresh_candidate()
+    assert configured.candidate == "candidate-3"
+    publish_candidate(None, state=store)
+    configured.refresh_candidate()
+    assert configured.candidate == "candidate-env" and store.get(key(CANDIDATE_KEY)) is None
+    print("  ✅ Cleared or empty override falls back to SHADOW_MODEL")
+
+# Test 15: Shared core - Gemini answer parsing and multipart parsing
+print("\n📋 Testing waste_core:")
+print("-" * 50)
+from waste_core.engine import parse_classification, sniff_image_type
+from waste_core.multipart import BodyTooLarge, MultipartError, find_file, read_body
+
+assert parse_classification("RECYCLABLE|plastic bottle|0.95") == ("RECYCLABLE", "plastic bottle", 0.95)
+assert parse_classification("GARBAGE|old battery|high") == ("HAZARDOUS", "old battery", 0.85)
+assert parse_classification("no idea") == (None, None, 0.0)
+print("  ✅ Gemini answers parsed (unknown category recovered from the item name)")
+
+assert sniff_image_type(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+assert sniff_image_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+assert sniff_image_type(b"\x00\x00\x00\x18ftypheic") == "image/heic"
+assert sniff_image_type(b"GIF89a") is None
+print("  ✅ Inline image types sniffed (GIF left for conversion)")
+
+image_bytes = b"\xff\xd8 --b \r\n-b\r\n not a delimiter \xff\xd9"
+body = (b"--b\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nimage\r\n"
+        b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a;b.jpg\"\r\n"
+        b"Content-Type: image/jpeg\r\n\r\n" + image_bytes + b"\r\n--b--\r\n")
+body = read_body(io.BytesIO(body), len(body), 1024, chunk_size=7)
+part, data = find_file(body, 'multipart/form-data; boundary="b"')
+assert data == image_bytes and part.filename == "a;b.jpg" and part.content_type == "image/jpeg"
+assert isinstance(data, memoryview) and data.obj is body  # a view into the read buffer, not a copy
+try:
+    find_file(body[:-8], "multipart/form-data; boundary=b")
+    raise AssertionError("expected MultipartError")
+except MultipartError:
+    pass
+for size, limit in ((len(body), 16), (len(body) + 1, 1024)):
+    try:
+        read_body(io.BytesIO(body), size, limit)
+        raise AssertionError("expected MultipartError")
+    except MultipartError as e:
+        assert isinstance(e, BodyTooLarge) == (limit == 16)
+print("  ✅ Multipart file part found by field name without copying; truncated and oversized bodies rejected")
+
+import http.client
+import socket
+from types import SimpleNamespace
+from waste_core.engine import RestGeminiModel
+
+
+class FakeConnection:
+    """Fails its first request with the given error, then answers"""
+    failures = []
+    requests = 0
+
+    def __init__(self, netloc, timeout):
+        pass
+
+    def request(self, method, path, body, headers):
+        FakeConnection.requests += 1
+        if FakeConnection.failures:
+            raise FakeConnection.failures.pop(0)
+
+    def getresponse(self):
+        return SimpleNamespace(status=200, read=lambda: b'{"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}')
+
+    def close(self):
+        pass
+
+
+rest = RestGeminiModel("key", "http://gemini.test")
+rest._connection_class = FakeConnection
+assert rest.generate_content("hi").text == "ok"
+FakeConnection.failures, FakeConnection.requests = [http.client.RemoteDisconnected("idle")], 0
+assert rest.generate_content("hi").text == "ok" and FakeConnection.requests == 2
+FakeConnection.failures, FakeConnection.requests = [socket.timeout("timed out")], 0
+try:
+    rest.generate_content("hi")
+    raise AssertionError("expected timeout")
+except socket.timeout:
+    assert FakeConnection.requests == 1
+print("  ✅ Stale kept-alive connection retried once; timeouts are not resent")
+
+# Test 16: Response compression middleware
+print("\n📋 Testing response compression:")
+print("-" * 50)
+import gzip
+import json
+from compression import CompressionMiddleware
+
+
+def run_compression(body, accept_encoding, content_type=b"application/json"):
+    async def inner(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type), (b"content-length", str(len(body)).encode()), (b"etag", b'"abc"')]})
+        await send({"type": "http.response.body", "body": body})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressionMiddleware(inner, minimum_size=100)(scope, None, send))
+    return dict(sent[0]["headers"]), sent[1]["body"]
+
+
+payload = json.dumps({"explanation": get_fallback_awareness_tip("RECYCLABLE") * 2}).encode()
+headers, body = run_compression(payload, b"gzip;q=1, br;q=0")
+assert headers[b"content-encoding"] == b"gzip" and gzip.decompress(body) == payload
+assert headers[b"etag"] == b'W/"abc"' and headers[b"vary"] == b"Accept-Encoding"
+assert int(headers[b"content-length"]) == len(body) < len(payload)
+assert run_compression(payload, b"identity")[1] == payload
+assert run_compression(b'{"ok":true}', b"gzip")[1] == b'{"ok":true}'
+assert run_compression(payload, b"gzip", content_type=b"image/jpeg")[1] == payload
+print(f"  ✅ {len(payload)} byte JSON sent as {len(body)} bytes gzip; small, non-JSON and identity untouched")
+
+# Test 17: Structured logging through the queue
+print("\n📋 Testing structured logging:")
+print("-" * 50)
+import logging
+import queue
+from logging_config import JsonFormatter, TracebackQueueHandler
+
+log_queue = queue.SimpleQueue()
+test_logger = logging.getLogger("test_backend.logging")
+test_logger.propagate = False
+test_logger.addHandler(TracebackQueueHandler(log_queue))
+try:
+    raise ValueError("boom")
+except ValueError:
+    test_logger.exception("Capture failed: %s", "boom", extra={"request_id": "req-1"})
+document = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+assert document["msg"] == "Capture failed: boom" and document["request_id"] == "req-1"
+assert "ValueError: boom" in document["exc"]
+print("  ✅ Exception logged through the queue keeps its traceback in the exc field")
+
 print("\n" + "=" * 50)
 print("✅ ALL TESTS PASSED - Backend modules working correctly!")
 print("=" * 50)
@@ -19,13 +19,14 @@ try:
     print("   ✅ gemini_service imported")
     
     print("\n3. Testing FastAPI app...")
-    from app import app, model
+    from app import app, models
     print("   ✅ FastAPI app imported")
-    print(f"   ✅ Model loaded: {model is not None}")
+    current = models.current
+    print(f"   ✅ Model loaded: {current is not None}")
     
-    if model:
-        print(f"   ✅ Model type: {type(model).__name__}")
-        print(f"   ✅ Model classes: {list(model.names.values())}")
+    if current:
+        print(f"   ✅ Model version: {current.version}")
+        print(f"   ✅ Model classes: {list(current.model.names.values())}")
     
     print("\n" + "=" * 60)
     print("✅ ALL IMPORTS SUCCESSFUL!")
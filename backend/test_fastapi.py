@@ -26,6 +26,48 @@ for route in expected_routes:
     else:
         print(f"  ❌ {route} missing")
 
+print("\nTesting background capture against foreground requests...")
+import threading
+import time
+from types import SimpleNamespace
+
+import app as app_module
+from model_registry import LoadedModel
+
+
+capture_runs = []
+
+
+def slow_model(image, **kwargs):
+    capture_runs.append(image)
+    time.sleep(0.5)
+    return []
+
+
+app_module.models.current = LoadedModel(lambda image, **kwargs: [], "serving.pt", "v1", None)
+app_module.load_model = lambda path, version, predict_args=None, warmup_runs=0: LoadedModel(slow_model, path, version, None)
+capture = threading.Thread(target=app_module.predict_for_capture, args=(None,))
+capture.start()
+time.sleep(0.05)
+start = time.perf_counter()
+app_module.run_yolo(None, SimpleNamespace(timings={}, verbose=False, request_id="test"), app_module.models.current)
+elapsed = time.perf_counter() - start
+capture.join()
+if elapsed < 0.1:
+    print(f"  ✅ Foreground YOLO ran in {elapsed * 1000:.0f} ms during a 500 ms capture check")
+else:
+    print(f"  ❌ Foreground YOLO waited {elapsed * 1000:.0f} ms for the capture check")
+    exit(1)
+
+app_module.admission.in_flight += 1
+app_module.predict_for_capture(None)
+app_module.admission.in_flight -= 1
+if len(capture_runs) == 1:
+    print("  ✅ Capture check skipped while requests are in flight")
+else:
+    print("  ❌ Capture check ran while requests were in flight")
+    exit(1)
+
 print("\n✅ FastAPI structure looks good!")
 print("\nNote: To run the server, install YOLOv8 dependencies:")
 print("  pip install ultralytics torch torchvision opencv-python")
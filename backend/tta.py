@@ -0,0 +1,129 @@
+"""
+Test-time augmentation (TTA) for uncertain YOLO predictions
+Only predictions below CONFIDENCE_THRESHOLD are re-checked, so the
+confident majority never pays for it. A horizontal flip and centre crops
+at a few scales (plus their flips) go through the model as one batch; the
+per-category scores of all views, the original included, are averaged and
+the correction rules are applied to the averaged result.
+
+The number of views is chosen per request to fit TTA_BUDGET_MS, using the
+measured cost of a view (initially the original inference time).
+"""
+
+import os
+import time
+
+from PIL import ImageOps
+
+from utils import CATEGORIES, CORRECTION_RULES, classify_detections
+
+# Configuration
+TTA_ENABLED = os.getenv("TTA_ENABLED", "false").lower() == "true"
+TTA_BUDGET_MS = float(os.getenv("TTA_BUDGET_MS", "300"))       # extra latency allowed per uncertain request
+TTA_SCALES = tuple(float(scale) for scale in os.getenv("TTA_SCALES", "0.8,0.6").split(",") if scale.strip())
+TTA_MAX_VIEWS = int(os.getenv("TTA_MAX_VIEWS", "5"))            # views besides the original
+
+
+def augmented_views(image, scales=TTA_SCALES):
+    """
+    Augmented copies of an image in priority order: flip, then a centre
+    crop and its flip for every scale
+    """
+    views = [ImageOps.mirror(image)]
+    width, height = image.size
+    for scale in scales:
+        crop_width, crop_height = round(width * scale), round(height * scale)
+        left, top = (width - crop_width) // 2, (height - crop_height) // 2
+        crop = image.crop((left, top, left + crop_width, top + crop_height))
+        views += [crop, ImageOps.mirror(crop)]
+    return views
+
+
+def average_scores(detections):
+    """Mean best confidence per category over views (a view without detections scores 0)"""
+    totals = dict.fromkeys(CATEGORIES, 0.0)
+    for detection in detections:
+        for name, score in (detection or {}).get("scores", {}).items():
+            totals[name] += score
+    return {name: total / len(detections) for name, total in totals.items()}
+
+
+def apply_correction_rules(category, confidence, scores, rules=CORRECTION_RULES):
+    """Scalar version of the rules in utils.classify_detections"""
+    for rule in rules:
+        if (category == rule["source"] and confidence < rule["below_confidence"]
+                and scores[rule["target"]] > rule["min_target_score"]):
+            return rule["target"], scores[rule["target"]], rule["name"]
+    return category, confidence, None
+
+
+class TestTimeAugmentation:
+    """Budgeted TTA pass for one uncertain prediction at a time"""
+
+    def __init__(self, budget_ms=TTA_BUDGET_MS, scales=TTA_SCALES, max_views=TTA_MAX_VIEWS):
+        self.budget_ms = budget_ms
+        self.scales = scales
+        self.max_views = min(max_views, 1 + 2 * len(scales))
+        self.view_ms = None  # EWMA cost of one view in a batched pass
+
+    def view_count(self, single_ms):
+        """
+        Views that fit the latency budget
+
+        Args:
+            single_ms (float): Duration of the original inference, used until
+                a TTA pass has been measured
+        """
+        cost = self.view_ms or single_ms
+        if not cost or cost <= 0:
+            return self.max_views
+        return max(0, min(self.max_views, int(self.budget_ms // cost)))
+
+    def refine(self, model, image, detection, class_table, single_ms=None, predict_args=None):
+        """
+        Re-score an uncertain prediction with augmented views
+
+        Args:
+            model: Loaded YOLO model (caller holds the model lock)
+            image (PIL.Image): Decoded RGB image
+            detection (dict): Original result from classify_detections
+            class_table (np.ndarray): Table from build_class_category_table
+            single_ms (float): Original inference time in milliseconds
+            predict_args (dict): Extra model call arguments (e.g. imgsz)
+
+        Returns:
+            dict or None: Detection with averaged category/confidence and
+                "tta_views", or None when no view fits the budget
+        """
+        count = self.view_count(single_ms)
+        if count == 0:
+            return None
+        views = augmented_views(image, self.scales)[:count]
+
+        start = time.perf_counter()
+        results = model(views, verbose=False, **(predict_args or {}))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        per_view = elapsed_ms / count
+        self.view_ms = per_view if self.view_ms is None else 0.8 * self.view_ms + 0.2 * per_view
+
+        view_detections = classify_detections(
+            [(r.boxes.cls.cpu().numpy(), r.boxes.conf.cpu().numpy()) for r in results],
+            class_table,
+            results[0].names,
+        )
+        scores = average_scores([detection] + view_detections)
+        category = max(CATEGORIES, key=scores.get)
+        category, confidence, correction = apply_correction_rules(category, scores[category], scores)
+
+        if category == detection["category"]:
+            item = detection["detected_item"]
+        else:
+            item = next((d["detected_item"] for d in view_detections if d and d["category"] == category), category)
+        return {
+            "category": category,
+            "confidence": float(confidence),
+            "detected_item": item,
+            "scores": {name: score for name, score in scores.items() if score > 0},
+            "correction": correction,
+            "tta_views": count,
+        }
@@ -1,239 +1,146 @@
 """
 Utility functions for waste classification backend
-Provides dustbin color mapping, icons, and awareness tips
-"""
-
-def get_dustbin_color(waste_class):
-    """
-    Map waste class to dustbin color
-    
-    Args:
-        waste_class (str): Waste classification (RECYCLABLE, ORGANIC, HAZARDOUS, GENERAL)
-    
-    Returns:
-        str: Dustbin color (blue/green/red/grey)
-    """
-    color_mapping = {
-        "RECYCLABLE": "blue",
-        "ORGANIC": "green",
-        "HAZARDOUS": "red",
-        "GENERAL": "grey",
-        # Fallback mappings
-        "BIODEGRADABLE": "green",
-    }
-    
-    return color_mapping.get(waste_class.upper(), "grey")  # Default to general for safety
-
-
-def get_dustbin_icon(waste_class):
-    """
-    Get icon name for waste class
-    
-    Args:
-        waste_class (str): Waste classification
-    
-    Returns:
-        str: Icon identifier
-    """
-    icon_mapping = {
-        "RECYCLABLE": "recycle",
-        "ORGANIC": "leaf",
-        "HAZARDOUS": "warning",
-        "GENERAL": "trash",
-        "BIODEGRADABLE": "leaf",
-    }
-    
-    return icon_mapping.get(waste_class.upper(), "trash")
-
-
-def get_fallback_awareness_tip(waste_class):
-    """
-    Provide detailed awareness tips for waste disposal education
-    
-    Args:
-        waste_class (str): Waste classification
-    
-    Returns:
-        str: Detailed awareness tip with disposal instructions
-    """
-    tips = {
-        "ORGANIC": """🟢 ORGANIC / BIODEGRADABLE WASTE
-
-WHY GREEN DUSTBIN: This item is made of natural materials that decompose through biological processes. Microorganisms break it down into nutrient-rich compost within weeks to months.
-
-PROPER DISPOSAL:
-• Place in the GREEN dustbin (wet waste bin)
-• Do not mix with plastic or non-biodegradable items
-• Can be composted at home or community composting facilities
-• Keep separate from dry recyclable waste
-
-EXAMPLES: Food scraps, fruit & vegetable peels, tea bags, coffee grounds, eggshells, garden waste, leaves, flowers, paper napkins, cotton.
-
-ENVIRONMENTAL IMPACT: When organic waste goes to landfills instead of being composted, it produces methane - a greenhouse gas 25x more potent than CO2. Proper composting reduces landfill burden by 30% and creates free fertilizer for plants!
-
-💡 TIP: Start a small compost bin at home - your garden will thank you!""",
-        
-        "RECYCLABLE": """🔵 RECYCLABLE / DRY WASTE
-
-WHY BLUE DUSTBIN: This material can be collected, processed, and transformed into new products. Recycling conserves natural resources, saves energy, and reduces pollution.
-
-PROPER DISPOSAL:
-• Place in the BLUE dustbin (dry waste bin)
-• Rinse containers to remove food residue
-• Flatten cardboard boxes to save space
-• Remove caps from bottles (recycle separately)
-• Keep items clean and dry
-
-EXAMPLES: Plastic bottles (PET), glass bottles & jars, aluminum cans, steel/tin cans, cardboard, newspapers, magazines, office paper, cartons, metal containers.
-
-ENVIRONMENTAL IMPACT: Recycling one aluminum can saves enough energy to power a TV for 3 hours. Recycling paper saves 17 trees per ton. Plastic recycling reduces oil consumption and ocean pollution.
-
-💡 TIP: Check the recycling symbol (♻️) and number on plastics - Types 1 (PET) and 2 (HDPE) are most commonly recycled!""",
-        
-        "HAZARDOUS": """🔴 HAZARDOUS / DANGEROUS WASTE
-
-⚠️ WARNING: This item contains toxic, flammable, corrosive, or reactive materials that pose serious risks to human health and the environment.
-
-PROPER DISPOSAL:
-• Place in the RED dustbin or designated hazardous waste collection
-• NEVER throw in regular garbage bins
-• NEVER burn or bury hazardous waste
-• Store safely until you can dispose properly
-• Take to authorized e-waste collection centers
-
-EXAMPLES: Batteries (all types), electronic devices, mobile phones, computers, light bulbs (CFL/LED), paint, pesticides, cleaning chemicals, medicines, thermometers, aerosol cans.
-
-ENVIRONMENTAL IMPACT: Hazardous waste can contaminate soil and groundwater for decades. One battery can pollute 1 million liters of water. Electronic waste contains lead, mercury, and cadmium that cause serious health problems.
-
-⚠️ CRITICAL: Never mix hazardous items with other waste. Handle with care and dispose at authorized collection points only!
-
-💡 TIP: Many electronics stores and pharmacies accept old batteries and e-waste for safe recycling.""",
-
-        "GENERAL": """⬜ GENERAL / NON-RECYCLABLE WASTE
-
-WHY GREY DUSTBIN: This item cannot be easily recycled or composted with current technology. It requires proper disposal in the general waste stream.
-
-PROPER DISPOSAL:
-• Place in the GREY dustbin (general waste bin)
-• Reduce usage of such items when possible
-• Look for recyclable alternatives
-• Do not mix with organic or recyclable waste
-
-EXAMPLES: Chip bags, snack wrappers, tissues, sanitary products, diapers, rubber items, ceramics, broken toys, styrofoam, multi-layered packaging, candy wrappers, cigarette butts.
-
-ENVIRONMENTAL IMPACT: General waste typically ends up in landfills where it can take hundreds of years to decompose. Multi-layered packaging like chip bags combines plastic and aluminum, making recycling nearly impossible.
-
-💡 TIP: Choose products with less packaging and opt for recyclable alternatives when available. Every small choice adds up!"""
-    }
-    
-    return tips.get(waste_class.upper(), """⚠️ UNIDENTIFIED ITEM
-
-For your safety and environmental protection, when the waste type cannot be determined with certainty:
-
-RECOMMENDED ACTION:
-• Treat as HAZARDOUS waste (RED dustbin)
-• Do not mix with regular household waste
-• Check with local waste management authority
-• Look for disposal instructions on the product packaging
-
-When in doubt, it's always safer to handle unknown waste as potentially hazardous rather than risk contaminating recyclable or organic waste streams.
-
-💡 TIP: Take a photo and consult your local municipal waste guide for proper disposal instructions.""")
-
-
-def validate_image_format(filename):
-    """
-    Validate if uploaded file is an image
-    
-    Args:
-        filename (str): Name of the uploaded file
-    
-    Returns:
-        bool: True if valid image format, False otherwise
-    """
-    if not filename:
-        return False
-    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'jfif', 'pjpeg', 'pjp'}
-    if '.' not in filename:
-        return False
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in allowed_extensions
+Provides the vectorized category rules for YOLO detections; category
+metadata (dustbin colours, icons, awareness tips, keyword rules) lives in
+waste_core.categories and is re-exported here
 
+All lookup tables are built once at import and frozen (MappingProxyType)
+"""
 
-def get_class_description(waste_class):
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# waste_core sits at the repository root, next to backend/ and api/. Backend
+# modules import utils before waste_core, so this makes it importable when
+# the app is started from backend/ (the Dockerfile sets PYTHONPATH instead)
+REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+from waste_core.categories import (  # noqa: E402
+    CATEGORIES,
+    CATEGORY_INDEX,
+    CATEGORY_KEYWORDS,
+    CLASS_DESCRIPTIONS,
+    DUSTBIN_COLORS,
+    DUSTBIN_ICONS,
+    EXACT_CLASS_NAMES,
+    FALLBACK_TIPS,
+    get_class_description,
+    get_dustbin_color,
+    get_dustbin_icon,
+    get_fallback_awareness_tip,
+    match_category_keywords,
+    normalize_class_name,
+    validate_image_format,
+)
+
+
+# Corrections for the model's bias towards RECYCLABLE, evaluated in order.
+# A rule fires when the top prediction is `source` below `below_confidence`
+# and the best `target` detection scores above `min_target_score`.
+CORRECTION_RULES = (
+    {
+        "name": "RECYCLABLE->HAZARDOUS",
+        "source": "RECYCLABLE",
+        "target": "HAZARDOUS",
+        "below_confidence": 0.80,
+        "min_target_score": 0.20,
+    },
+    {
+        "name": "RECYCLABLE->GENERAL",
+        "source": "RECYCLABLE",
+        "target": "GENERAL",
+        "below_confidence": 0.80,
+        "min_target_score": 0.25,
+    },
+)
+
+
+def build_class_category_table(class_names):
     """
-    Get detailed description of waste class
+    Precompute the class-id -> category lookup table for a model
+    Call once at model load time with `model.names`
     
     Args:
-        waste_class (str): Waste classification
+        class_names (dict | list): Model class names (id -> name)
     
     Returns:
-        str: Detailed description
+        np.ndarray: Category index (into CATEGORIES) for every class id
     """
-    descriptions = {
-        "RECYCLABLE": "Materials that can be reprocessed and reused. Examples: plastic bottles, glass, metal cans, cardboard.",
-        
-        "ORGANIC": "Organic waste that decomposes naturally through biological processes. Examples: food scraps, leaves, garden waste.",
-        
-        "HAZARDOUS": "Waste that poses risks to health or environment. Examples: batteries, chemicals, medical waste, e-waste.",
-        
-        "GENERAL": "Non-recyclable items that go to landfill. Examples: chip bags, tissues, multi-layered wrappers."
-    }
+    if not isinstance(class_names, dict):
+        class_names = dict(enumerate(class_names))
     
-    return descriptions.get(waste_class.upper(), "Unknown waste category.")
+    size = max((int(class_id) for class_id in class_names), default=-1) + 1
+    table = np.full(size, CATEGORY_INDEX["GENERAL"], dtype=np.intp)
+    for class_id, name in class_names.items():
+        table[int(class_id)] = CATEGORY_INDEX[normalize_class_name(name)]
+    return table
 
 
-def normalize_class_name(yolo_class_name):
+def classify_detections(detections, class_table, class_names, rules=CORRECTION_RULES):
     """
-    Normalize YOLO model output to standard categories
-    Maps model output to display names (RECYCLABLE/ORGANIC/HAZARDOUS/GENERAL)
+    Resolve YOLO detections to a category for a batch of images at once
+    Picks the highest-confidence detection per image, then applies the
+    correction rules to every image in a single vectorized pass
     
     Args:
-        yolo_class_name (str): Class name from YOLO model
+        detections (list): One (class_ids, confidences) array pair per image
+        class_table (np.ndarray): Table from build_class_category_table
+        class_names (dict): Model class names (id -> name)
+        rules (tuple): Correction rules, see CORRECTION_RULES
     
     Returns:
-        str: Normalized category
+        list: Per image, a dict with category, confidence, detected_item,
+              scores (best confidence per category) and correction (rule
+              name or None) - or None when the image has no detections
     """
-    normalized = yolo_class_name.upper().strip()
-    
-    # Direct mappings for standard class names
-    if normalized == "RECYCLABLE":
-        return "RECYCLABLE"
-    
-    if normalized == "ORGANIC":
-        return "ORGANIC"
-    
-    # Map BIODEGRADABLE to ORGANIC for display
-    if normalized == "BIODEGRADABLE":
-        return "ORGANIC"
-    
-    if normalized == "HAZARDOUS":
-        return "HAZARDOUS"
-    
-    if normalized == "GENERAL":
-        return "GENERAL"
-    
-    # Fallback: try keyword matching for robustness
-    # Recyclable variations
-    recyclable_keywords = ['RECYCLABLE', 'RECYCLE', 'PLASTIC', 'PAPER', 'GLASS', 'METAL', 'CARDBOARD', 'ALUMINUM', 'CAN', 'BOTTLE']
-    if any(keyword in normalized for keyword in recyclable_keywords):
-        return "RECYCLABLE"
-    
-    # Organic/Biodegradable variations
-    organic_keywords = ['ORGANIC', 'BIODEGRADABLE', 'COMPOST', 'FOOD', 'GARDEN', 'LEAF', 'LEAVES', 'WOOD']
-    if any(keyword in normalized for keyword in organic_keywords):
-        return "ORGANIC"
-    
-    # Hazardous variations
-    hazardous_keywords = ['HAZARDOUS', 'HAZARD', 'BATTERY', 'CHEMICAL', 'MEDICAL', 'E-WASTE', 'TOXIC', 'PAINT', 'BULB']
-    if any(keyword in normalized for keyword in hazardous_keywords):
-        return "HAZARDOUS"
-    
-    # General waste variations
-    general_keywords = ['GENERAL', 'TRASH', 'TISSUE', 'WRAPPER', 'CHIP', 'SNACK', 'STYROFOAM']
-    if any(keyword in normalized for keyword in general_keywords):
-        return "GENERAL"
-    
-    # Default to GENERAL for unknown items
-    return "GENERAL"
-
+    counts = np.array([len(class_ids) for class_ids, _ in detections], dtype=np.intp)
+    results = [None] * len(detections)
+    present = np.flatnonzero(counts)
+    if len(present) == 0:
+        return results
+    
+    class_ids = np.concatenate([np.asarray(ids, dtype=np.intp).ravel() for ids, _ in detections])
+    confidences = np.concatenate([np.asarray(conf, dtype=np.float64).ravel() for _, conf in detections])
+    rows = np.repeat(np.arange(len(detections)), counts)
+    categories = class_table[class_ids]
+    
+    # Best confidence per (image, category)
+    scores = np.zeros((len(detections), len(CATEGORIES)))
+    np.maximum.at(scores, (rows, categories), confidences)
+    
+    # Top detection per image (first one wins on ties, like argmax)
+    order = np.lexsort((-np.arange(len(class_ids)), confidences, rows))
+    top = order[np.cumsum(counts)[present] - 1]
+    
+    category = categories[top]
+    confidence = confidences[top]
+    fired = np.full(len(present), -1)
+    image_scores = scores[present]
+    
+    for rule_idx, rule in enumerate(rules):
+        target = CATEGORY_INDEX[rule["target"]]
+        mask = (
+            (fired < 0)
+            & (category == CATEGORY_INDEX[rule["source"]])
+            & (confidence < rule["below_confidence"])
+            & (image_scores[:, target] > rule["min_target_score"])
+        )
+        category = np.where(mask, target, category)
+        confidence = np.where(mask, image_scores[:, target], confidence)
+        fired[mask] = rule_idx
+    
+    for i, image_idx in enumerate(present):
+        rule = rules[fired[i]] if fired[i] >= 0 else None
+        results[image_idx] = {
+            "category": CATEGORIES[category[i]],
+            "confidence": float(confidence[i]),
+            # Corrected predictions report the category instead of the raw class
+            "detected_item": rule["target"] if rule else class_names[int(class_ids[top[i]])],
+            "scores": {name: float(score) for name, score in zip(CATEGORIES, image_scores[i]) if score > 0},
+            "correction": rule["name"] if rule else None,
+        }
+    return results
@@ -0,0 +1,179 @@
+"""
+Shared helpers for the benchmark scripts
+Image corpus loading/generation, latency statistics and JSON result files
+"""
+
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_PATH = REPO_ROOT / "backend"
+RESULTS_PATH = Path(__file__).resolve().parent / "results"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+# Synthetic corpus: typical phone and downscaled upload sizes
+SYNTHETIC_SIZES = [(4032, 3024), (1920, 1440), (768, 576), (416, 416)]
+
+
+def add_backend_to_path():
+    """Make backend modules (utils, gemini_service, ...) importable"""
+    if str(BACKEND_PATH) not in sys.path:
+        sys.path.insert(0, str(BACKEND_PATH))
+
+
+def generate_synthetic_image(width, height, seed=0, quality=90):
+    """
+    Create a noisy JPEG so decode/encode costs resemble real photos
+
+    Args:
+        width (int): Image width
+        height (int): Image height
+        seed (int): Random seed for reproducible content
+        quality (int): JPEG quality
+
+    Returns:
+        bytes: JPEG file contents
+    """
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 64).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 2 + 1), y0 + rng.randrange(height // 2 + 1)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x0, y0, x1, y1), fill=color)
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def load_corpus(corpus_dir=None, synthetic_count=8):
+    """
+    Load benchmark images from a directory, or generate a synthetic corpus
+
+    Args:
+        corpus_dir (str): Directory of sample images (optional)
+        synthetic_count (int): Number of images to generate if no directory
+
+    Returns:
+        list: (name, bytes) tuples
+    """
+    if corpus_dir:
+        paths = sorted(p for p in Path(corpus_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+        if not paths:
+            raise FileNotFoundError(f"No images found in {corpus_dir}")
+        return [(p.name, p.read_bytes()) for p in paths]
+
+    corpus = []
+    for i in range(synthetic_count):
+        width, height = SYNTHETIC_SIZES[i % len(SYNTHETIC_SIZES)]
+        corpus.append((f"synthetic_{width}x{height}_{i}.jpg", generate_synthetic_image(width, height, seed=i)))
+    return corpus
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize_latencies(latencies):
+    """
+    Summary statistics for a list of latencies in seconds
+
+    Returns:
+        dict: count, mean and p50/p95/p99/max in milliseconds
+    """
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def time_call(func, repeat, warmup=2):
+    """
+    Time repeated calls of a zero-argument function
+
+    Returns:
+        dict: summarize_latencies() of the timed calls
+    """
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return summarize_latencies(latencies)
+
+
+def git_revision():
+    """Current git commit (short SHA), or 'unknown' outside a checkout"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def environment_info():
+    """Machine details stored with every result for fair comparisons"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+    }
+
+
+def save_results(kind, results, output=None):
+    """
+    Write benchmark results to JSON, tagged with commit and environment
+
+    Args:
+        kind (str): Benchmark name (e.g. "load", "micro")
+        results (dict): Benchmark measurements
+        output (str): Output file (default: benchmarks/results/<kind>-<sha>-<time>.json)
+
+    Returns:
+        Path: File written
+    """
+    revision = git_revision()
+    document = {
+        "benchmark": kind,
+        "git_revision": revision,
+        "timestamp": datetime.utcnow().isoformat(),
+        "environment": environment_info(),
+        "results": results,
+    }
+    if output:
+        path = Path(output)
+    else:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = RESULTS_PATH / f"{kind}-{revision}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2))
+    return path
@@ -0,0 +1,94 @@
+"""
+Compare two benchmark result files
+===================================
+Prints every latency percentile / throughput metric side by side and exits
+non-zero when a metric regressed by more than the threshold.
+
+Usage:
+    python benchmarks/compare.py results/micro-abc123-....json results/micro-def456-....json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+# Metric name suffix -> True if higher is better
+TRACKED_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "mean_ms": False,
+    "throughput_rps": True,
+}
+
+
+def flatten(node, prefix=""):
+    """Flatten nested dicts/lists into {"a.b.0.c": value}"""
+    items = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            items.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(node, list):
+        for index, value in enumerate(node):
+            items.update(flatten(value, f"{prefix}{index}."))
+    else:
+        items[prefix[:-1]] = node
+    return items
+
+
+def compare(baseline, candidate, threshold_pct):
+    """
+    Compare tracked metrics of two result documents
+
+    Returns:
+        tuple: (rows, regressions) where rows are (metric, old, new, change %)
+    """
+    old = flatten(baseline["results"])
+    new = flatten(candidate["results"])
+    rows = []
+    regressions = []
+    for metric in sorted(old.keys() & new.keys()):
+        suffix = metric.rsplit(".", 1)[-1]
+        if suffix not in TRACKED_METRICS:
+            continue
+        old_value, new_value = old[metric], new[metric]
+        if not isinstance(old_value, (int, float)) or not old_value:
+            continue
+        change = (new_value - old_value) / old_value * 100
+        rows.append((metric, old_value, new_value, change))
+        worse = -change if TRACKED_METRICS[suffix] else change
+        if worse > threshold_pct:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get("environment") != candidate.get("environment"):
+        print("⚠️  Results come from different environments - compare with care")
+    print(f"Baseline:  {baseline.get('git_revision')} ({baseline.get('timestamp')})")
+    print(f"Candidate: {candidate.get('git_revision')} ({candidate.get('timestamp')})\n")
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    for metric, old_value, new_value, change in rows:
+        flag = "❌" if metric in regressions else "  "
+        print(f"{flag} {metric:<70} {old_value:>10} -> {new_value:>10} ({change:+.1f}%)")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.threshold}%")
+        sys.exit(1)
+    print(f"\n✅ No regressions above {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
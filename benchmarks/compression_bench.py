@@ -0,0 +1,177 @@
+"""
+Response Compression Benchmark
+===============================
+Measures what the API's response compression (backend/compression.py) buys
+mobile clients: wire size and CPU cost per encoding and level for the real
+payloads (classification, no-detection, categories), and the resulting
+delivery time on throttled mobile network profiles. Also prices the
+handshakes that connection keep-alive (and HTTP/2 multiplexing) avoid.
+
+Delivery time is modelled as transfer time plus TCP slow-start rounds
+beyond the initial congestion window (10 segments), using the Chrome
+DevTools throttling presets.
+
+With --url the same sizes are read off a running server (Content-Length per
+Accept-Encoding), confirming what the middleware actually sends.
+
+Usage:
+    python benchmarks/compression_bench.py
+    python benchmarks/compression_bench.py --url http://127.0.0.1:8000 --image path/to/photo.jpg
+"""
+
+import argparse
+import gzip
+import urllib.request
+
+from bench_utils import add_backend_to_path, generate_synthetic_image, save_results, time_call
+
+add_backend_to_path()
+import compression  # noqa: E402
+from utils import get_fallback_awareness_tip  # noqa: E402 - also puts waste_core on sys.path
+from waste_core.responses import (  # noqa: E402
+    build_categories_payload,
+    build_gemini_response,
+    build_no_detection_response,
+    dumps,
+)
+
+# Chrome DevTools presets: (downlink kbit/s, round trip ms)
+NETWORK_PROFILES = {
+    "slow-3g": (400, 2000),
+    "fast-3g": (1600, 562.5),
+    "slow-4g": (9000, 170),
+}
+MSS = 1460        # bytes per TCP segment
+INIT_CWND = 10    # segments in the first round trip (RFC 6928)
+TLS_ROUND_TRIPS = 2  # TCP handshake + TLS 1.3; a reused connection skips both
+
+
+def sample_payloads():
+    """Representative API response bodies"""
+    classification = build_gemini_response(
+        "RECYCLABLE", "plastic bottle", 0.95, 0.65,
+        explanation=get_fallback_awareness_tip("RECYCLABLE"),
+    )
+    categories, _ = build_categories_payload(0.65)
+    return {
+        "classification": dumps(classification),
+        "no_detection": dumps(build_no_detection_response()),
+        "categories": categories,
+    }
+
+
+def encoders():
+    """(name, encoding, function) for every encoder/level measured"""
+    candidates = [(f"gzip-{level}", "gzip", lambda body, level=level: gzip.compress(body, level, mtime=0))
+                  for level in (1, 5, 9)]
+    if compression.BROTLI_AVAILABLE:
+        candidates += [(f"br-{quality}", "br", lambda body, quality=quality: compression.brotli.compress(body, quality=quality))
+                       for quality in (1, 4, 11)]
+    return candidates
+
+
+def delivery_ms(size, kbps, rtt_ms):
+    """Time to deliver size bytes once the request has reached the server"""
+    rounds, window, sent = 0, INIT_CWND * MSS, 0
+    while sent + window < size:
+        sent += window
+        window *= 2
+        rounds += 1
+    return size * 8 / kbps + rounds * rtt_ms
+
+
+def measure_payloads(repeat):
+    """
+    Size, CPU cost and mobile delivery time per payload and encoder
+
+    Returns:
+        dict: payload -> {"identity": {...}, encoder name: {...}}
+    """
+    results = {}
+    for name, body in sample_payloads().items():
+        rows = {"identity": {"bytes": len(body), "compress_ms": 0.0}}
+        for encoder, _, function in encoders():
+            timing = time_call(lambda: function(body), repeat)
+            rows[encoder] = {"bytes": len(function(body)), "compress_ms": timing["p50_ms"]}
+        for row in rows.values():
+            row["ratio"] = round(len(body) / row["bytes"], 2)
+            row["delivery_ms"] = {
+                profile: round(row["compress_ms"] + delivery_ms(row["bytes"], kbps, rtt), 1)
+                for profile, (kbps, rtt) in NETWORK_PROFILES.items()
+            }
+        results[name] = rows
+    return results
+
+
+def measure_server(base_url, image_bytes):
+    """
+    Wire sizes of a running server per Accept-Encoding
+
+    Returns:
+        dict: endpoint -> {accept-encoding: {"bytes", "encoding"}}
+    """
+    from load_test import build_multipart
+
+    body, content_type = build_multipart("sample.jpg", image_bytes)
+    requests = {
+        "/api/categories": lambda headers: urllib.request.Request(f"{base_url}/api/categories", headers=headers),
+        "/api/classify": lambda headers: urllib.request.Request(
+            f"{base_url}/api/classify", data=body, headers={**headers, "Content-Type": content_type}),
+    }
+    results = {}
+    for path, make_request in requests.items():
+        results[path] = {}
+        for accept in ("identity", "gzip", "br"):
+            with urllib.request.urlopen(make_request({"Accept-Encoding": accept}), timeout=120) as response:
+                results[path][accept] = {
+                    "bytes": len(response.read()),
+                    "encoding": response.headers.get("Content-Encoding", "identity"),
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed compressions per encoder")
+    parser.add_argument("--url", default=None, help="Also measure a running server")
+    parser.add_argument("--image", default=None, help="Upload for --url (default: synthetic JPEG)")
+    parser.add_argument("--output", default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    payloads = measure_payloads(args.repeat)
+    handshake_ms = {profile: rtt * TLS_ROUND_TRIPS for profile, (_, rtt) in NETWORK_PROFILES.items()}
+    results = {
+        "middleware": {
+            "min_size": compression.COMPRESS_MIN_SIZE,
+            "gzip_level": compression.GZIP_LEVEL,
+            "brotli_quality": compression.BROTLI_QUALITY,
+            "brotli_available": compression.BROTLI_AVAILABLE,
+        },
+        "profiles": {name: {"kbps": kbps, "rtt_ms": rtt} for name, (kbps, rtt) in NETWORK_PROFILES.items()},
+        "payloads": payloads,
+        "reconnect_cost_ms": handshake_ms,
+    }
+
+    profiles = list(NETWORK_PROFILES)
+    for name, rows in payloads.items():
+        print(f"\n📦 {name} ({rows['identity']['bytes']} bytes)")
+        print(f"  {'encoder':<10} {'bytes':>7} {'ratio':>6} {'cpu ms':>7}  " + "  ".join(f"{p:>9}" for p in profiles))
+        for encoder, row in rows.items():
+            print(f"  {encoder:<10} {row['bytes']:>7} {row['ratio']:>6} {row['compress_ms']:>7.3f}  "
+                  + "  ".join(f"{row['delivery_ms'][p]:>7.1f}ms" for p in profiles))
+    print("\n🔌 Handshake avoided per reused connection (keep-alive / HTTP/2): "
+          + ", ".join(f"{p} {ms:.0f} ms" for p, ms in handshake_ms.items()))
+
+    if args.url:
+        image = open(args.image, "rb").read() if args.image else generate_synthetic_image(1920, 1440)
+        results["server"] = measure_server(args.url.rstrip("/"), image)
+        for path, rows in results["server"].items():
+            print(f"🌐 {path}: " + ", ".join(f"{accept} -> {row['bytes']} B ({row['encoding']})"
+                                            for accept, row in rows.items()))
+
+    path = save_results("compression", results, args.output)
+    print(f"\n💾 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
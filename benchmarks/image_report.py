@@ -0,0 +1,165 @@
+"""
+Container Image Report
+=======================
+Size and startup time of a built image, run after every image build (see
+.github/workflows/container-image.yml):
+
+- image size and its largest layers (docker history)
+- startup: container start until /health reports the model loaded, over
+  several fresh containers
+- the first classification after startup (YOLO only, Gemini disabled)
+
+Writes benchmarks/results/image-<sha>-<time>.json and, under GitHub
+Actions, a Markdown table to the job summary. --max-size-mb and
+--max-startup-s turn the report into a gate.
+
+Usage:
+    docker build -t waste-classifier .
+    python benchmarks/image_report.py waste-classifier --runs 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from bench_utils import generate_synthetic_image, save_results, summarize_latencies
+from load_test import build_multipart
+
+MB = 1024 * 1024
+
+
+def docker(*args):
+    return subprocess.check_output(["docker", *args], text=True).strip()
+
+
+def image_size(image):
+    """
+    Image size and its largest layers
+
+    Returns:
+        dict: size_mb and layers (size_mb, created_by) largest first
+    """
+    size = int(docker("image", "inspect", "--format", "{{.Size}}", image))
+    layers = []
+    for line in docker("history", "--no-trunc", "--human=false", "--format", "{{.Size}}\t{{.CreatedBy}}", image).splitlines():
+        layer_size, _, created_by = line.partition("\t")
+        if int(layer_size or 0) > 0:
+            layers.append({"size_mb": round(int(layer_size) / MB, 1), "created_by": " ".join(created_by.split())[:120]})
+    layers.sort(key=lambda layer: layer["size_mb"], reverse=True)
+    return {"size_mb": round(size / MB, 1), "layers": layers[:8]}
+
+
+def wait_for_model(base_url, timeout):
+    """Poll /health until the model is loaded; seconds waited, or None on timeout"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2) as response:
+                if json.loads(response.read()).get("model_loaded"):
+                    return time.perf_counter() - start
+        except Exception:
+            pass
+        time.sleep(0.1)
+    return None
+
+
+def first_classification(base_url, image_bytes):
+    body, content_type = build_multipart("sample.jpg", image_bytes)
+    request = urllib.request.Request(f"{base_url}/api/classify", data=body, headers={"Content-Type": content_type})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def measure_startup(image, runs, port, timeout, env):
+    """
+    Start fresh containers and time them to a loaded model and a first answer
+
+    Returns:
+        dict: Latency summaries for startup and first classification
+    """
+    image_bytes = generate_synthetic_image(1280, 960)
+    startups, first_requests = [], []
+    env_args = [arg for key, value in env.items() for arg in ("-e", f"{key}={value}")]
+    for run in range(runs):
+        container = docker("run", "-d", "--rm", "-p", f"127.0.0.1:{port}:8000", *env_args, image)
+        try:
+            elapsed = wait_for_model(f"http://127.0.0.1:{port}", timeout)
+            if elapsed is None:
+                print(docker("logs", "--tail", "40", container))
+                raise RuntimeError(f"model not loaded within {timeout}s")
+            startups.append(elapsed)
+            first_requests.append(first_classification(f"http://127.0.0.1:{port}", image_bytes))
+            print(f"  run {run + 1}: ready in {elapsed:.1f}s, first classification {first_requests[-1] * 1000:.0f} ms")
+        finally:
+            subprocess.run(["docker", "rm", "-f", container], capture_output=True)
+    return {"startup": summarize_latencies(startups), "first_classification": summarize_latencies(first_requests)}
+
+
+def markdown(image, results):
+    size, startup = results["size"], results["startup"]
+    lines = [
+        f"### Container image `{image}`",
+        "",
+        "| Metric | Value |",
+        "|--------|-------|",
+        f"| Image size | {size['size_mb']:.0f} MB |",
+        f"| Startup to model loaded (p50 / max) | {startup['startup']['p50_ms'] / 1000:.1f} s / "
+        f"{startup['startup']['max_ms'] / 1000:.1f} s |",
+        f"| First classification (p50) | {startup['first_classification']['p50_ms']:.0f} ms |",
+        "",
+        "| Largest layers | MB |",
+        "|----------------|----|",
+    ]
+    lines += [f"| `{layer['created_by'][:80]}` | {layer['size_mb']:.0f} |" for layer in size["layers"]]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size and startup report for a built image")
+    parser.add_argument("image", nargs="?", default="waste-classifier", help="Image tag")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh containers to time")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the model")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra container environment (repeatable)")
+    parser.add_argument("--max-size-mb", type=float, default=None, help="Fail when the image is larger")
+    parser.add_argument("--max-startup-s", type=float, default=None, help="Fail when p50 startup is slower")
+    parser.add_argument("--output", default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    env = {"ENABLE_GEMINI": "false", "WEB_CONCURRENCY": "1"}
+    env.update(item.split("=", 1) for item in args.env)
+
+    print(f"📦 Image {args.image}")
+    size = image_size(args.image)
+    print(f"  size {size['size_mb']:.0f} MB")
+    print(f"⏱️  Starting {args.runs} container(s) ...")
+    startup = measure_startup(args.image, args.runs, args.port, args.timeout, env)
+    results = {"image": args.image, "env": env, "size": size, "startup": startup}
+
+    path = save_results("image", results, args.output)
+    report = markdown(args.image, results)
+    print("\n" + report)
+    print(f"💾 Results saved to {path}")
+    if os.getenv("GITHUB_STEP_SUMMARY"):
+        with open(os.environ["GITHUB_STEP_SUMMARY"], "a") as summary:
+            summary.write(report)
+
+    failures = []
+    if args.max_size_mb is not None and size["size_mb"] > args.max_size_mb:
+        failures.append(f"image {size['size_mb']:.0f} MB > {args.max_size_mb:.0f} MB")
+    if args.max_startup_s is not None and startup["startup"]["p50_ms"] / 1000 > args.max_startup_s:
+        failures.append(f"startup p50 {startup['startup']['p50_ms'] / 1000:.1f}s > {args.max_startup_s:.1f}s")
+    if failures:
+        print("❌ Budget exceeded: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
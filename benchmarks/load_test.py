@@ -0,0 +1,277 @@
+"""
+Load Test for /api/classify
+============================
+Drives the classification endpoint at a configurable concurrency with a
+corpus of sample images and reports throughput and p50/p95/p99 latency.
+Per-stage server timings are taken from the /metrics endpoint.
+
+Typical run against a local backend and mock Gemini, all in one command:
+    python benchmarks/load_test.py --spawn-backend --mock-gemini --concurrency 8 --requests 200
+
+Against an already running server:
+    python benchmarks/load_test.py --url http://localhost:8000 --corpus path/to/images
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_utils import BACKEND_PATH, load_corpus, save_results, summarize_latencies
+from mock_gemini import start_mock_gemini
+
+_STAGE_SAMPLE = re.compile(r'^waste_classify_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def build_multipart(filename, data, field="file", content_type="image/jpeg"):
+    """
+    Encode a single-file multipart/form-data body
+
+    Returns:
+        tuple: (body bytes, Content-Type header value)
+    """
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    return head + data + tail, f"multipart/form-data; boundary={boundary}"
+
+
+def fetch_stage_totals(base_url):
+    """
+    Read per-stage latency sums and counts from /metrics
+
+    Returns:
+        dict: stage -> {"sum": seconds, "count": n}, empty if unavailable
+    """
+    try:
+        with urllib.request.urlopen(f"{base_url}/metrics", timeout=10) as response:
+            text = response.read().decode()
+    except Exception:
+        return {}
+    totals = {}
+    for line in text.splitlines():
+        match = _STAGE_SAMPLE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals.setdefault(stage, {"sum": 0.0, "count": 0})[kind] = float(value)
+    return totals
+
+
+def stage_breakdown(before, after):
+    """Mean server-side time per stage between two /metrics snapshots"""
+    breakdown = {}
+    for stage, end in after.items():
+        start = before.get(stage, {"sum": 0.0, "count": 0})
+        count = end["count"] - start["count"]
+        if count > 0:
+            breakdown[stage] = {
+                "count": int(count),
+                "mean_ms": round((end["sum"] - start["sum"]) / count * 1000, 3),
+            }
+    return breakdown
+
+
+def wait_for_health(base_url, timeout=180):
+    """Poll /health until the server answers or the timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=5) as response:
+                if response.status == 200:
+                    return True
+        except Exception:
+            time.sleep(0.5)
+    return False
+
+
+def spawn_backend(port, extra_env):
+    """Start the FastAPI backend with uvicorn in a subprocess"""
+    env = dict(os.environ)
+    env.update(extra_env)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=str(BACKEND_PATH),
+        env=env,
+    )
+
+
+def run_load(base_url, corpus, concurrency, total_requests=None, duration=None, timeout=120):
+    """
+    Send classification requests from `concurrency` threads
+
+    Args:
+        base_url (str): Server base URL
+        corpus (list): (name, bytes) images, used round-robin
+        concurrency (int): Number of concurrent clients
+        total_requests (int): Stop after this many requests
+        duration (float): Or stop after this many seconds
+
+    Returns:
+        dict: Throughput, latency summary, status codes and paths taken
+    """
+    bodies = [build_multipart(name, data) for name, data in corpus]
+    lock = threading.Lock()
+    counter = {"next": 0}
+    latencies = []
+    statuses = Counter()
+    models = Counter()
+    bytes_sent = 0
+    deadline = time.time() + duration if duration else None
+
+    def next_index():
+        with lock:
+            index = counter["next"]
+            if total_requests is not None and index >= total_requests:
+                return None
+            if deadline is not None and time.time() >= deadline:
+                return None
+            counter["next"] += 1
+            return index
+
+    def worker():
+        nonlocal bytes_sent
+        while True:
+            index = next_index()
+            if index is None:
+                return
+            body, content_type = bodies[index % len(bodies)]
+            request = urllib.request.Request(
+                f"{base_url}/api/classify", data=body, method="POST",
+                headers={"Content-Type": content_type},
+            )
+            start = time.perf_counter()
+            model_used = "error"
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    payload = response.read()
+                    status = response.status
+                    model_used = "gemini" if b"Gemini Vision AI" in payload else "yolo"
+            except urllib.error.HTTPError as error:
+                status = error.code
+                error.read()
+            except Exception:
+                status = "connection_error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] += 1
+                models[model_used] += 1
+                bytes_sent += len(body)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall_time = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+        "upload_mb": round(bytes_sent / 1024 / 1024, 3),
+        "latency": summarize_latencies(latencies),
+        "status_codes": dict(statuses),
+        "model_used": dict(models),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for /api/classify")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend base URL")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4],
+                        help="One or more concurrency levels to run in sequence")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds per level (overrides --requests)")
+    parser.add_argument("--corpus", default=None, help="Directory of sample images (default: synthetic)")
+    parser.add_argument("--synthetic", type=int, default=8, help="Synthetic images to generate")
+    parser.add_argument("--warmup", type=int, default=3, help="Warm-up requests before measuring")
+    parser.add_argument("--spawn-backend", action="store_true", help="Start the backend with uvicorn")
+    parser.add_argument("--port", type=int, default=8000, help="Port for --spawn-backend")
+    parser.add_argument("--mock-gemini", action="store_true", help="Start the local Gemini stand-in")
+    parser.add_argument("--mock-port", type=int, default=8765)
+    parser.add_argument("--mock-latency-ms", type=float, default=500.0)
+    parser.add_argument("--mock-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--mock-rate-429", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.synthetic)
+    print(f"🖼️  Corpus: {len(corpus)} images, {sum(len(d) for _, d in corpus) / 1024 / 1024:.1f} MB")
+
+    mock_server = None
+    backend = None
+    base_url = args.url
+    try:
+        backend_env = {}
+        if args.mock_gemini:
+            mock_server, _ = start_mock_gemini(
+                port=args.mock_port, latency_ms=args.mock_latency_ms,
+                jitter_ms=args.mock_jitter_ms, rate_429=args.mock_rate_429,
+            )
+            backend_env = {
+                "GEMINI_API_KEY": "mock",
+                "ENABLE_GEMINI": "true",
+                "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{args.mock_port}",
+            }
+            print(f"🤖 Mock Gemini on port {args.mock_port} "
+                  f"({args.mock_latency_ms}±{args.mock_jitter_ms} ms, 429 rate {args.mock_rate_429:.0%})")
+
+        if args.spawn_backend:
+            base_url = f"http://127.0.0.1:{args.port}"
+            backend = spawn_backend(args.port, backend_env)
+            print(f"🚀 Starting backend on {base_url} ...")
+
+        if not wait_for_health(base_url):
+            print(f"❌ Backend not reachable at {base_url}")
+            sys.exit(1)
+
+        if args.warmup:
+            run_load(base_url, corpus, 1, total_requests=args.warmup)
+
+        levels = []
+        for concurrency in args.concurrency:
+            before = fetch_stage_totals(base_url)
+            result = run_load(base_url, corpus, concurrency, total_requests=args.requests, duration=args.duration)
+            result["server_stages"] = stage_breakdown(before, fetch_stage_totals(base_url))
+            levels.append(result)
+
+            latency = result["latency"]
+            print(f"\n📊 Concurrency {concurrency}: {result['throughput_rps']} req/s over {latency['count']} requests")
+            print(f"   p50 {latency['p50_ms']} ms | p95 {latency['p95_ms']} ms | p99 {latency['p99_ms']} ms")
+            print(f"   Status codes: {result['status_codes']} | Paths: {result['model_used']}")
+            for stage, timing in result["server_stages"].items():
+                print(f"   {stage:>15}: {timing['mean_ms']} ms mean")
+
+        path = save_results("load", {
+            "url": base_url,
+            "corpus": [name for name, _ in corpus],
+            "mock_gemini": {
+                "latency_ms": args.mock_latency_ms,
+                "jitter_ms": args.mock_jitter_ms,
+                "rate_429": args.mock_rate_429,
+            } if args.mock_gemini else None,
+            "levels": levels,
+        }, args.output)
+        print(f"\n💾 Results saved to {path}")
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=30)
+        if mock_server:
+            mock_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
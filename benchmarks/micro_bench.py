@@ -0,0 +1,138 @@
+"""
+Micro-benchmarks for the classification pipeline stages
+=========================================================
+Times decode, Gemini request encoding, YOLO inference, post-processing and
+response assembly in-process, without HTTP or network calls.
+
+Usage:
+    python benchmarks/micro_bench.py --repeat 50
+    python benchmarks/micro_bench.py --model backend/model/best.pt --corpus path/to/images
+"""
+
+import argparse
+import io
+import os
+
+import numpy as np
+
+from bench_utils import BACKEND_PATH, add_backend_to_path, load_corpus, save_results, time_call
+
+add_backend_to_path()
+os.environ.setdefault("ENABLE_GEMINI", "false")
+
+
+def decode_image(data):
+    """Decode exactly like classify_waste does"""
+    from PIL import Image
+    image = Image.open(io.BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.load()
+    return image
+
+
+def bench_decode(corpus, repeat):
+    return {name: time_call(lambda data=data: decode_image(data), repeat) for name, data in corpus}
+
+
+def bench_gemini_encode(corpus, repeat):
+    """JPEG re-encode performed before every Gemini Vision call"""
+    results = {}
+    for name, data in corpus:
+        image = decode_image(data)
+
+        def encode(image=image):
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=85)
+            return buffer.getvalue()
+
+        results[name] = time_call(encode, repeat)
+    return results
+
+
+def bench_yolo(corpus, model_path, repeat, batch_sizes=(1, 8)):
+    """YOLO inference latency per image size and batch size"""
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        return {"skipped": "ultralytics not installed"}
+    if not os.path.exists(model_path):
+        return {"skipped": f"model not found: {model_path}"}
+
+    model = YOLO(model_path)
+    results = {}
+    for name, data in corpus:
+        image = decode_image(data)
+        for batch in batch_sizes:
+            images = [image] * batch
+            results[f"{name}@batch{batch}"] = time_call(
+                lambda images=images: model(images, verbose=False), max(1, repeat // batch)
+            )
+    return results
+
+
+def bench_postprocess(repeat, detections_per_image=(1, 10, 100)):
+    """Category rules over synthetic detections (single image and batch of 8)"""
+    from utils import build_class_category_table, classify_detections, normalize_class_name
+
+    names = {0: "RECYCLABLE", 1: "ORGANIC", 2: "HAZARDOUS", 3: "GENERAL"}
+    table = build_class_category_table(names)
+    rng = np.random.default_rng(0)
+    results = {}
+    for count in detections_per_image:
+        single = [(rng.integers(0, 4, count), rng.random(count))]
+        batch = single * 8
+        results[f"{count}_detections"] = time_call(lambda: classify_detections(single, table, names), repeat)
+        results[f"{count}_detections_batch8"] = time_call(lambda: classify_detections(batch, table, names), repeat)
+
+    normalize_class_name.cache_clear()
+    results["normalize_class_name_uncached"] = time_call(
+        lambda: (normalize_class_name.cache_clear(), normalize_class_name("plastic bottle wrapper")), repeat
+    )
+    return results
+
+
+def bench_response(repeat):
+    """Template patching and JSON serialization of a classification response"""
+    from responses import build_classification_response, dumps
+
+    def build():
+        return dumps(build_classification_response(
+            "RECYCLABLE", confidence=0.8731, explanation="Rinse and recycle.", detected_item="bottle",
+        ))
+
+    return {"build_and_serialize": time_call(build, repeat)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline micro-benchmarks")
+    parser.add_argument("--corpus", default=None, help="Directory of sample images (default: synthetic)")
+    parser.add_argument("--synthetic", type=int, default=4, help="Synthetic images to generate")
+    parser.add_argument("--model", default=os.getenv("MODEL_PATH", str(BACKEND_PATH / "model" / "best.pt")))
+    parser.add_argument("--repeat", type=int, default=30, help="Timed iterations per benchmark")
+    parser.add_argument("--output", default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.synthetic)
+    results = {}
+    for stage, run in [
+        ("decode", lambda: bench_decode(corpus, args.repeat)),
+        ("gemini_encode", lambda: bench_gemini_encode(corpus, args.repeat)),
+        ("yolo_inference", lambda: bench_yolo(corpus, args.model, args.repeat)),
+        ("postprocess", lambda: bench_postprocess(args.repeat)),
+        ("response", lambda: bench_response(args.repeat)),
+    ]:
+        print(f"⏱️  {stage} ...")
+        results[stage] = run()
+        for name, stats in results[stage].items():
+            if isinstance(stats, dict):
+                print(f"   {name:>45}: p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms")
+            else:
+                print(f"   {name}: {stats}")
+
+    path = save_results("micro", results, args.output)
+    print(f"\n💾 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
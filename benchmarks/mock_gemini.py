@@ -0,0 +1,163 @@
+"""
+Local Gemini API stand-in for benchmarks
+=========================================
+Serves the generateContent REST call used by backend/gemini_service.py with
+configurable latency and injected 429 (quota exceeded) responses, so load
+tests never touch the real, paid API.
+
+Point the backend at it with:
+    GEMINI_API_KEY=mock GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+
+Usage:
+    python benchmarks/mock_gemini.py --latency-ms 600 --jitter-ms 200 --rate-429 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned vision answers in the CATEGORY|ITEM_NAME|CONFIDENCE format
+VISION_ANSWERS = [
+    "RECYCLABLE|plastic bottle|0.95",
+    "ORGANIC|banana peel|0.92",
+    "HAZARDOUS|battery|0.94",
+    "RECYCLABLE|aluminum can|0.91",
+]
+TIP_ANSWER = (
+    "This item belongs in the right bin because of its material. Rinse and sort it "
+    "before disposal. Proper segregation keeps recyclables out of landfill."
+)
+
+
+class MockGeminiConfig:
+    """Runtime settings shared by all handler threads"""
+
+    def __init__(self, latency_ms=500.0, jitter_ms=100.0, rate_429=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "vision": 0, "text": 0, "throttled": 0}
+
+    def next_delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def should_throttle(self):
+        with self.lock:
+            return self.random.random() < self.rate_429
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def make_handler(config):
+    """Build a request handler class bound to a MockGeminiConfig"""
+
+    class handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass  # keep benchmark output clean
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/stats"):
+                with config.lock:
+                    self._send_json(200, dict(config.stats))
+            else:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            config.count("requests")
+
+            if ":generateContent" not in self.path:
+                self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                return
+
+            time.sleep(config.next_delay())
+
+            if config.should_throttle():
+                config.count("throttled")
+                self._send_json(429, {"error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted (e.g. check quota).",
+                    "status": "RESOURCE_EXHAUSTED",
+                }})
+                return
+
+            parts = [part for content in request.get("contents", []) for part in content.get("parts", [])]
+            is_vision = any("inlineData" in part or "inline_data" in part for part in parts)
+            if is_vision:
+                config.count("vision")
+                with config.lock:
+                    text = config.random.choice(VISION_ANSWERS)
+            else:
+                config.count("text")
+                text = TIP_ANSWER
+
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+            })
+
+    return handler
+
+
+def start_mock_gemini(host="127.0.0.1", port=8765, **settings):
+    """
+    Start the mock server in a background thread
+
+    Returns:
+        tuple: (server, config) - call server.shutdown() when done
+    """
+    config = MockGeminiConfig(**settings)
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform +/- latency jitter")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server, _ = start_mock_gemini(
+        args.host, args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429, seed=args.seed,
+    )
+    print(f"🤖 Mock Gemini listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, 429 rate {args.rate_429:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
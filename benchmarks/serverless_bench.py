@@ -0,0 +1,208 @@
+"""
+Serverless Handler Benchmark
+=============================
+Runs api/index.py (the Vercel handler) locally under http.server against the
+mock Gemini and measures:
+
+- cold starts: a fresh Python process per sample, timed from spawn to the
+  first /api/classify answer, with the handler's own import time
+- warm invocations: repeated classifications on one process, each with a
+  unique upload so the result cache is not hit
+
+The handler's overhead is reported against the mock Gemini latency; a warm
+p50 close to that latency means the handler adds next to nothing.
+
+Usage:
+    python benchmarks/serverless_bench.py --cold 10 --warm 100 --mock-latency-ms 300
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from bench_utils import REPO_ROOT, load_corpus, save_results, summarize_latencies
+from load_test import build_multipart
+from mock_gemini import start_mock_gemini
+
+HANDLER_PATH = REPO_ROOT / "api" / "index.py"
+
+
+def serve(port):
+    """Child process: import the handler and serve it on one thread, like a function instance"""
+    import importlib.util
+    from http.server import HTTPServer
+
+    start = time.perf_counter()
+    spec = importlib.util.spec_from_file_location("serverless_index", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    module.handler.log_message = lambda *args: None
+    server = HTTPServer(("127.0.0.1", port), module.handler)
+    print(json.dumps({"import_ms": round(import_ms, 3)}), flush=True)
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def unique_upload(data):
+    """Image bytes made distinct per request (bytes after the image end are ignored by decoders)"""
+    return data + uuid.uuid4().bytes
+
+
+def post_classify(port, data, timeout=60):
+    """POST one image to /api/classify, returning (seconds, status, payload)"""
+    body, content_type = build_multipart("upload.jpg", data)
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request("POST", "/api/classify", body=body, headers={"Content-Type": content_type})
+        response = connection.getresponse()
+        payload = json.loads(response.read())
+    finally:
+        connection.close()
+    return time.perf_counter() - start, response.status, payload
+
+
+def spawn_handler(port, env):
+    return subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port)],
+        env=env, stdout=subprocess.PIPE, text=True,
+    )
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.002)
+    return False
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_cold(samples, env, image):
+    """
+    Cold starts: new process per sample, spawn -> first classification
+
+    Returns:
+        dict: Spawn-to-answer, import and first-request latency summaries
+    """
+    totals, imports, first_requests = [], [], []
+    for _ in range(samples):
+        port = free_port()
+        start = time.perf_counter()
+        process = spawn_handler(port, env)
+        try:
+            if not wait_for_port(port):
+                raise RuntimeError("handler did not start")
+            elapsed, status, _ = post_classify(port, unique_upload(image))
+            totals.append(time.perf_counter() - start)
+            first_requests.append(elapsed)
+            imports.append(json.loads(process.stdout.readline())["import_ms"] / 1000)
+            if status != 200:
+                raise RuntimeError(f"classify returned {status}")
+        finally:
+            stop(process)
+    return {
+        "spawn_to_answer": summarize_latencies(totals),
+        "handler_import": summarize_latencies(imports),
+        "first_request": summarize_latencies(first_requests),
+    }
+
+
+def run_warm(requests, env, corpus):
+    """
+    Warm invocations on one process: unique uploads, then one cached repeat
+
+    Returns:
+        dict: Latency summaries for uncached and cached requests
+    """
+    port = free_port()
+    process = spawn_handler(port, env)
+    try:
+        if not wait_for_port(port):
+            raise RuntimeError("handler did not start")
+        post_classify(port, unique_upload(corpus[0][1]))  # first call opens the Gemini connection
+        latencies, errors = [], 0
+        for index in range(requests):
+            elapsed, status, payload = post_classify(port, unique_upload(corpus[index % len(corpus)][1]))
+            latencies.append(elapsed)
+            errors += status != 200 or "error" in payload
+        repeat = unique_upload(corpus[0][1])
+        post_classify(port, repeat)
+        cached = [post_classify(port, repeat)[0] for _ in range(min(requests, 20))]
+    finally:
+        stop(process)
+    return {"uncached": summarize_latencies(latencies), "cached": summarize_latencies(cached), "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold/warm benchmark of the Vercel handler")
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--cold", type=int, default=10, help="Cold start samples (one process each)")
+    parser.add_argument("--warm", type=int, default=100, help="Warm requests on one process")
+    parser.add_argument("--corpus", default=None, help="Directory of sample images (default: synthetic)")
+    parser.add_argument("--synthetic", type=int, default=4, help="Synthetic images to generate")
+    parser.add_argument("--mock-port", type=int, default=8765)
+    parser.add_argument("--mock-latency-ms", type=float, default=300.0)
+    parser.add_argument("--mock-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve)
+        return
+
+    corpus = load_corpus(args.corpus, args.synthetic)
+    print(f"🖼️  Corpus: {len(corpus)} images, {sum(len(d) for _, d in corpus) / 1024 / 1024:.1f} MB")
+
+    mock_server, _ = start_mock_gemini(port=args.mock_port, latency_ms=args.mock_latency_ms,
+                                       jitter_ms=args.mock_jitter_ms)
+    print(f"🤖 Mock Gemini on port {args.mock_port} ({args.mock_latency_ms}±{args.mock_jitter_ms} ms)")
+    env = dict(os.environ)
+    env.update({"GEMINI_API_KEY": "mock", "GEMINI_API_ENDPOINT": f"http://127.0.0.1:{args.mock_port}"})
+
+    try:
+        cold = run_cold(args.cold, env, corpus[0][1]) if args.cold else {}
+        warm = run_warm(args.warm, env, corpus) if args.warm else {}
+    finally:
+        mock_server.shutdown()
+
+    results = {"mock_latency_ms": args.mock_latency_ms, "cold": cold, "warm": warm}
+    if cold:
+        print(f"🧊 Cold: spawn->answer p50 {cold['spawn_to_answer']['p50_ms']:.1f} ms "
+              f"(import {cold['handler_import']['p50_ms']:.1f} ms, "
+              f"first request {cold['first_request']['p50_ms']:.1f} ms)")
+    if warm:
+        overhead = warm["uncached"]["p50_ms"] - args.mock_latency_ms
+        results["warm_overhead_p50_ms"] = round(overhead, 3)
+        print(f"🔥 Warm: p50 {warm['uncached']['p50_ms']:.1f} ms, p95 {warm['uncached']['p95_ms']:.1f} ms "
+              f"(+{overhead:.1f} ms over Gemini), cached p50 {warm['cached']['p50_ms']:.1f} ms, "
+              f"errors {warm['errors']}")
+    path = save_results("serverless", results, args.output)
+    print(f"💾 Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
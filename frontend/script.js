@@ -141,8 +141,10 @@ async function classifyWaste() {
     errorMessage.classList.add('hidden');
 
     try {
+        // Downscale to the server's preferred size before uploading (see resize.js)
+        const uploadFile = window.prepareUpload ? await window.prepareUpload(selectedFile) : selectedFile;
         const formData = new FormData();
-        formData.append('file', selectedFile);
+        formData.append('file', uploadFile);
 
         const response = await fetch(`${API_URL}/api/classify`, {
             method: 'POST',
@@ -292,4 +294,5 @@ async function checkBackendHealth() {
 // Check backend on page load
 window.addEventListener('load', () => {
     checkBackendHealth();
+    if (window.loadUploadSettings) window.loadUploadSettings(API_URL);
 });
@@ -0,0 +1,161 @@
+// ========================================
+// Smart Waste Classifier - Upload Downscaling
+// ========================================
+// Resizes photos to the server's preferred input size and re-encodes them
+// before upload, so phones send ~100-300 KB instead of 3-8 MB.
+// Runs in an OffscreenCanvas worker when available, otherwise on a canvas.
+
+const DEFAULT_UPLOAD_SETTINGS = {
+    max_edge: 768,          // longest side in pixels
+    format: 'image/jpeg',   // 'image/jpeg' or 'image/webp'
+    quality: 0.85
+};
+
+let uploadSettings = { ...DEFAULT_UPLOAD_SETTINGS };
+let resizeWorker = null;
+
+const RESIZE_WORKER_SOURCE = `
+self.onmessage = async (event) => {
+    const { id, file, maxEdge, format, quality } = event.data;
+    try {
+        // 'from-image' applies the EXIF orientation while decoding
+        const bitmap = await createImageBitmap(file, { imageOrientation: 'from-image' });
+        const scale = Math.min(1, maxEdge / Math.max(bitmap.width, bitmap.height));
+        const width = Math.max(1, Math.round(bitmap.width * scale));
+        const height = Math.max(1, Math.round(bitmap.height * scale));
+        const canvas = new OffscreenCanvas(width, height);
+        canvas.getContext('2d').drawImage(bitmap, 0, 0, width, height);
+        bitmap.close();
+        const blob = await canvas.convertToBlob({ type: format, quality });
+        self.postMessage({ id, blob });
+    } catch (error) {
+        self.postMessage({ id, error: String(error) });
+    }
+};
+`;
+
+// Load upload settings advertised by the server (falls back to defaults)
+async function loadUploadSettings(apiUrl) {
+    try {
+        const response = await fetch(`${apiUrl}/api/categories`);
+        if (response.ok) {
+            const data = await response.json();
+            if (data.upload) {
+                uploadSettings = { ...DEFAULT_UPLOAD_SETTINGS, ...data.upload };
+            }
+        }
+    } catch (error) {
+        console.warn('⚠️ Using default upload settings:', error.message);
+    }
+    return uploadSettings;
+}
+
+function supportsWorkerResize() {
+    return typeof Worker !== 'undefined'
+        && typeof OffscreenCanvas !== 'undefined'
+        && typeof createImageBitmap !== 'undefined'
+        && 'convertToBlob' in OffscreenCanvas.prototype;
+}
+
+function getResizeWorker() {
+    if (!resizeWorker) {
+        const source = new Blob([RESIZE_WORKER_SOURCE], { type: 'text/javascript' });
+        resizeWorker = new Worker(URL.createObjectURL(source));
+    }
+    return resizeWorker;
+}
+
+let resizeRequestId = 0;
+
+function resizeInWorker(file, settings) {
+    return new Promise((resolve, reject) => {
+        const worker = getResizeWorker();
+        const id = ++resizeRequestId;
+        const onMessage = (event) => {
+            if (event.data.id !== id) return;
+            worker.removeEventListener('message', onMessage);
+            if (event.data.error) {
+                reject(new Error(event.data.error));
+            } else {
+                resolve(event.data.blob);
+            }
+        };
+        worker.addEventListener('message', onMessage);
+        worker.postMessage({
+            id,
+            file,
+            maxEdge: settings.max_edge,
+            format: settings.format,
+            quality: settings.quality
+        });
+    });
+}
+
+async function decodeOnMainThread(file) {
+    if (typeof createImageBitmap !== 'undefined') {
+        try {
+            return await createImageBitmap(file, { imageOrientation: 'from-image' });
+        } catch (error) {
+            // Fall through to <img> decoding (browsers apply EXIF orientation there too)
+        }
+    }
+    const url = URL.createObjectURL(file);
+    try {
+        const img = new Image();
+        img.src = url;
+        await img.decode();
+        return img;
+    } finally {
+        URL.revokeObjectURL(url);
+    }
+}
+
+async function resizeOnCanvas(file, settings) {
+    const source = await decodeOnMainThread(file);
+    const sourceWidth = source.naturalWidth || source.width;
+    const sourceHeight = source.naturalHeight || source.height;
+    const scale = Math.min(1, settings.max_edge / Math.max(sourceWidth, sourceHeight));
+    const canvas = document.createElement('canvas');
+    canvas.width = Math.max(1, Math.round(sourceWidth * scale));
+    canvas.height = Math.max(1, Math.round(sourceHeight * scale));
+    canvas.getContext('2d').drawImage(source, 0, 0, canvas.width, canvas.height);
+    if (source.close) source.close();
+    return new Promise((resolve, reject) => {
+        canvas.toBlob(
+            (blob) => blob ? resolve(blob) : reject(new Error('Canvas encoding failed')),
+            settings.format,
+            settings.quality
+        );
+    });
+}
+
+// Downscale and re-encode an image File for upload.
+// Returns the original file if resizing fails or would not make it smaller.
+async function prepareUpload(file, settings = uploadSettings) {
+    if (!file || !file.type.startsWith('image/') || file.type === 'image/gif') {
+        return file;
+    }
+    try {
+        let blob = supportsWorkerResize()
+            ? await resizeInWorker(file, settings).catch(() => resizeOnCanvas(file, settings))
+            : await resizeOnCanvas(file, settings);
+
+        // Browsers without WebP encoding silently return PNG - retry as JPEG
+        if (blob.type !== settings.format && settings.format !== 'image/jpeg') {
+            return prepareUpload(file, { ...settings, format: 'image/jpeg' });
+        }
+        if (blob.size >= file.size) {
+            return file;
+        }
+
+        const extension = blob.type === 'image/webp' ? 'webp' : 'jpg';
+        const baseName = (file.name || 'upload').replace(/\.[^.]+$/, '');
+        return new File([blob], `${baseName}.${extension}`, { type: blob.type });
+    } catch (error) {
+        console.warn('⚠️ Image downscaling failed, uploading original:', error.message);
+        return file;
+    }
+}
+
+window.loadUploadSettings = loadUploadSettings;
+window.prepareUpload = prepareUpload;
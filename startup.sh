@@ -1,3 +1,8 @@
 #!/bin/bash
 cd backend
-gunicorn --bind=0.0.0.0:8000 --timeout 600 --workers 1 app:app -k uvicorn.workers.UvicornWorker
+# Workers and torch threads are sized to the machine by the server config.
+# SERVER=hypercorn serves HTTP/2 (see hypercorn.conf.py); default is gunicorn over HTTP/1.1
+if [ "${SERVER:-gunicorn}" = "hypercorn" ]; then
+    exec hypercorn --config file:hypercorn.conf.py app:app
+fi
+exec gunicorn -c gunicorn.conf.py app:app
@@ -0,0 +1,175 @@
+"""
+Gemini → YOLO Distillation
+==========================
+Uses Gemini Vision answers collected by the backend as teacher labels for
+the local YOLO model, and measures how often the two agree.
+
+Workflow:
+1. Run the backend with DISTILLATION=true - a sample of Gemini-answered
+   images is stored in backend/data/distillation (YOLO layout)
+2. Merge the teacher samples into the dataset, keeping a hold-out for
+   evaluation:
+     python training/export_samples.py --source backend/data/distillation \\
+         --dataset path/to/dataset --split train --skip-holdout 10
+3. Fine-tune the current model on the merged dataset:
+     python training/distill.py train --data path/to/dataset/data.yaml
+4. Measure agreement on the hold-out (the same 10% by default) and write
+   the report the backend reads:
+     python training/distill.py evaluate --model training/runs/distill/weights/best.pt
+5. Deploy the model together with its <model>.agreement.json; with
+   PREFER_LOCAL_MODEL=auto the backend answers confident cases locally once
+   agreement passes LOCAL_AGREEMENT_THRESHOLD
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from export_samples import DISTILL_HOLDOUT, in_holdout
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND_PATH = ROOT / "backend"
+DEFAULT_SOURCE = BACKEND_PATH / "data" / "distillation"
+DEFAULT_MODEL = BACKEND_PATH / "model" / "best.pt"
+CLASS_NAMES = ["RECYCLABLE", "ORGANIC", "HAZARDOUS", "GENERAL"]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_teacher_pairs(source, holdout=0):
+    """
+    (image path, Gemini category) pairs from a capture directory
+
+    Args:
+        holdout (int): Only return the hold-out share (percent) if > 0
+    """
+    pairs = []
+    for prediction_path in sorted((source / "predictions").glob("*.json")):
+        image_path = source / "images" / f"{prediction_path.stem}.jpg"
+        prediction = json.loads(prediction_path.read_text())
+        if not image_path.exists() or not prediction.get("gemini"):
+            continue
+        if holdout and not in_holdout(prediction_path.stem, holdout):
+            continue
+        pairs.append((image_path, prediction["gemini"]["category"]))
+    return pairs
+
+
+def evaluate(model_path, pairs, batch_size=16):
+    """
+    Agreement between the model's category and Gemini's
+
+    Returns:
+        dict: Report with overall/per-category agreement and confusion counts
+    """
+    sys.path.insert(0, str(BACKEND_PATH))
+    from ultralytics import YOLO
+    from utils import build_class_category_table, classify_detections
+
+    model = YOLO(str(model_path))
+    class_table = build_class_category_table(model.names)
+    confusion = Counter()
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start:start + batch_size]
+        results = model([str(path) for path, _ in batch], verbose=False)
+        detections = [(r.boxes.cls.cpu().numpy(), r.boxes.conf.cpu().numpy()) for r in results]
+        for (_, teacher), detection in zip(batch, classify_detections(detections, class_table, model.names)):
+            confusion[(teacher, detection["category"] if detection else "NONE")] += 1
+
+    total = sum(confusion.values())
+    per_category = {}
+    for name in CLASS_NAMES:
+        seen = sum(count for (teacher, _), count in confusion.items() if teacher == name)
+        if seen:
+            per_category[name] = round(confusion[(name, name)] / seen, 4)
+    agreed = sum(count for (teacher, student), count in confusion.items() if teacher == student)
+    return {
+        "model": str(model_path),
+        "model_sha256": file_sha256(model_path),
+        "evaluated_at": datetime.now(timezone.utc).isoformat(),
+        "samples": total,
+        "agreement": round(agreed / total, 4) if total else 0.0,
+        "per_category": per_category,
+        "confusion": {f"{teacher}->{student}": count for (teacher, student), count in sorted(confusion.items())},
+    }
+
+
+def train(model_path, data, epochs, imgsz, batch, lr0, project):
+    """Fine-tune the current model on a dataset that includes teacher labels"""
+    from ultralytics import YOLO
+
+    model = YOLO(str(model_path))
+    model.train(
+        data=str(data), epochs=epochs, imgsz=imgsz, batch=batch,
+        lr0=lr0, lrf=0.1, warmup_epochs=0,  # gentle schedule: start from trained weights
+        project=str(project), name="distill", exist_ok=True,
+    )
+    return Path(project) / "distill" / "weights" / "best.pt"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil Gemini Vision labels into the local YOLO model")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Fine-tune on a dataset containing teacher samples")
+    train_parser.add_argument("--data", type=Path, required=True, help="Dataset YAML")
+    train_parser.add_argument("--model", type=Path, default=DEFAULT_MODEL, help="Starting weights")
+    train_parser.add_argument("--epochs", type=int, default=15)
+    train_parser.add_argument("--imgsz", type=int, default=416)
+    train_parser.add_argument("--batch", type=int, default=8)
+    train_parser.add_argument("--lr0", type=float, default=0.001)
+    train_parser.add_argument("--project", type=Path, default=ROOT / "training" / "runs")
+
+    eval_parser = commands.add_parser("evaluate", help="Measure agreement with Gemini and write the report")
+    eval_parser.add_argument("--model", type=Path, default=DEFAULT_MODEL)
+    eval_parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE, help="Teacher capture directory")
+    eval_parser.add_argument("--holdout", type=int, default=DISTILL_HOLDOUT,
+                             help="Evaluate only this percent hold-out (match export --skip-holdout)")
+    eval_parser.add_argument("--report", type=Path, default=None,
+                             help="Report path (default: <model>.agreement.json)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("GEMINI → YOLO DISTILLATION")
+    print("=" * 60)
+
+    if args.command == "train":
+        best = train(args.model, args.data, args.epochs, args.imgsz, args.batch, args.lr0, args.project)
+        print(f"\n✅ Fine-tuned weights: {best}")
+        print("   Next: python training/distill.py evaluate --model", best)
+        return
+
+    if not 0 < args.holdout < 100:
+        # Agreement on the pairs the model was trained on would overstate it
+        # and could switch on PREFER_LOCAL_MODEL=auto
+        print(f"❌ --holdout must be between 1 and 99 (got {args.holdout})")
+        sys.exit(1)
+    pairs = load_teacher_pairs(args.source, args.holdout)
+    if not pairs:
+        print(f"❌ No teacher samples found in {args.source}")
+        sys.exit(1)
+    print(f"📁 {len(pairs)} teacher samples from {args.source}")
+
+    report = evaluate(args.model, pairs)
+    report["holdout_percent"] = args.holdout
+    report_path = args.report or args.model.with_suffix(".agreement.json")
+    report_path.write_text(json.dumps(report, indent=2))
+
+    print(f"\n📊 Agreement with Gemini: {report['agreement']:.1%} on {report['samples']} samples")
+    for name, rate in report["per_category"].items():
+        print(f"   {name:<11} {rate:.1%}")
+    print(f"\n💾 Report saved to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
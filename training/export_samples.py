@@ -0,0 +1,128 @@
+"""
+Active-Learning Sample Exporter
+================================
+Merges samples captured by the backend (ACTIVE_LEARNING=true, or the
+Gemini teacher samples kept with DISTILLATION=true) into a YOLO
+dataset split so they are picked up by the next training run.
+
+Captured layout (backend/data/active_learning):
+- images/<hash>.jpg       downscaled image
+- labels/<hash>.txt       YOLO labels (Gemini's category when it answered)
+- predictions/<hash>.json both models' predictions and the capture reason
+
+Usage:
+    python training/export_samples.py --dataset path/to/dataset --split train
+    python training/export_samples.py --dataset path/to/dataset --reason disagreement --dry-run
+"""
+
+import argparse
+import hashlib
+import json
+import shutil
+from collections import Counter
+from pathlib import Path
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / "backend" / "data" / "active_learning"
+CLASS_NAMES = ["RECYCLABLE", "ORGANIC", "HAZARDOUS", "GENERAL"]
+EXPORT_PREFIX = "al_"
+DISTILL_HOLDOUT = 10  # percent of teacher samples kept out of training for distill.py evaluate
+
+
+def in_holdout(name, percent):
+    """Deterministic hold-out membership for a captured sample name"""
+    return percent > 0 and int(hashlib.sha256(name.encode()).hexdigest()[:8], 16) % 100 < percent
+
+
+def load_samples(source, reasons=None):
+    """
+    Captured samples with image, label and prediction present
+
+    Returns:
+        list: (name, image path, label path, prediction dict) tuples
+    """
+    samples = []
+    for image_path in sorted((source / "images").glob("*.jpg")):
+        label_path = source / "labels" / f"{image_path.stem}.txt"
+        prediction_path = source / "predictions" / f"{image_path.stem}.json"
+        if not label_path.exists() or not prediction_path.exists():
+            continue
+        prediction = json.loads(prediction_path.read_text())
+        if reasons and prediction.get("reason") not in reasons:
+            continue
+        samples.append((image_path.stem, image_path, label_path, prediction))
+    return samples
+
+
+def export_samples(source, dataset, split="train", reasons=None, move=False, dry_run=False, skip_holdout=0):
+    """
+    Copy (or move) captured samples into <dataset>/<split>/{images,labels}
+
+    Returns:
+        dict: Counts of exported/skipped samples, reasons and label classes
+    """
+    images_dir = dataset / split / "images"
+    labels_dir = dataset / split / "labels"
+    if not dry_run:
+        images_dir.mkdir(parents=True, exist_ok=True)
+        labels_dir.mkdir(parents=True, exist_ok=True)
+
+    stats = {"exported": 0, "already_present": 0, "held_out": 0, "reasons": Counter(), "classes": Counter()}
+    transfer = shutil.move if move else shutil.copy2
+    for name, image_path, label_path, prediction in load_samples(source, reasons):
+        target_image = images_dir / f"{EXPORT_PREFIX}{name}.jpg"
+        target_label = labels_dir / f"{EXPORT_PREFIX}{name}.txt"
+        if in_holdout(name, skip_holdout):
+            stats["held_out"] += 1
+            continue
+        if target_image.exists():
+            stats["already_present"] += 1
+            continue
+
+        stats["exported"] += 1
+        stats["reasons"][prediction.get("reason")] += 1
+        for line in label_path.read_text().splitlines():
+            if line.strip():
+                stats["classes"][CLASS_NAMES[int(line.split()[0])]] += 1
+        if not dry_run:
+            transfer(str(label_path), target_label)
+            transfer(str(image_path), target_image)
+            if move:
+                (source / "predictions" / f"{name}.json").unlink()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge captured active-learning samples into a dataset split")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE, help="Capture directory (CAPTURE_DIR)")
+    parser.add_argument("--dataset", type=Path, required=True, help="YOLO dataset root (contains train/valid/test)")
+    parser.add_argument("--split", default="train", help="Split to merge into")
+    parser.add_argument("--reason", action="append", choices=["low_confidence", "disagreement", "teacher"],
+                        help="Only export samples captured for this reason (repeatable)")
+    parser.add_argument("--move", action="store_true", help="Move instead of copy (empties the capture directory)")
+    parser.add_argument("--skip-holdout", type=int, default=0,
+                        help="Keep this percent of samples out for evaluation "
+                             f"(teacher samples: {DISTILL_HOLDOUT}, the training/distill.py --holdout default)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be exported")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ACTIVE-LEARNING EXPORT")
+    print("=" * 60)
+    print(f"   Source:  {args.source}")
+    print(f"   Target:  {args.dataset / args.split}")
+
+    stats = export_samples(args.source, args.dataset, args.split, args.reason, args.move, args.dry_run,
+                           args.skip_holdout)
+
+    print(f"\n📊 {'Would export' if args.dry_run else 'Exported'}: {stats['exported']} samples "
+          f"({stats['already_present']} already present, {stats['held_out']} held out)")
+    for reason, count in stats["reasons"].items():
+        print(f"   {reason}: {count}")
+    print("\n📈 Labels by class:")
+    for name in CLASS_NAMES:
+        print(f"   {name:<11} {stats['classes'][name]:,}")
+    print("\n⚠️  Labels are model proposals - review them before training.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Dataset Preparation
+===================
+Resizes every image to the training size once, so epochs no longer pay for
+JPEG decoding and resizing of full-resolution photos.
+
+For each image the prepared dataset holds:
+- images/<name>.jpg  resized copy (ultralytics verifies and lists these)
+- images/<name>.npy  decoded BGR uint8 array at training size; ultralytics
+                     loads it with np.load instead of decoding the JPEG
+- labels/<name>.txt  unchanged (YOLO labels are normalized)
+
+RAM stays bounded because nothing is cached in memory up front: each loader
+worker reads the small .npy files it needs, so train.py can use several
+workers instead of workers=0. A manifest records the source size/mtime and
+imgsz of every image and the size/mtime of its label; re-runs only process
+new or changed files. Outputs are named by stem, so two sources differing
+only in extension (a.jpg / a.png) are rejected instead of overwriting each
+other.
+
+Usage:
+    python training/prepare_dataset.py --imgsz 416
+    python training/prepare_dataset.py --source path/to/dataset --output path/to/prepared --workers 8
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+TRAINING_DIR = Path(__file__).resolve().parent
+DEFAULT_SOURCE = Path(os.getenv("WASTE_DATASET", TRAINING_DIR / "dataset"))
+DEFAULT_OUTPUT = Path(os.getenv("WASTE_PREPARED_DATASET", TRAINING_DIR / "dataset_prepared"))
+SPLITS = ("train", "valid", "test")
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+MANIFEST_NAME = "manifest.json"
+CLASS_NAMES = ["RECYCLABLE", "ORGANIC", "HAZARDOUS", "GENERAL"]
+
+
+def resized_shape(height, width, imgsz):
+    """Long side to imgsz keeping aspect ratio - same rounding as ultralytics' loader"""
+    r = imgsz / max(height, width)
+    if r == 1:
+        return height, width
+    return min(math.ceil(height * r), imgsz), min(math.ceil(width * r), imgsz)
+
+
+def prepare_image(job):
+    """
+    Resize one image and write its .jpg/.npy pair (runs in a worker process)
+
+    Args:
+        job (tuple): (source image, target .jpg path, imgsz)
+
+    Returns:
+        tuple: (source image, error message or None)
+    """
+    import cv2
+    import numpy as np
+
+    source, target, imgsz = job
+    image = cv2.imread(str(source))
+    if image is None:
+        return source, "unreadable image"
+    height, width = resized_shape(*image.shape[:2], imgsz)
+    if (height, width) != image.shape[:2]:
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+    # Write to temporary names first so an interrupted run never leaves a half-written pair
+    tmp_jpg, tmp_npy = target.with_suffix(".jpg.tmp"), target.with_suffix(".tmp.npy")
+    with open(tmp_jpg, "wb") as f:
+        f.write(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes())
+    np.save(tmp_npy, np.ascontiguousarray(image))
+    os.replace(tmp_npy, target.with_suffix(".npy"))
+    os.replace(tmp_jpg, target)
+    return source, None
+
+
+def load_manifest(output):
+    try:
+        return json.loads((output / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {"imgsz": None, "files": {}, "labels": {}}
+
+
+def source_signature(path):
+    stat = path.stat()
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def load_class_names(source):
+    """Class names from the source data.yaml (falls back to the API categories)"""
+    try:
+        import yaml
+        names = yaml.safe_load((source / "data.yaml").read_text()).get("names")
+        if isinstance(names, dict):
+            names = [names[key] for key in sorted(names)]
+        return list(names) if names else CLASS_NAMES
+    except (OSError, AttributeError, ImportError):
+        return CLASS_NAMES
+
+
+def write_data_yaml(output, names, splits):
+    """data.yaml with absolute paths, usable from any working directory"""
+    lines = [f"path: {output.resolve().as_posix()}"]
+    for key, split in (("train", "train"), ("val", "valid"), ("test", "test")):
+        if split in splits:
+            lines.append(f"{key}: {split}/images")
+    lines.append(f"nc: {len(names)}")
+    lines.append("names: [" + ", ".join(f"'{name}'" for name in names) + "]")
+    (output / "data.yaml").write_text("\n".join(lines) + "\n")
+
+
+def prepare_dataset(source, output, imgsz=416, workers=None, force=False):
+    """
+    Build (or update) the prepared dataset
+
+    Args:
+        source (Path): YOLO dataset root with train/valid/test splits
+        output (Path): Prepared dataset root
+        imgsz (int): Training image size (long side)
+        workers (int): Worker processes (default: all CPUs)
+        force (bool): Reprocess every image
+
+    Returns:
+        dict: Counts of processed/unchanged/removed/failed images per run
+
+    Raises:
+        ValueError: Images of one split share a stem (their outputs would collide)
+    """
+    manifest = load_manifest(output)
+    if force or manifest.get("imgsz") != imgsz:
+        manifest = {"imgsz": imgsz, "files": {}, "labels": {}}
+    files = manifest["files"]
+    labels = manifest.setdefault("labels", {})
+
+    images, collisions = {}, []
+    for split in SPLITS:
+        images_dir = source / split / "images"
+        if not images_dir.exists():
+            continue
+        images[split] = [path for path in sorted(images_dir.iterdir()) if path.suffix.lower() in IMAGE_SUFFIXES]
+        stems = {}
+        for image_path in images[split]:
+            stems.setdefault(image_path.stem, []).append(image_path.name)
+        collisions.extend(f"{split}/images: {', '.join(names)}" for names in stems.values() if len(names) > 1)
+    if collisions:
+        raise ValueError("Images with the same name would overwrite each other: " + "; ".join(collisions))
+
+    jobs, seen, splits = [], set(), list(images)
+    stats = {"processed": 0, "unchanged": 0, "removed": 0, "failed": []}
+    for split, split_images in images.items():
+        labels_dir = source / split / "labels"
+        (output / split / "images").mkdir(parents=True, exist_ok=True)
+        (output / split / "labels").mkdir(parents=True, exist_ok=True)
+        for image_path in split_images:
+            key = f"{split}/{image_path.name}"
+            target = output / split / "images" / f"{image_path.stem}.jpg"
+            signature = source_signature(image_path)
+            seen.add(key)
+
+            label_path = labels_dir / f"{image_path.stem}.txt"
+            label_target = output / split / "labels" / label_path.name
+            if not label_path.exists():
+                label_target.unlink(missing_ok=True)
+                labels.pop(key, None)
+            elif labels.get(key) != source_signature(label_path) or not label_target.exists():
+                shutil.copy2(label_path, label_target)
+                labels[key] = source_signature(label_path)
+
+            if files.get(key) == signature and target.exists() and target.with_suffix(".npy").exists():
+                stats["unchanged"] += 1
+                continue
+            jobs.append((image_path, target, imgsz))
+            files[key] = signature
+
+    # Drop images that disappeared from the source
+    for key in [key for key in files if key not in seen]:
+        split, name = key.split("/", 1)
+        stem = Path(name).stem
+        for path in (output / split / "images" / f"{stem}.jpg", output / split / "images" / f"{stem}.npy",
+                     output / split / "labels" / f"{stem}.txt"):
+            path.unlink(missing_ok=True)
+        del files[key]
+        labels.pop(key, None)
+        stats["removed"] += 1
+
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for image_path, error in pool.map(prepare_image, jobs, chunksize=32):
+                if error:
+                    split = image_path.parent.parent.name
+                    files.pop(f"{split}/{image_path.name}", None)
+                    stats["failed"].append(f"{image_path}: {error}")
+                else:
+                    stats["processed"] += 1
+
+    output.mkdir(parents=True, exist_ok=True)
+    write_data_yaml(output, load_class_names(source), splits)
+    tmp_manifest = output / f"{MANIFEST_NAME}.tmp"
+    tmp_manifest.write_text(json.dumps(manifest))
+    os.replace(tmp_manifest, output / MANIFEST_NAME)
+    return stats
+
+
+def prepared_imgsz(output):
+    """imgsz a prepared dataset was built for (None if not prepared)"""
+    return load_manifest(output).get("imgsz")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resize a YOLO dataset to the training size once")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE, help="YOLO dataset root (WASTE_DATASET)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Prepared dataset root")
+    parser.add_argument("--imgsz", type=int, default=416, help="Training image size (long side)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--force", action="store_true", help="Reprocess every image")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("DATASET PREPARATION")
+    print("=" * 60)
+    print(f"   Source:  {args.source}")
+    print(f"   Output:  {args.output}")
+    print(f"   Size:    {args.imgsz}px")
+
+    if not args.source.exists():
+        print(f"❌ Dataset not found: {args.source}")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    try:
+        stats = prepare_dataset(args.source, args.output, args.imgsz, args.workers, args.force)
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n📊 Processed {stats['processed']:,} images in {elapsed:.1f}s "
+          f"({stats['unchanged']:,} unchanged, {stats['removed']:,} removed)")
+    for failure in stats["failed"][:10]:
+        print(f"   ⚠️ {failure}")
+    if len(stats["failed"]) > 10:
+        print(f"   ⚠️ ... and {len(stats['failed']) - 10} more failures")
+    print(f"\n💾 Dataset YAML: {args.output / 'data.yaml'}")
+    print(f"   Next: python training/train.py --data {args.output / 'data.yaml'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,26 +14,255 @@ ORIGINAL DATASET CLASSES:
 - 1: hazardous waste  → 2 (HAZARDOUS)
 - 2: organic          → 1 (ORGANIC)
 - 3: recyclable       → 0 (RECYCLABLE)
+
+The source dataset is never modified: remapped labels are written
+atomically to a new dataset directory (images are hard-linked, or copied
+across filesystems), so running the script twice gives the same result.
+Label files are processed in batches by a process pool; a manifest of
+source hashes lets re-runs skip files that did not change. Boxes with
+coordinates outside [0, 1] or non-positive sizes, or of classes missing from
+the mapping, are dropped and reported. An image left with no boxes is
+dropped too (it would otherwise train as background); images whose source
+label file is already empty are kept as background. Splits without both
+images/ and labels/ are skipped.
+
+Usage:
+    python training/remap_labels.py
+    python training/remap_labels.py --source path/to/original --output path/to/remapped --dry-run
 """
 
+import argparse
+import hashlib
+import json
 import os
-from pathlib import Path
 import shutil
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+TRAINING_DIR = Path(__file__).resolve().parent
+DEFAULT_SOURCE = Path(os.getenv("WASTE_ORIGINAL_DATASET", TRAINING_DIR / "dataset_original"))
+DEFAULT_OUTPUT = Path(os.getenv("WASTE_DATASET", TRAINING_DIR / "dataset"))
+SPLITS = ("train", "valid", "test")
+MANIFEST_NAME = "remap_manifest.json"
+BATCH_SIZE = 1024  # label files per worker task
+CLASS_NAMES = ["RECYCLABLE", "ORGANIC", "HAZARDOUS", "GENERAL"]
+
+# Class mapping: old_class -> new_class
+# TARGET: RECYCLABLE=0, ORGANIC=1, HAZARDOUS=2, GENERAL=3
+CLASS_MAPPING = {
+    0: 3,  # general waste -> GENERAL
+    1: 2,  # hazardous waste -> HAZARDOUS
+    2: 1,  # organic -> ORGANIC
+    3: 0,  # recyclable -> RECYCLABLE
+}
+
+
+def remap_lines(text, mapping):
+    """
+    Remap and validate the lines of one label file
+
+    Args:
+        text (str): Label file content (class xc yc w h, or class x1 y1 x2 y2 ... for polygons)
+        mapping (dict): old class -> new class
+
+    Returns:
+        tuple: (remapped content, Counter of new classes, list of (line number, problem))
+    """
+    new_lines, counts, problems = [], Counter(), []
+    for number, line in enumerate(text.splitlines(), 1):
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) < 5 or (len(parts) > 5 and len(parts) % 2 == 0):
+            problems.append((number, "malformed"))
+            continue
+        try:
+            old_class = int(parts[0])
+            coords = [float(value) for value in parts[1:]]
+        except ValueError:
+            problems.append((number, "malformed"))
+            continue
+        if old_class not in mapping:
+            problems.append((number, f"unknown class {old_class}"))
+            continue
+        if any(not 0.0 <= value <= 1.0 for value in coords):
+            problems.append((number, "out of range"))
+            continue
+        if len(coords) == 4 and (coords[2] <= 0 or coords[3] <= 0):
+            problems.append((number, "empty box"))
+            continue
+
+        new_class = mapping[old_class]
+        counts[new_class] += 1
+        new_lines.append(" ".join([str(new_class)] + parts[1:]))
+    return "".join(line + "\n" for line in new_lines), counts, problems
+
+
+def atomic_write(path, content):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+def link_or_copy(source, target):
+    """Hard-link an image into the output dataset (copy across filesystems)"""
+    if target.exists():
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def remap_batch(job):
+    """
+    Remap one batch of label files (runs in a worker process)
+
+    Args:
+        job (tuple): (source root, output root, [(relative label path, known hash)], mapping, dry run)
+
+    Returns:
+        dict: hashes, per-split class counts, written/unchanged counts, problems
+            and the labels left empty by remapping
+    """
+    source, output, items, mapping, dry_run = job
+    result = {"hashes": {}, "counts": {}, "written": 0, "unchanged": 0, "problems": [], "emptied": []}
+    for relative, known_hash in items:
+        data = (source / relative).read_bytes()
+        digest = hashlib.sha1(data).hexdigest()
+        content, counts, problems = remap_lines(data.decode("utf-8", errors="replace"), mapping)
+
+        split = relative.split("/", 1)[0]
+        split_counts = result["counts"].setdefault(split, Counter())
+        split_counts.update(counts)
+        result["problems"].extend((relative, number, problem) for number, problem in problems)
+        result["hashes"][relative] = digest
+
+        target = output / relative
+        if not content and data.strip():
+            # Every box was dropped: the image is left out of the output
+            result["emptied"].append(relative)
+            if not dry_run:
+                target.unlink(missing_ok=True)
+            continue
+        if digest == known_hash and target.exists():
+            result["unchanged"] += 1
+            continue
+        result["written"] += 1
+        if not dry_run:
+            atomic_write(target, content)
+    return result
+
+
+def load_manifest(output):
+    try:
+        return json.loads((output / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {"mapping": None, "files": {}}
+
+
+def write_data_yaml(output, splits):
+    lines = [f"path: {output.resolve().as_posix()}"]
+    for key, split in (("train", "train"), ("val", "valid"), ("test", "test")):
+        if split in splits:
+            lines.append(f"{key}: {split}/images")
+    lines.append(f"nc: {len(CLASS_NAMES)}")
+    lines.append("names: [" + ", ".join(f"'{name}'" for name in CLASS_NAMES) + "]")
+    atomic_write(output / "data.yaml", "\n".join(lines) + "\n")
+
+
+def remap_dataset(source, output, mapping=CLASS_MAPPING, workers=None, dry_run=False, force=False):
+    """
+    Write a remapped copy of a YOLO dataset
+
+    Args:
+        source (Path): Original dataset root (train/valid/test with images/ and labels/)
+        output (Path): New dataset root (must differ from source)
+        mapping (dict): old class -> new class
+        workers (int): Worker processes (default: all CPUs)
+        dry_run (bool): Validate and count only, write nothing
+        force (bool): Rewrite every label file
+
+    Returns:
+        dict: files, written, unchanged, removed, dropped_images, per-split
+            class counts and problems
+    """
+    if source.resolve() == output.resolve():
+        raise ValueError("Output must differ from source - remapping in place is not idempotent")
+
+    manifest = load_manifest(output)
+    mapping_key = {str(old): new for old, new in sorted(mapping.items())}
+    if force or manifest.get("mapping") != mapping_key:
+        manifest = {"mapping": mapping_key, "files": {}}
+    known = manifest["files"]
+
+    relatives, splits = [], []
+    for split in SPLITS:
+        labels_dir = source / split / "labels"
+        if not labels_dir.is_dir() or not (source / split / "images").is_dir():
+            continue
+        splits.append(split)
+        relatives.extend(f"{split}/labels/{entry.name}" for entry in os.scandir(labels_dir)
+                         if entry.name.endswith(".txt"))
+        if not dry_run:
+            (output / split / "labels").mkdir(parents=True, exist_ok=True)
+            (output / split / "images").mkdir(parents=True, exist_ok=True)
+
+    stats = {"files": len(relatives), "written": 0, "unchanged": 0, "removed": 0, "dropped_images": 0,
+             "counts": {split: Counter() for split in splits}, "problems": []}
+    hashes, emptied = {}, set()
+    jobs = [
+        (source, output, [(relative, known.get(relative)) for relative in relatives[start:start + BATCH_SIZE]],
+         mapping, dry_run)
+        for start in range(0, len(relatives), BATCH_SIZE)
+    ]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for result in pool.map(remap_batch, jobs):
+            hashes.update(result["hashes"])
+            stats["written"] += result["written"]
+            stats["unchanged"] += result["unchanged"]
+            stats["problems"].extend(result["problems"])
+            emptied.update(result["emptied"])
+            for split, counts in result["counts"].items():
+                stats["counts"][split].update(counts)
+
+    # Images are linked once their labels are known, leaving out the emptied ones
+    dropped = {(relative.split("/", 1)[0], Path(relative).stem) for relative in emptied}
+    for split in splits:
+        for entry in os.scandir(source / split / "images"):
+            target = output / split / "images" / entry.name
+            if (split, Path(entry.name).stem) in dropped:
+                stats["dropped_images"] += 1
+                if not dry_run:
+                    target.unlink(missing_ok=True)
+            elif not dry_run:
+                link_or_copy(entry.path, target)
+
+    # Labels whose source file is gone
+    for relative in set(known) - set(hashes):
+        stats["removed"] += 1
+        if not dry_run:
+            (output / relative).unlink(missing_ok=True)
+
+    if not dry_run:
+        write_data_yaml(output, splits)
+        manifest["files"] = hashes
+        atomic_write(output / MANIFEST_NAME, json.dumps(manifest))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remap original dataset classes to the 4 target classes")
+    parser.add_argument("--source", type=Path, default=DEFAULT_SOURCE,
+                        help="Original dataset root (WASTE_ORIGINAL_DATASET)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Remapped dataset root (WASTE_DATASET)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all CPUs)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and count only, write nothing")
+    parser.add_argument("--force", action="store_true", help="Rewrite every label file")
+    args = parser.parse_args()
 
-def remap_labels():
-    """Remap all label files from original to target 4 classes"""
-    
-    dataset_path = Path('D:/Hackthon-garbage/training/dataset')
-    
-    # Class mapping: old_class -> new_class
-    # TARGET: RECYCLABLE=0, ORGANIC=1, HAZARDOUS=2, GENERAL=3
-    class_mapping = {
-        0: 3,  # general waste -> GENERAL
-        1: 2,  # hazardous waste -> HAZARDOUS
-        2: 1,  # organic -> ORGANIC
-        3: 0,  # recyclable -> RECYCLABLE
-    }
-    
     print("=" * 60)
     print("LABEL REMAPPING: Original → Target 4 Classes")
     print("=" * 60)
@@ -42,85 +271,44 @@ def remap_labels():
     print("  Old 1 (hazardous waste) → New 2 (HAZARDOUS)")
     print("  Old 2 (organic)         → New 1 (ORGANIC)")
     print("  Old 3 (recyclable)      → New 0 (RECYCLABLE)")
-    print()
-    
-    total_files = 0
-    total_labels = 0
-    class_counts = {0: 0, 1: 0, 2: 0, 3: 0}  # Count per new class
-    
-    for split in ['train', 'valid', 'test']:
-        labels_dir = dataset_path / split / 'labels'
-        
-        if not labels_dir.exists():
-            print(f"⚠️ Skipping {split} - labels folder not found")
-            continue
-        
-        label_files = list(labels_dir.glob('*.txt'))
-        print(f"📁 Processing {split}: {len(label_files)} label files...")
-        
-        for label_file in label_files:
-            try:
-                with open(label_file, 'r') as f:
-                    lines = f.readlines()
-                
-                new_lines = []
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    parts = line.split()
-                    if len(parts) < 5:  # class + 4 bbox coords minimum
-                        continue
-                    
-                    old_class = int(parts[0])
-                    
-                    # Skip if class not in mapping (shouldn't happen)
-                    if old_class not in class_mapping:
-                        print(f"  ⚠️ Unknown class {old_class} in {label_file.name}")
-                        continue
-                    
-                    new_class = class_mapping[old_class]
-                    class_counts[new_class] += 1
-                    
-                    # Rebuild line with new class
-                    parts[0] = str(new_class)
-                    new_lines.append(' '.join(parts))
-                    total_labels += 1
-                
-                # Write remapped labels back
-                with open(label_file, 'w') as f:
-                    f.write('\n'.join(new_lines))
-                    if new_lines:
-                        f.write('\n')
-                
-                total_files += 1
-                
-            except Exception as e:
-                print(f"  ❌ Error processing {label_file.name}: {e}")
-    
+    print(f"\n   Source: {args.source}")
+    print(f"   Output: {args.output}{' (dry run)' if args.dry_run else ''}")
+
+    if not args.source.exists():
+        print(f"\n❌ Source dataset not found: {args.source}")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    try:
+        stats = remap_dataset(args.source, args.output, workers=args.workers, dry_run=args.dry_run, force=args.force)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        raise SystemExit(1)
+    elapsed = time.perf_counter() - start
+
     print("\n" + "=" * 60)
-    print("✅ REMAPPING COMPLETE!")
+    print(f"✅ REMAPPING {'CHECKED' if args.dry_run else 'COMPLETE'} in {elapsed:.1f}s")
     print("=" * 60)
     print(f"\n📊 Statistics:")
-    print(f"   Total files processed: {total_files}")
-    print(f"   Total labels remapped: {total_labels}")
+    print(f"   Label files:   {stats['files']:,}")
+    print(f"   {'Would write:' if args.dry_run else 'Written:':<15}{stats['written']:,}")
+    print(f"   Unchanged:     {stats['unchanged']:,}")
+    print(f"   Removed:       {stats['removed']:,}")
+    print(f"   Dropped boxes: {len(stats['problems']):,}")
+    print(f"   Empty images:  {stats['dropped_images']:,} (dropped)")
+    for relative, number, problem in stats["problems"][:10]:
+        print(f"      ⚠️ {relative}:{number} {problem}")
+
     print(f"\n📈 Class Distribution (after remapping):")
-    print(f"   RECYCLABLE (0): {class_counts[0]:,} labels")
-    print(f"   ORGANIC (1):    {class_counts[1]:,} labels")
-    print(f"   HAZARDOUS (2):  {class_counts[2]:,} labels")
-    print(f"   GENERAL (3):    {class_counts[3]:,} labels")
-    
-    return True
+    total = Counter()
+    for counts in stats["counts"].values():
+        total.update(counts)
+    print(f"   {'':<14}" + "".join(f"{split:>10}" for split in stats["counts"]) + f"{'total':>10}")
+    for index, name in enumerate(CLASS_NAMES):
+        row = "".join(f"{counts[index]:>10,}" for counts in stats["counts"].values())
+        print(f"   {name + f' ({index})':<14}{row}{total[index]:>10,}")
 
 
 if __name__ == "__main__":
     print("\n🗑️ Waste Classification Label Remapper (4-Class) 🗑️\n")
-    
-    success = remap_labels()
-    
-    if success:
-        print("\n✅ Labels remapped successfully!")
-        print("   Dataset is now ready for 3-class training.")
-    else:
-        print("\n❌ Remapping failed!")
+    main()
@@ -0,0 +1,276 @@
+"""
+Model Size / Input Resolution Sweep
+===================================
+Trains (or just evaluates) several YOLOv8 sizes at several input
+resolutions. Each configuration is measured the way the backend serves it:
+
+- accuracy per category: image-level category from the model's detections,
+  resolved through backend/utils.classify_detections (same rules as the API),
+  against the dominant class of the validation label file
+- CPU latency at batch 1 and batch 8 (model call + category resolution),
+  with the torch thread count the backend would use (TORCH_THREADS)
+
+The report lists every configuration, marks the Pareto frontier of
+batch-1 latency vs accuracy and recommends the fastest configuration
+that meets the HAZARDOUS recall target.
+
+Usage:
+    python training/sweep.py --train --models n s --imgsz 256 320 416 --epochs 30
+    python training/sweep.py --weights backend/model/best.pt --imgsz 320 416
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import yaml
+
+from train import default_data_yaml, default_workers
+
+TRAINING_DIR = Path(__file__).resolve().parent
+BACKEND_PATH = TRAINING_DIR.parent / "backend"
+DEFAULT_PROJECT = TRAINING_DIR / "runs" / "sweep"
+sys.path.insert(0, str(BACKEND_PATH))
+
+from utils import CATEGORIES, build_class_category_table, classify_detections  # noqa: E402
+
+
+def load_validation_set(data_yaml, split="val", limit=None):
+    """
+    Validation images with their ground-truth category
+
+    The category of an image is the category of its most frequent label
+    class (the backend answers with one category per image).
+
+    Returns:
+        list: (image path, category) pairs
+    """
+    data_yaml = Path(data_yaml)
+    config = yaml.safe_load(data_yaml.read_text())
+    root = Path(config.get("path") or data_yaml.parent)
+    if not root.is_absolute():
+        root = data_yaml.parent / root
+    images_dir = (root / config[split]).resolve()
+    labels_dir = images_dir.parent / "labels"
+    class_table = build_class_category_table(config["names"])
+
+    samples = []
+    for image_path in sorted(images_dir.iterdir()):
+        if image_path.suffix.lower() not in {".jpg", ".jpeg", ".png", ".bmp", ".webp"}:
+            continue
+        label_path = labels_dir / f"{image_path.stem}.txt"
+        if not label_path.exists():
+            continue
+        classes = Counter(int(line.split()[0]) for line in label_path.read_text().splitlines() if line.strip())
+        if not classes:
+            continue
+        samples.append((image_path, CATEGORIES[class_table[classes.most_common(1)[0][0]]]))
+        if limit and len(samples) >= limit:
+            break
+    return samples
+
+
+def serve(model, class_table, images, imgsz):
+    """One backend-style inference call: model + category resolution"""
+    results = model(images, imgsz=imgsz, device="cpu", verbose=False)
+    return classify_detections(
+        [(r.boxes.cls.cpu().numpy(), r.boxes.conf.cpu().numpy()) for r in results],
+        class_table,
+        model.names,
+    )
+
+
+def evaluate_accuracy(model, class_table, samples, imgsz, batch_size=16):
+    """
+    Returns:
+        dict: accuracy, per-category recall/precision and no-detection rate
+    """
+    confusion = Counter()
+    for start in range(0, len(samples), batch_size):
+        batch = samples[start:start + batch_size]
+        predictions = serve(model, class_table, [str(path) for path, _ in batch], imgsz)
+        for (_, truth), prediction in zip(batch, predictions):
+            confusion[(truth, prediction["category"] if prediction else "NONE")] += 1
+
+    total = sum(confusion.values())
+    recall, precision = {}, {}
+    for name in CATEGORIES:
+        actual = sum(count for (truth, _), count in confusion.items() if truth == name)
+        predicted = sum(count for (_, guess), count in confusion.items() if guess == name)
+        recall[name] = round(confusion[(name, name)] / actual, 4) if actual else None
+        precision[name] = round(confusion[(name, name)] / predicted, 4) if predicted else None
+    return {
+        "samples": total,
+        "accuracy": round(sum(confusion[(name, name)] for name in CATEGORIES) / total, 4) if total else 0.0,
+        "recall": recall,
+        "precision": precision,
+        "no_detection": round(sum(c for (_, guess), c in confusion.items() if guess == "NONE") / total, 4)
+        if total else 0.0,
+    }
+
+
+def measure_latency(model, class_table, images, imgsz, batch_size, runs=20, warmup=3):
+    """
+    CPU latency of one serving call with `batch_size` decoded images
+
+    Returns:
+        dict: p50/p95 per call and p50 per image, in milliseconds
+    """
+    batch = [images[i % len(images)] for i in range(batch_size)]
+    for _ in range(warmup):
+        serve(model, class_table, batch, imgsz)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        serve(model, class_table, batch, imgsz)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p50 = statistics.median(timings)
+    return {
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        "per_image_ms": round(p50 / batch_size, 2),
+    }
+
+
+def train_config(size, imgsz, data, epochs, batch, workers, project):
+    """Train yolov8<size> at imgsz; returns the best weights"""
+    from ultralytics import YOLO
+
+    name = f"yolov8{size}_{imgsz}"
+    YOLO(f"yolov8{size}.pt").train(
+        data=str(data), epochs=epochs, imgsz=imgsz, batch=batch, workers=workers,
+        project=str(project), name=name, exist_ok=True, verbose=False,
+    )
+    return Path(project) / name / "weights" / "best.pt"
+
+
+def pareto_frontier(rows, latency_key="latency_b1_ms", score_key="accuracy"):
+    """Mark rows no other row beats on both latency (lower) and score (higher)"""
+    for row in rows:
+        row["pareto"] = not any(
+            other[latency_key] <= row[latency_key] and other[score_key] >= row[score_key]
+            and (other[latency_key] < row[latency_key] or other[score_key] > row[score_key])
+            for other in rows
+        )
+    return [row for row in rows if row["pareto"]]
+
+
+def recommend(rows, hazardous_recall):
+    """Fastest configuration meeting the HAZARDOUS recall target (None if none does)"""
+    eligible = [row for row in rows if (row["recall"].get("HAZARDOUS") or 0.0) >= hazardous_recall]
+    return min(eligible, key=lambda row: row["latency_b1_ms"]) if eligible else None
+
+
+def format_report(rows, best, hazardous_recall):
+    """Markdown table of all configurations, frontier first"""
+    lines = [
+        "| Config | imgsz | Accuracy | HAZARDOUS recall | Batch 1 p50 (ms) | Batch 8 per image (ms) | Pareto |",
+        "|--------|-------|----------|------------------|------------------|------------------------|--------|",
+    ]
+    for row in sorted(rows, key=lambda row: (not row["pareto"], row["latency_b1_ms"])):
+        hazardous = row["recall"].get("HAZARDOUS")
+        lines.append(
+            f"| {row['name']} | {row['imgsz']} | {row['accuracy']:.1%} | "
+            f"{'-' if hazardous is None else f'{hazardous:.1%}'} | {row['latency_b1_ms']:.1f} | "
+            f"{row['latency_b8']['per_image_ms']:.1f} | {'✅' if row['pareto'] else ''} |"
+        )
+    lines.append("")
+    if best:
+        lines.append(f"Recommended: **{best['name']} @ {best['imgsz']}** - fastest with HAZARDOUS recall "
+                     f">= {hazardous_recall:.0%} ({best['weights']})")
+    else:
+        lines.append(f"No configuration reaches HAZARDOUS recall >= {hazardous_recall:.0%}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep model sizes and input resolutions")
+    parser.add_argument("--data", type=Path, default=default_data_yaml(), help="Dataset YAML")
+    parser.add_argument("--models", nargs="*", default=["n", "s"], help="YOLOv8 sizes (n, s, m, ...)")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[256, 320, 416])
+    parser.add_argument("--weights", nargs="*", type=Path, default=[],
+                        help="Existing weights to evaluate at every imgsz (no training)")
+    parser.add_argument("--train", action="store_true", help="Train configurations without weights")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=8, help="Training batch size")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Training loader workers")
+    parser.add_argument("--project", type=Path, default=DEFAULT_PROJECT)
+    parser.add_argument("--limit", type=int, default=None, help="Validation images used for accuracy")
+    parser.add_argument("--latency-runs", type=int, default=20)
+    parser.add_argument("--hazardous-recall", type=float, default=0.8, help="Recall target for HAZARDOUS")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    from autotune import configure_torch_threads
+    from PIL import Image
+
+    print("=" * 60)
+    print("MODEL SIZE / RESOLUTION SWEEP")
+    print("=" * 60)
+    threads = configure_torch_threads()
+    samples = load_validation_set(args.data, limit=args.limit)
+    if not samples:
+        print(f"❌ No labelled validation images found via {args.data}")
+        sys.exit(1)
+    images = [Image.open(path).convert("RGB") for path, _ in samples[:8]]
+    print(f"   Dataset: {args.data} ({len(samples)} validation images)")
+    print(f"   Torch threads: {threads}")
+
+    # (name, imgsz, weights) for every configuration
+    configs = [(path.stem, imgsz, path) for path in args.weights for imgsz in args.imgsz]
+    for size in args.models:
+        for imgsz in args.imgsz:
+            weights = args.project / f"yolov8{size}_{imgsz}" / "weights" / "best.pt"
+            if not weights.exists() and args.train:
+                print(f"\n🚀 Training yolov8{size} @ {imgsz}...")
+                weights = train_config(size, imgsz, args.data, args.epochs, args.batch, args.workers, args.project)
+            if weights.exists():
+                configs.append((f"yolov8{size}", imgsz, weights))
+            else:
+                print(f"   ⚠️ Skipping yolov8{size} @ {imgsz}: no weights (use --train)")
+
+    rows = []
+    for name, imgsz, weights in configs:
+        print(f"\n📏 {name} @ {imgsz}")
+        model = YOLO(str(weights))
+        class_table = build_class_category_table(model.names)
+        row = {"name": name, "imgsz": imgsz, "weights": str(weights)}
+        row.update(evaluate_accuracy(model, class_table, samples, imgsz))
+        row["latency_b1"] = measure_latency(model, class_table, images, imgsz, 1, args.latency_runs)
+        row["latency_b8"] = measure_latency(model, class_table, images, imgsz, 8, max(5, args.latency_runs // 4))
+        row["latency_b1_ms"] = row["latency_b1"]["p50_ms"]
+        rows.append(row)
+        print(f"   Accuracy {row['accuracy']:.1%}, HAZARDOUS recall {row['recall']['HAZARDOUS'] or 0:.1%}, "
+              f"batch 1 {row['latency_b1_ms']:.1f} ms, batch 8 {row['latency_b8']['per_image_ms']:.1f} ms/image")
+
+    if not rows:
+        print("\n❌ Nothing to evaluate")
+        sys.exit(1)
+
+    pareto_frontier(rows)
+    best = recommend(rows, args.hazardous_recall)
+    args.project.mkdir(parents=True, exist_ok=True)
+    report = {
+        "data": str(args.data),
+        "torch_threads": threads,
+        "cpu_count": os.cpu_count(),
+        "hazardous_recall_target": args.hazardous_recall,
+        "recommended": best and {"name": best["name"], "imgsz": best["imgsz"], "weights": best["weights"]},
+        "results": rows,
+    }
+    (args.project / "report.json").write_text(json.dumps(report, indent=2))
+    markdown = format_report(rows, best, args.hazardous_recall)
+    (args.project / "report.md").write_text(markdown)
+
+    print("\n" + markdown)
+    print(f"💾 Report saved to {args.project / 'report.json'} and report.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,48 @@ This script trains a YOLOv8 model for waste classification with:
   - HAZARDOUS (2)  - Red Bin - Batteries, Bulbs, Paint
   - GENERAL (3)    - Grey Bin - Chip bags, Tissues
 - Safe batch size and image size settings
+
+Data loading: run training/prepare_dataset.py first - images are resized
+to the training size once and stored as .npy arrays, so several loader
+workers can run with bounded RAM instead of workers=0.
+
+The trained weights are registered as a new version in the backend model
+registry (backend/model/registry); --activate also makes the running API
+swap to it.
+
+Usage:
+    python training/prepare_dataset.py --imgsz 416
+    python training/train.py
+    python training/train.py --data path/to/data.yaml --workers 4 --epochs 50
+    python training/train.py --activate
 """
 
+import argparse
 import os
 import sys
 import gc
 import torch
 from pathlib import Path
 
+from prepare_dataset import DEFAULT_OUTPUT, DEFAULT_SOURCE, prepared_imgsz
+
+TRAINING_DIR = Path(__file__).resolve().parent
+BACKEND_PATH = TRAINING_DIR.parent / 'backend'
+sys.path.insert(0, str(BACKEND_PATH))
+
+import model_registry  # noqa: E402
+
+
+def default_workers():
+    """Loader workers: leave a core for the training loop, cap at 8"""
+    return max(1, min(8, (os.cpu_count() or 1) - 1))
+
+
+def default_data_yaml():
+    """Prepared dataset if it exists, the raw dataset otherwise"""
+    prepared = DEFAULT_OUTPUT / 'data.yaml'
+    return prepared if prepared.exists() else DEFAULT_SOURCE / 'data.yaml'
+
 def check_gpu():
     """Check GPU availability and memory"""
     print("=" * 60)
@@ -42,8 +76,14 @@ def check_gpu():
     
     return True
 
-def train_model():
-    """Train the waste classification model with RTX 3050 optimizations"""
+def train_model(data, epochs=50, batch=8, imgsz=416, workers=None, activate=False):
+    """
+    Train the waste classification model with RTX 3050 optimizations
+
+    Args:
+        data (Path): Dataset YAML (prepared dataset recommended)
+        workers (int): Data loader workers (default: CPUs - 1, max 8)
+    """
     
     print("\n" + "=" * 60)
     print("WASTE CLASSIFICATION MODEL TRAINING")
@@ -63,20 +103,20 @@ def train_model():
         'model': 'yolov8n.pt',  # Nano model ~3.2M parameters
         
         # Dataset configuration
-        'data': 'D:/Hackthon-garbage/training/dataset/data.yaml',
+        'data': str(data),
         
         # Training parameters - MEMORY SAFE
-        'epochs': 50,           # Good balance for dataset size
-        'batch': 8,             # Uses ~1.7-2GB VRAM
-        'imgsz': 416,           # Reduced from 640 to save memory
+        'epochs': epochs,       # 50: good balance for dataset size
+        'batch': batch,         # 8 uses ~1.7-2GB VRAM
+        'imgsz': imgsz,         # 416: reduced from 640 to save memory
         'patience': 10,         # Early stopping patience
         
         # Device settings
         'device': 0 if has_gpu else 'cpu',
         
         # Memory optimization
-        'workers': 0,           # NO workers to prevent RAM crash
-        'cache': False,         # Don't cache images in RAM
+        'workers': workers if workers is not None else default_workers(),
+        'cache': False,         # No RAM cache: prepared .npy files are read per batch
         'amp': True,            # Mixed precision training (FP16)
         
         # Training optimization
@@ -98,7 +138,7 @@ def train_model():
         'mosaic': 0.5,          # Reduced mosaic (saves memory)
         
         # Output
-        'project': 'D:/Hackthon-garbage/training/runs',
+        'project': str(TRAINING_DIR / 'runs'),
         'name': 'waste_classifier',
         'exist_ok': True,       # Overwrite if exists
         'pretrained': True,     # Use pretrained weights
@@ -116,6 +156,7 @@ def train_model():
     print(f"   Image Size: {config['imgsz']}x{config['imgsz']}")
     print(f"   Device: {'GPU (CUDA)' if has_gpu else 'CPU'}")
     print(f"   Mixed Precision: {'Enabled' if config['amp'] else 'Disabled'}")
+    print(f"   Loader Workers: {config['workers']}")
     print(f"   Dataset: {config['data']}")
     
     try:
@@ -168,26 +209,21 @@ def train_model():
         print("✅ TRAINING COMPLETED SUCCESSFULLY!")
         print("=" * 60)
         
-        # Find and copy the best model
+        # Register the best model as a new version (previous versions stay available for rollback)
         best_model_path = Path(config['project']) / config['name'] / 'weights' / 'best.pt'
-        final_model_path = Path('D:/Hackthon-garbage/backend/model/best.pt')
         
         if best_model_path.exists():
-            import shutil
-            # Backup old model if exists
-            if final_model_path.exists():
-                backup_path = final_model_path.with_suffix('.pt.backup')
-                shutil.copy(final_model_path, backup_path)
-                print(f"   📦 Old model backed up to: {backup_path}")
-            
-            # Copy new best model
-            shutil.copy(best_model_path, final_model_path)
-            print(f"   🎯 Best model saved to: {final_model_path}")
-            
-            # Print model metrics
+            info = model_registry.register(best_model_path, metadata={
+                'data': str(data), 'epochs': epochs, 'imgsz': config['imgsz'], 'base_model': config['model'],
+            })
             print(f"\n📊 Training Results:")
             print(f"   Best model saved at: {best_model_path}")
-            print(f"   Copied to backend: {final_model_path}")
+            print(f"   🎯 Registered as version: {info['version']}")
+            if activate:
+                model_registry.activate(info['version'])
+                print(f"   🔄 Activated - running API workers swap within {model_registry.MODEL_WATCH_INTERVAL:g}s")
+            else:
+                print(f"   Activate with: python backend/model_registry.py activate {info['version']}")
             
         else:
             print(f"⚠️ Best model not found at expected location: {best_model_path}")
@@ -221,12 +257,10 @@ def train_model():
         raise e
 
 
-def validate_dataset():
+def validate_dataset(dataset_path, imgsz):
     """Validate the dataset before training"""
     print("\n📁 Validating Dataset...")
     
-    dataset_path = Path('D:/Hackthon-garbage/training/dataset')
-    
     # Check directories exist
     for split in ['train', 'valid', 'test']:
         img_dir = dataset_path / split / 'images'
@@ -239,7 +273,7 @@ def validate_dataset():
             print(f"   ❌ Missing: {lbl_dir}")
             return False
             
-        img_count = len(list(img_dir.glob('*')))
+        img_count = len([p for p in img_dir.iterdir() if p.suffix != '.npy'])
         lbl_count = len(list(lbl_dir.glob('*.txt')))
         
         print(f"   ✅ {split}: {img_count} images, {lbl_count} labels")
@@ -251,28 +285,46 @@ def validate_dataset():
         return False
     
     print("   ✅ data.yaml found")
+
+    built_for = prepared_imgsz(dataset_path)
+    if built_for is None:
+        print("   ⚠️ Not prepared - run training/prepare_dataset.py for faster epochs")
+    elif built_for != imgsz:
+        print(f"   ⚠️ Prepared for imgsz {built_for}, training at {imgsz} - images are resized again per batch")
+    else:
+        print(f"   ✅ Prepared at {built_for}px")
     return True
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the waste classification model")
+    parser.add_argument("--data", type=Path, default=default_data_yaml(),
+                        help="Dataset YAML (default: prepared dataset if present)")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--imgsz", type=int, default=416)
+    parser.add_argument("--workers", type=int, default=None, help="Data loader workers (default: CPUs - 1, max 8)")
+    parser.add_argument("--activate", action="store_true", help="Serve the new version right away")
+    args = parser.parse_args()
+
     print("\n" + "🗑️ " * 20)
     print("    WASTE CLASSIFICATION TRAINER")
     print("    RTX 3050 4GB Optimized Edition")
     print("🗑️ " * 20 + "\n")
     
     # Validate dataset first
-    if not validate_dataset():
+    if not validate_dataset(args.data.parent, args.imgsz):
         print("\n❌ Dataset validation failed. Please check your dataset.")
         sys.exit(1)
     
     # Start training
-    success = train_model()
+    success = train_model(args.data, args.epochs, args.batch, args.imgsz, args.workers, args.activate)
     
     if success:
         print("\n" + "🎉 " * 20)
         print("    TRAINING COMPLETE!")
-        print("    Your new best.pt model is ready!")
-        print("    Located at: D:/Hackthon-garbage/backend/model/best.pt")
+        print("    Your new model is registered!")
+        print(f"    Registry: {model_registry.MODEL_REGISTRY_DIR}")
         print("🎉 " * 20 + "\n")
     else:
         print("\n❌ Training failed. Check the error messages above.")
@@ -0,0 +1,12 @@
+"""
+Shared core of the waste classification service
+Category metadata, response payloads, the Gemini classification engine and
+a multipart/form-data parser, used by both deployments:
+
+- backend/ (FastAPI + YOLO, Docker/Azure) re-exports these through
+  utils.py, responses.py and gemini_service.py
+- api/index.py (Vercel serverless, Gemini only) is a thin handler over them
+
+Only the standard library is required; orjson and google-generativeai are
+used when installed.
+"""
@@ -0,0 +1,43 @@
+"""
+Small in-process LRU cache with expiry
+The Vercel handler keeps recent results here between warm invocations of
+the same instance; the FastAPI backend uses its cross-worker store
+(backend/shared_state.py) instead.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU mapping whose entries expire ttl seconds after being stored"""
+
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
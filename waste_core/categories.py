@@ -0,0 +1,280 @@
+"""
+Waste category metadata shared by the FastAPI backend and the Vercel handler
+Dustbin colours and icons, awareness tips, descriptions and the keyword
+rules that map free-text class or item names to a category
+
+All lookup tables are built once at import and frozen (MappingProxyType)
+"""
+
+import re
+from functools import lru_cache
+from types import MappingProxyType
+
+
+# Dustbin color per waste class
+DUSTBIN_COLORS = MappingProxyType({
+    "RECYCLABLE": "blue",
+    "ORGANIC": "green",
+    "HAZARDOUS": "red",
+    "GENERAL": "grey",
+    # Fallback mappings
+    "BIODEGRADABLE": "green",
+})
+
+
+def get_dustbin_color(waste_class):
+    """
+    Map waste class to dustbin color
+    
+    Args:
+        waste_class (str): Waste classification (RECYCLABLE, ORGANIC, HAZARDOUS, GENERAL)
+    
+    Returns:
+        str: Dustbin color (blue/green/red/grey)
+    """
+    return DUSTBIN_COLORS.get(waste_class.upper(), "grey")  # Default to general for safety
+
+
+# Icon identifier per waste class
+DUSTBIN_ICONS = MappingProxyType({
+    "RECYCLABLE": "recycle",
+    "ORGANIC": "leaf",
+    "HAZARDOUS": "warning",
+    "GENERAL": "trash",
+    "BIODEGRADABLE": "leaf",
+})
+
+
+def get_dustbin_icon(waste_class):
+    """
+    Get icon name for waste class
+    
+    Args:
+        waste_class (str): Waste classification
+    
+    Returns:
+        str: Icon identifier
+    """
+    return DUSTBIN_ICONS.get(waste_class.upper(), "trash")
+
+
+# Detailed awareness tips per waste class
+FALLBACK_TIPS = MappingProxyType({
+    "ORGANIC": """🟢 ORGANIC / BIODEGRADABLE WASTE
+
+WHY GREEN DUSTBIN: This item is made of natural materials that decompose through biological processes. Microorganisms break it down into nutrient-rich compost within weeks to months.
+
+PROPER DISPOSAL:
+• Place in the GREEN dustbin (wet waste bin)
+• Do not mix with plastic or non-biodegradable items
+• Can be composted at home or community composting facilities
+• Keep separate from dry recyclable waste
+
+EXAMPLES: Food scraps, fruit & vegetable peels, tea bags, coffee grounds, eggshells, garden waste, leaves, flowers, paper napkins, cotton.
+
+ENVIRONMENTAL IMPACT: When organic waste goes to landfills instead of being composted, it produces methane - a greenhouse gas 25x more potent than CO2. Proper composting reduces landfill burden by 30% and creates free fertilizer for plants!
+
+💡 TIP: Start a small compost bin at home - your garden will thank you!""",
+    
+    "RECYCLABLE": """🔵 RECYCLABLE / DRY WASTE
+
+WHY BLUE DUSTBIN: This material can be collected, processed, and transformed into new products. Recycling conserves natural resources, saves energy, and reduces pollution.
+
+PROPER DISPOSAL:
+• Place in the BLUE dustbin (dry waste bin)
+• Rinse containers to remove food residue
+• Flatten cardboard boxes to save space
+• Remove caps from bottles (recycle separately)
+• Keep items clean and dry
+
+EXAMPLES: Plastic bottles (PET), glass bottles & jars, aluminum cans, steel/tin cans, cardboard, newspapers, magazines, office paper, cartons, metal containers.
+
+ENVIRONMENTAL IMPACT: Recycling one aluminum can saves enough energy to power a TV for 3 hours. Recycling paper saves 17 trees per ton. Plastic recycling reduces oil consumption and ocean pollution.
+
+💡 TIP: Check the recycling symbol (♻️) and number on plastics - Types 1 (PET) and 2 (HDPE) are most commonly recycled!""",
+    
+    "HAZARDOUS": """🔴 HAZARDOUS / DANGEROUS WASTE
+
+⚠️ WARNING: This item contains toxic, flammable, corrosive, or reactive materials that pose serious risks to human health and the environment.
+
+PROPER DISPOSAL:
+• Place in the RED dustbin or designated hazardous waste collection
+• NEVER throw in regular garbage bins
+• NEVER burn or bury hazardous waste
+• Store safely until you can dispose properly
+• Take to authorized e-waste collection centers
+
+EXAMPLES: Batteries (all types), electronic devices, mobile phones, computers, light bulbs (CFL/LED), paint, pesticides, cleaning chemicals, medicines, thermometers, aerosol cans.
+
+ENVIRONMENTAL IMPACT: Hazardous waste can contaminate soil and groundwater for decades. One battery can pollute 1 million liters of water. Electronic waste contains lead, mercury, and cadmium that cause serious health problems.
+
+⚠️ CRITICAL: Never mix hazardous items with other waste. Handle with care and dispose at authorized collection points only!
+
+💡 TIP: Many electronics stores and pharmacies accept old batteries and e-waste for safe recycling.""",
+
+    "GENERAL": """⬜ GENERAL / NON-RECYCLABLE WASTE
+
+WHY GREY DUSTBIN: This item cannot be easily recycled or composted with current technology. It requires proper disposal in the general waste stream.
+
+PROPER DISPOSAL:
+• Place in the GREY dustbin (general waste bin)
+• Reduce usage of such items when possible
+• Look for recyclable alternatives
+• Do not mix with organic or recyclable waste
+
+EXAMPLES: Chip bags, snack wrappers, tissues, sanitary products, diapers, rubber items, ceramics, broken toys, styrofoam, multi-layered packaging, candy wrappers, cigarette butts.
+
+ENVIRONMENTAL IMPACT: General waste typically ends up in landfills where it can take hundreds of years to decompose. Multi-layered packaging like chip bags combines plastic and aluminum, making recycling nearly impossible.
+
+💡 TIP: Choose products with less packaging and opt for recyclable alternatives when available. Every small choice adds up!"""
+})
+
+
+def get_fallback_awareness_tip(waste_class):
+    """
+    Provide detailed awareness tips for waste disposal education
+    
+    Args:
+        waste_class (str): Waste classification
+    
+    Returns:
+        str: Detailed awareness tip with disposal instructions
+    """
+    return FALLBACK_TIPS.get(waste_class.upper(), """⚠️ UNIDENTIFIED ITEM
+
+For your safety and environmental protection, when the waste type cannot be determined with certainty:
+
+RECOMMENDED ACTION:
+• Treat as HAZARDOUS waste (RED dustbin)
+• Do not mix with regular household waste
+• Check with local waste management authority
+• Look for disposal instructions on the product packaging
+
+When in doubt, it's always safer to handle unknown waste as potentially hazardous rather than risk contaminating recyclable or organic waste streams.
+
+💡 TIP: Take a photo and consult your local municipal waste guide for proper disposal instructions.""")
+
+
+def validate_image_format(filename):
+    """
+    Validate if uploaded file is an image
+    
+    Args:
+        filename (str): Name of the uploaded file
+    
+    Returns:
+        bool: True if valid image format, False otherwise
+    """
+    if not filename:
+        return False
+    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'jfif', 'pjpeg', 'pjp'}
+    if '.' not in filename:
+        return False
+    ext = filename.rsplit('.', 1)[1].lower()
+    return ext in allowed_extensions
+
+
+# Detailed description per waste class
+CLASS_DESCRIPTIONS = MappingProxyType({
+    "RECYCLABLE": "Materials that can be reprocessed and reused. Examples: plastic bottles, glass, metal cans, cardboard.",
+    
+    "ORGANIC": "Organic waste that decomposes naturally through biological processes. Examples: food scraps, leaves, garden waste.",
+    
+    "HAZARDOUS": "Waste that poses risks to health or environment. Examples: batteries, chemicals, medical waste, e-waste.",
+    
+    "GENERAL": "Non-recyclable items that go to landfill. Examples: chip bags, tissues, multi-layered wrappers."
+})
+
+
+def get_class_description(waste_class):
+    """
+    Get detailed description of waste class
+    
+    Args:
+        waste_class (str): Waste classification
+    
+    Returns:
+        str: Detailed description
+    """
+    return CLASS_DESCRIPTIONS.get(waste_class.upper(), "Unknown waste category.")
+
+
+# ===== Category rule tables =====
+
+# Standard categories in training class-id order (see training/remap_labels.py)
+CATEGORIES = ("RECYCLABLE", "ORGANIC", "HAZARDOUS", "GENERAL")
+CATEGORY_INDEX = {name: idx for idx, name in enumerate(CATEGORIES)}
+
+# Direct mappings for standard class names
+EXACT_CLASS_NAMES = {
+    "RECYCLABLE": "RECYCLABLE",
+    "ORGANIC": "ORGANIC",
+    "BIODEGRADABLE": "ORGANIC",  # Map BIODEGRADABLE to ORGANIC for display
+    "HAZARDOUS": "HAZARDOUS",
+    "GENERAL": "GENERAL",
+}
+
+# Keyword fallback for robustness - earlier categories win when several match
+CATEGORY_KEYWORDS = (
+    ("RECYCLABLE", ('RECYCLABLE', 'RECYCLE', 'PLASTIC', 'PAPER', 'GLASS', 'METAL', 'CARDBOARD', 'ALUMINUM', 'CAN', 'BOTTLE')),
+    ("ORGANIC", ('ORGANIC', 'BIODEGRADABLE', 'COMPOST', 'FOOD', 'GARDEN', 'LEAF', 'LEAVES', 'WOOD')),
+    ("HAZARDOUS", ('HAZARDOUS', 'HAZARD', 'BATTERY', 'CHEMICAL', 'MEDICAL', 'E-WASTE', 'TOXIC', 'PAINT', 'BULB')),
+    ("GENERAL", ('GENERAL', 'TRASH', 'TISSUE', 'WRAPPER', 'CHIP', 'SNACK', 'STYROFOAM')),
+)
+_KEYWORD_RANK = {category: rank for rank, (category, _) in enumerate(CATEGORY_KEYWORDS)}
+
+# One zero-width lookahead per position, so overlapping keywords of every
+# category are seen in a single scan of the text
+_KEYWORD_PATTERN = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{category}>{'|'.join(re.escape(k) for k in keywords)})"
+        for category, keywords in CATEGORY_KEYWORDS
+    ) + ")",
+    re.IGNORECASE,
+)
+
+
+def match_category_keywords(text):
+    """
+    Find the waste category named by keywords in free text
+    Used for YOLO class names and item names returned by Gemini
+    
+    Args:
+        text (str): Class or item name (any case)
+    
+    Returns:
+        str: Matched category, or None if no keyword is present
+    """
+    best_rank = None
+    for match in _KEYWORD_PATTERN.finditer(text):
+        rank = _KEYWORD_RANK[match.lastgroup]
+        if best_rank is None or rank < best_rank:
+            best_rank = rank
+            if rank == 0:
+                break
+    
+    if best_rank is None:
+        return None
+    return CATEGORY_KEYWORDS[best_rank][0]
+
+
+@lru_cache(maxsize=1024)
+def normalize_class_name(yolo_class_name):
+    """
+    Normalize YOLO model output to standard categories
+    Maps model output to display names (RECYCLABLE/ORGANIC/HAZARDOUS/GENERAL)
+    
+    Args:
+        yolo_class_name (str): Class name from YOLO model
+    
+    Returns:
+        str: Normalized category
+    """
+    normalized = yolo_class_name.upper().strip()
+    
+    exact = EXACT_CLASS_NAMES.get(normalized)
+    if exact:
+        return exact
+    
+    # Default to GENERAL for unknown items
+    return match_category_keywords(normalized) or "GENERAL"
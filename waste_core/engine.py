@@ -0,0 +1,319 @@
+"""
+Gemini classification engine shared by the FastAPI backend and the Vercel handler
+Holds the prompts, the parsing of Gemini's answers and the safety rules, so
+both deployments classify the same way. Quotas, caching and the YOLO
+fallback stay with the caller.
+"""
+
+import base64
+import http.client
+import importlib.util
+import json
+import threading
+from urllib.parse import urlsplit
+
+# google.generativeai (with grpc and protobuf) costs seconds to import, so it
+# is only imported when a model is built; serverless cold starts use the
+# stdlib RestGeminiModel instead
+GENAI_AVAILABLE = importlib.util.find_spec("google.generativeai") is not None
+
+from waste_core.categories import get_fallback_awareness_tip, match_category_keywords
+
+# gemini-1.5-flash - higher free tier quota
+GEMINI_MODEL = "gemini-1.5-flash"
+
+# Categories Gemini may answer with; anything else is recovered from the item name
+GEMINI_CATEGORIES = frozenset({"ORGANIC", "RECYCLABLE", "HAZARDOUS"})
+DEFAULT_CONFIDENCE = 0.85  # when Gemini's confidence field is not a number
+MAX_CONFIDENCE = 0.99
+MAX_TIP_LENGTH = 250
+
+CLASSIFY_PROMPT = """You are a waste classification expert. Analyze this image and classify the waste item.
+
+RESPOND IN THIS EXACT FORMAT (one line only):
+CATEGORY|ITEM_NAME|CONFIDENCE
+
+Where:
+- CATEGORY must be exactly one of: ORGANIC, RECYCLABLE, HAZARDOUS
+- ITEM_NAME is what you see (e.g., "plastic bottle", "banana peel", "battery")
+- CONFIDENCE is a number between 0.70 and 0.99
+
+CLASSIFICATION RULES:
+- ORGANIC: Food waste, fruit/vegetable peels, garden waste, paper tissues, biodegradable items
+- RECYCLABLE: Plastic bottles, glass, metal cans, cardboard, paper, aluminum, PET bottles
+- HAZARDOUS: Batteries, electronics, chemicals, medicines, paint, light bulbs, e-waste
+
+Examples:
+- Plastic water bottle → RECYCLABLE|plastic bottle|0.95
+- Banana peel → ORGANIC|banana peel|0.92
+- AA battery → HAZARDOUS|battery|0.94
+
+Analyze the image and respond with ONLY the classification line, nothing else."""
+
+TIP_PROMPT = """You are a friendly waste management expert helping people sort their garbage correctly.
+
+ITEM DETECTED: {item_name}
+CATEGORY: {category} waste
+
+Write a SHORT, CLEAR awareness tip (2-3 sentences) that includes:
+1. Why this belongs in {category} category
+2. The correct disposal method
+3. ONE environmental impact fact
+
+Rules:
+- Be direct and helpful
+- Use simple language anyone can understand
+- Include a practical disposal tip
+- DO NOT use emojis
+- Keep under 200 characters"""
+
+TIP_GENERATION_CONFIG = {
+    'temperature': 0.6,
+    'max_output_tokens': 150,
+}
+
+GEMINI_REST_ENDPOINT = "https://generativelanguage.googleapis.com"
+GEMINI_REST_TIMEOUT = 30  # seconds
+# Raised when the server closed a kept-alive connection before answering;
+# the request never reached it, so it is safe to resend once
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# Image types Gemini accepts inline, by leading bytes; anything else needs converting
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+_HEIF_BRANDS = {b"heic": "image/heic", b"heix": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif"}
+
+
+def create_gemini_model(api_key, endpoint="", model_name=GEMINI_MODEL):
+    """
+    Configure the Gemini client and build a model
+
+    Args:
+        api_key (str): Gemini API key
+        endpoint (str): Optional API endpoint override (REST transport)
+        model_name (str): Gemini model name
+
+    Returns:
+        GenerativeModel or None: None when the library is missing or no key is set
+    """
+    if not (GENAI_AVAILABLE and api_key):
+        return None
+    import google.generativeai as genai
+    if endpoint:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+class GeminiAPIError(Exception):
+    """Non-200 answer from the Gemini REST API"""
+
+    def __init__(self, status, message):
+        super().__init__(f"Gemini API error {status}: {message}")
+        self.status = status
+
+
+class RestResponse:
+    """The part of the SDK's GenerateContentResponse the engine reads"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class RestGeminiModel:
+    """
+    generateContent over plain HTTPS with the standard library
+
+    A drop-in for GenerativeModel in classify_image_part / generate_tip that
+    imports in milliseconds and keeps one connection open, so warm serverless
+    invocations skip the TCP and TLS handshakes.
+    """
+
+    def __init__(self, api_key, endpoint="", model_name=GEMINI_MODEL, timeout=GEMINI_REST_TIMEOUT):
+        url = urlsplit(endpoint if "://" in endpoint else f"https://{endpoint}") if endpoint \
+            else urlsplit(GEMINI_REST_ENDPOINT)
+        self._connection_class = http.client.HTTPConnection if url.scheme == "http" else http.client.HTTPSConnection
+        self._netloc = url.netloc
+        self._path = f"{url.path.rstrip('/')}/v1beta/models/{model_name}:generateContent"
+        self._headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
+        self._timeout = timeout
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _to_rest_part(part):
+        if isinstance(part, str):
+            return {"text": part}
+        return {"inline_data": part}
+
+    def _post(self, body):
+        reused = self._connection is not None
+        if not reused:
+            self._connection = self._connection_class(self._netloc, timeout=self._timeout)
+        try:
+            self._connection.request("POST", self._path, body=body, headers=self._headers)
+            response = self._connection.getresponse()
+        except STALE_CONNECTION_ERRORS:
+            self.close()
+            if not reused:
+                raise
+            # The kept-alive connection was closed while the instance was idle
+            return self._post(body)
+        except Exception:
+            self.close()
+            raise
+        try:
+            return response.status, response.read()
+        except Exception:
+            self.close()
+            raise
+
+    def generate_content(self, contents, generation_config=None):
+        """
+        Call generateContent
+
+        Args:
+            contents (str or list): Prompt text and/or image parts (see image_part)
+            generation_config (dict): Optional generation settings
+
+        Returns:
+            RestResponse: Answer with its text
+
+        Raises:
+            GeminiAPIError: Non-200 answer (429 when the quota is exhausted)
+            OSError: Connection failures and timeouts; only a stale kept-alive
+                connection is retried, before any response bytes arrived
+        """
+        if not isinstance(contents, (list, tuple)):
+            contents = [contents]
+        request = {"contents": [{"role": "user", "parts": [self._to_rest_part(part) for part in contents]}]}
+        if generation_config:
+            request["generationConfig"] = {
+                "maxOutputTokens" if key == "max_output_tokens" else key: value
+                for key, value in generation_config.items()
+            }
+        body = json.dumps(request).encode()
+
+        with self._lock:
+            status, payload = self._post(body)
+
+        answer = json.loads(payload or b"{}")
+        if status != 200:
+            raise GeminiAPIError(status, answer.get("error", {}).get("message", "unknown error"))
+        try:
+            text = "".join(part.get("text", "") for part in answer["candidates"][0]["content"]["parts"])
+        except (KeyError, IndexError):
+            text = ""
+        return RestResponse(text)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def sniff_image_type(image_bytes):
+    """
+    MIME type of an image Gemini accepts as-is, from its leading bytes
+
+    Returns:
+        str or None: image/jpeg, image/png, image/webp, image/heic or
+            image/heif; None for other formats (GIF, BMP, TIFF, ...)
+    """
+    head = bytes(image_bytes[:16])
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return _HEIF_BRANDS.get(head[8:12])
+    return None
+
+
+def image_part(image_bytes, mime_type="image/jpeg"):
+    """Inline image part for a Gemini request"""
+    return {"mime_type": mime_type, "data": base64.b64encode(image_bytes).decode()}
+
+
+def parse_classification(text):
+    """
+    Parse a CATEGORY|ITEM_NAME|CONFIDENCE answer
+
+    Returns:
+        tuple: (category, item_name, confidence), or (None, None, 0.0) when
+            the answer does not have that shape
+    """
+    parts = (text or "").strip().split("|")
+    if len(parts) < 3:
+        return None, None, 0.0
+
+    category = parts[0].strip().upper()
+    item_name = parts[1].strip()
+    try:
+        confidence = float(parts[2].strip())
+    except ValueError:
+        confidence = DEFAULT_CONFIDENCE
+
+    # Validate category - recover it from the item name if possible
+    if category not in GEMINI_CATEGORIES:
+        category = match_category_keywords(item_name) or "HAZARDOUS"  # Safety default
+    return category, item_name, min(confidence, MAX_CONFIDENCE)
+
+
+def classify_image_part(model, part):
+    """
+    Classify one image with Gemini Vision (raises on API errors)
+
+    Args:
+        model: Gemini GenerativeModel
+        part (dict): Image part (see image_part)
+
+    Returns:
+        tuple: (category, item_name, confidence) as parse_classification
+    """
+    response = model.generate_content([CLASSIFY_PROMPT, part])
+    return parse_classification(response.text if response else None)
+
+
+def generate_tip(model, item_name, category):
+    """
+    Short awareness tip from Gemini (raises on API errors)
+
+    Returns:
+        str: Tip, or the static fallback tip when Gemini returns nothing
+    """
+    response = model.generate_content(
+        TIP_PROMPT.format(item_name=item_name, category=category),
+        generation_config=TIP_GENERATION_CONFIG,
+    )
+    if not (response and response.text):
+        return get_fallback_awareness_tip(category)
+    tip = response.text.strip()
+    # Ensure it's not too long
+    if len(tip) > MAX_TIP_LENGTH:
+        tip = tip[:MAX_TIP_LENGTH - 3] + "..."
+    return tip
+
+
+def generate_safety_warning(confidence: float) -> str:
+    """
+    Generate safety warning for low-confidence predictions
+
+    Args:
+        confidence: Model confidence score
+
+    Returns:
+        str: Safety warning message
+    """
+    if confidence < 0.5:
+        return "⚠️ Low confidence detection. When unsure, treat as HAZARDOUS waste for safety."
+    elif confidence < 0.7:
+        return "⚠️ Uncertain classification. Please verify or consult local waste guidelines."
+    else:
+        return ""
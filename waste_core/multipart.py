@@ -0,0 +1,211 @@
+"""
+multipart/form-data parsing without a web framework (RFC 7578)
+Used by the Vercel handler, which receives the raw request body. The body
+is read in chunks into one preallocated buffer (read_body), then scanned
+once with find offsets: part headers are parsed properly
+(Content-Disposition name/filename, Content-Type) and the selected part is
+returned as a memoryview into that buffer, so the upload is never copied.
+"""
+
+# Largest header block accepted for one part
+MAX_HEADER_BYTES = 16 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartError(ValueError):
+    """The body is not valid multipart/form-data"""
+
+
+class BodyTooLarge(MultipartError):
+    """The declared body size is over the limit"""
+
+
+class Part:
+    """One form field: its headers and where its content sits in the body"""
+
+    __slots__ = ("name", "filename", "content_type", "headers", "start", "end")
+
+    def __init__(self, name, filename, content_type, headers, start, end):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+
+def parse_header_params(value):
+    """
+    Split a header value into its main value and parameters
+
+    'form-data; name="file"; filename="a;b.jpg"' ->
+        ('form-data', {'name': 'file', 'filename': 'a;b.jpg'})
+
+    Quoted strings may contain ';' and backslash escapes.
+    """
+    main, _, rest = value.partition(";")
+    params = {}
+    i, length = 0, len(rest)
+    while i < length:
+        while i < length and rest[i] in " \t;":
+            i += 1
+        equals = rest.find("=", i)
+        if equals == -1:
+            break
+        key = rest[i:equals].strip().lower()
+        i = equals + 1
+        if i < length and rest[i] == '"':
+            i += 1
+            chars = []
+            while i < length and rest[i] != '"':
+                if rest[i] == "\\" and i + 1 < length:
+                    i += 1
+                chars.append(rest[i])
+                i += 1
+            params[key] = "".join(chars)
+            i += 1
+        else:
+            end = rest.find(";", i)
+            end = length if end == -1 else end
+            params[key] = rest[i:end].strip()
+            i = end
+    return main.strip().lower(), params
+
+
+def get_boundary(content_type):
+    """
+    Boundary of a multipart/form-data Content-Type header
+
+    Raises:
+        MultipartError: Not multipart/form-data, or no usable boundary
+    """
+    mime_type, params = parse_header_params(content_type or "")
+    boundary = params.get("boundary", "")
+    if mime_type != "multipart/form-data" or not 0 < len(boundary) <= 70:
+        raise MultipartError("Expected multipart/form-data with a boundary")
+    return boundary.encode("latin-1")
+
+
+def parse_part_headers(block):
+    """Header block of one part (bytes) -> {lower-case name: value}"""
+    headers = {}
+    for line in block.decode("utf-8", "replace").split("\r\n"):
+        name, colon, value = line.partition(":")
+        if colon:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def read_body(stream, content_length, max_bytes, chunk_size=READ_CHUNK_SIZE):
+    """
+    Read a request body of known length into a single buffer
+
+    Args:
+        stream: Binary file object with readinto (e.g. the handler's rfile)
+        content_length (int): Content-Length of the request
+        max_bytes (int): Largest body accepted
+        chunk_size (int): Bytes per read
+
+    Returns:
+        bytearray: The body
+
+    Raises:
+        BodyTooLarge: content_length is over max_bytes (nothing is read)
+        MultipartError: The client sent fewer bytes than announced
+    """
+    if content_length > max_bytes:
+        raise BodyTooLarge(f"Body of {content_length} bytes is over the {max_bytes} byte limit")
+    buffer = bytearray(content_length)
+    view = memoryview(buffer)
+    received = 0
+    while received < content_length:
+        count = stream.readinto(view[received:received + chunk_size])
+        if not count:
+            raise MultipartError("Body truncated")
+        received += count
+    view.release()
+    return buffer
+
+
+def iter_parts(body, boundary):
+    """
+    Walk the parts of a multipart body
+
+    Args:
+        body (bytes or bytearray): Complete request body
+        boundary (bytes): Boundary from get_boundary
+
+    Yields:
+        Part: Every part, with offsets of its content in body
+
+    Raises:
+        MultipartError: Missing delimiters or malformed part headers
+    """
+    delimiter = b"--" + boundary
+    position = body.find(delimiter)
+    if position == -1:
+        raise MultipartError("Boundary not found in body")
+    # Every following delimiter is preceded by CRLF
+    delimiter = b"\r\n" + delimiter
+
+    while True:
+        position = body.find(b"\r\n", position) + 2  # end of the delimiter line
+        if position == 1:
+            raise MultipartError("Truncated body")
+        if body.startswith(b"\r\n", position):
+            header_end = position - 2  # part without headers
+        else:
+            header_end = body.find(b"\r\n\r\n", position, position + MAX_HEADER_BYTES)
+            if header_end == -1:
+                raise MultipartError("Part headers not terminated")
+        headers = parse_part_headers(body[position:header_end])
+        content_start = header_end + 4
+        content_end = body.find(delimiter, content_start)
+        if content_end == -1:
+            raise MultipartError("Closing boundary not found")
+
+        _, disposition = parse_header_params(headers.get("content-disposition", ""))
+        yield Part(
+            disposition.get("name"),
+            disposition.get("filename"),
+            headers.get("content-type", "text/plain").lower(),
+            headers,
+            content_start,
+            content_end,
+        )
+
+        position = content_end + len(delimiter)
+        if body.startswith(b"--", position):
+            return  # close delimiter
+
+
+def find_file(body, content_type, field="file"):
+    """
+    The uploaded file of a multipart request
+
+    Args:
+        body (bytes or bytearray): Complete request body
+        content_type (str): Content-Type request header
+        field (str): Form field name; the first part with a filename is used
+            when no part has this name
+
+    Returns:
+        tuple: (Part, memoryview of the content in body), or (None, None)
+            when no file was sent
+
+    Raises:
+        MultipartError: Malformed body
+    """
+    found = None
+    for part in iter_parts(body, get_boundary(content_type)):
+        if part.name == field:
+            found = part
+            break
+        if found is None and part.filename is not None:
+            found = part
+    if found is None:
+        return None, None
+    return found, memoryview(body)[found.start:found.end]
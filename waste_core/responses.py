@@ -0,0 +1,210 @@
+"""
+Precomputed response payloads shared by the FastAPI backend and the Vercel handler
+Category metadata is frozen once at import; request handlers only patch
+the variable fields (confidence, explanation, timestamp, ...) into a copy
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from types import MappingProxyType
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+from waste_core.categories import CATEGORIES, get_dustbin_color, get_dustbin_icon, get_fallback_awareness_tip
+
+# Preferred client-side upload size, advertised by /api/categories on both
+# deployments (frontend resize.js downscales to it before uploading)
+UPLOAD_SETTINGS = MappingProxyType({
+    "max_edge": int(os.getenv("UPLOAD_MAX_EDGE", "768")),
+    "format": os.getenv("UPLOAD_FORMAT", "image/jpeg"),
+    "quality": float(os.getenv("UPLOAD_QUALITY", "0.85")),
+})
+
+# Short descriptions shown by /api/categories
+CATEGORY_SUMMARIES = MappingProxyType({
+    "ORGANIC": "Organic waste that decomposes naturally. Examples: food scraps, garden waste.",
+    "RECYCLABLE": "Materials that can be reprocessed. Examples: plastic, paper, glass, metal.",
+    "HAZARDOUS": "Waste that poses risks to health or environment. Examples: batteries, chemicals, e-waste.",
+})
+
+# Per-category response skeletons; variable fields hold placeholder values
+RESPONSE_TEMPLATES = MappingProxyType({
+    category: MappingProxyType({
+        "success": True,
+        "category": category,
+        "confidence": 0.0,
+        "dustbin_color": get_dustbin_color(category),
+        "dustbin_icon": get_dustbin_icon(category),
+        "explanation": get_fallback_awareness_tip(category),
+        "safety_warning": "",
+        "is_safe_classification": True,
+        "detected_item": None,
+        "timestamp": None,
+    })
+    for category in CATEGORIES
+})
+
+# Returned when YOLO finds nothing in the image
+NO_DETECTION_TEMPLATE = MappingProxyType({
+    "success": False,
+    "category": "HAZARDOUS",  # Safety default
+    "confidence": 0.0,
+    "dustbin_color": "red",
+    "dustbin_icon": "warning",
+    "explanation": "No recognizable waste item detected. For safety, treat unknown items as hazardous waste.",
+    "safety_warning": "⚠️ Unable to identify item - dispose as HAZARDOUS for safety",
+    "is_safe_classification": False,
+    "detected_item": None,
+    "timestamp": None,
+})
+
+
+def dumps(payload):
+    """
+    Serialize a payload to compact JSON bytes (orjson when installed)
+
+    Args:
+        payload: JSON-serializable object
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body):
+    """
+    Strong ETag for a response body
+
+    Args:
+        body (bytes): Response body
+
+    Returns:
+        str: Quoted ETag value
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match request header against an ETag
+
+    Args:
+        if_none_match (str): Header value (may be None, "*" or a list)
+        etag (str): Current ETag of the resource
+
+    Returns:
+        bool: True if the client copy is still fresh (send 304)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def build_categories_payload(confidence_threshold, upload_settings=None):
+    """
+    Pre-serialize the /api/categories payload once at startup
+
+    Args:
+        confidence_threshold (float): Configured YOLO confidence threshold
+        upload_settings (dict): Preferred client upload size/format, if any
+
+    Returns:
+        tuple: (body bytes, ETag)
+    """
+    payload = {
+        "categories": [
+            {
+                "name": name,
+                "dustbin_color": get_dustbin_color(name),
+                "icon": get_dustbin_icon(name),
+                "description": description,
+            }
+            for name, description in CATEGORY_SUMMARIES.items()
+        ],
+        "confidence_threshold": confidence_threshold,
+    }
+    if upload_settings:
+        payload["upload"] = dict(upload_settings)
+    body = dumps(payload)
+    return body, make_etag(body)
+
+
+def utc_timestamp():
+    """ISO 8601 UTC timestamp carried by every classification response"""
+    return datetime.utcnow().isoformat()
+
+
+def build_classification_response(category, **fields):
+    """
+    Assemble a classification response from the category template
+
+    Args:
+        category (str): Final waste category
+        **fields: Variable fields to patch in (confidence, explanation, ...)
+
+    Returns:
+        dict: Response payload with a fresh timestamp
+    """
+    template = RESPONSE_TEMPLATES.get(category)
+    if template is None:
+        # Unknown category: fall back to the generic lookups
+        template = {
+            **RESPONSE_TEMPLATES["GENERAL"],
+            "category": category,
+            "dustbin_color": get_dustbin_color(category),
+            "dustbin_icon": get_dustbin_icon(category),
+        }
+    response = dict(template)
+    response.update(fields)
+    response["timestamp"] = utc_timestamp()
+    return response
+
+
+def build_gemini_response(category, detected_item, confidence, confidence_threshold, **fields):
+    """
+    Response for a Gemini Vision answer (both deployments)
+
+    Args:
+        category (str): Category parsed from Gemini's answer
+        detected_item (str): Item name Gemini reported
+        confidence (float): Gemini's confidence
+        confidence_threshold (float): Confidence below which the answer is
+            flagged as not safe (is_safe_classification)
+        **fields: Extra fields (explanation, model_version, ...)
+
+    Returns:
+        dict: Response payload with a fresh timestamp
+    """
+    return build_classification_response(
+        category,
+        confidence=round(confidence, 4),
+        detected_item=detected_item,
+        model_used="Gemini Vision AI",
+        is_safe_classification=confidence >= confidence_threshold,
+        **fields
+    )
+
+
+def build_no_detection_response():
+    """
+    Response for images where no waste item was detected
+
+    Returns:
+        dict: Response payload with a fresh timestamp
+    """
+    response = dict(NO_DETECTION_TEMPLATE)
+    response["timestamp"] = utc_timestamp()
+    return response